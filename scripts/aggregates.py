@@ -0,0 +1,188 @@
+from typing import Dict, List, Any, Optional
+import numpy as np
+import pandas as pd
+from stream_ingest import NUMERIC_COLUMNS, DEMOGRAPHIC_COLUMNS
+from cleaning import FLOAT32_OUTPUT_DECIMALS
+
+# Every numeric column covered by the fused aggregation pass
+AGGREGATE_COLUMNS = NUMERIC_COLUMNS + DEMOGRAPHIC_COLUMNS
+
+# Output key -> column pair reported by find_correlations()
+CORRELATION_PAIRS = {
+    'tuition_vs_sat': ('tuition', 'sat_average'),
+    'acceptance_rate_vs_sat': ('acceptance_rate', 'sat_average'),
+    'tuition_vs_acceptance_rate': ('tuition', 'acceptance_rate'),
+    'enrollment_vs_acceptance_rate': ('enrollment', 'acceptance_rate'),
+}
+
+# Rows per block: large enough to amortise per-call overhead, small enough that
+# a block of every column stays in cache while all statistics are taken from it.
+BLOCK_ROWS = 65_536
+
+
+class ColumnAggregates:
+    """
+    Moments, extrema and pairwise co-moments for a set of numeric columns.
+
+    Pairwise quantities are kept as matrices indexed [i, j] over the rows where
+    both column i and column j are present, which matches pandas' NaN-skipping
+    per-column statistics on the diagonal and pairwise-complete ``corr()`` off it:
+
+    - ``count[i, j]``: number of rows with both values present
+    - ``mean[i, j]``: mean of column i over those rows
+    - ``m2[i, j]``: sum of squared deviations of column i over those rows
+    - ``comoment[i, j]``: sum of co-deviations of columns i and j
+    """
+
+    def __init__(self, columns: List[str]):
+        k = len(columns)
+        self.columns = list(columns)
+        self.count = np.zeros((k, k))
+        self.mean = np.zeros((k, k))
+        self.m2 = np.zeros((k, k))
+        self.comoment = np.zeros((k, k))
+        self.minimum = np.full(k, np.inf)
+        self.maximum = np.full(k, -np.inf)
+
+    @classmethod
+    def from_array(cls, values: np.ndarray, columns: List[str]) -> 'ColumnAggregates':
+        """Aggregate a (rows x columns) float array in one blocked pass."""
+        agg = cls(columns)
+        for start in range(0, len(values), BLOCK_ROWS):
+            agg.merge(cls._from_block(values[start:start + BLOCK_ROWS], columns))
+        return agg
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: List[str]) -> 'ColumnAggregates':
+        """Aggregate the given columns of a DataFrame."""
+        return cls.from_array(df[columns].to_numpy(dtype=np.float64), columns)
+
+    @classmethod
+    def _from_block(cls, block: np.ndarray, columns: List[str]) -> 'ColumnAggregates':
+        agg = cls(columns)
+        if not len(block):
+            return agg
+
+        missing = np.isnan(block)
+        if not missing.any():
+            return cls._from_dense_block(block, columns)
+
+        # Shift by the first row for numerical stability of the raw sums
+        shift = np.where(missing[0], 0.0, block[0])
+        shifted = np.where(missing, 0.0, block - shift)
+        present = (~missing).astype(np.float64)
+
+        count = present.T @ present
+        sums = shifted.T @ present            # sums[i, j]: sum of x_i where x_j present
+        squares = (shifted * shifted).T @ present
+        cross = shifted.T @ shifted
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            safe = np.where(count > 0, count, 1.0)
+            agg.count = count
+            agg.mean = np.where(count > 0, shift[:, None] + sums / safe, 0.0)
+            agg.m2 = np.where(count > 0, squares - sums * sums / safe, 0.0)
+            agg.comoment = np.where(count > 0, cross - sums * sums.T / safe, 0.0)
+
+        agg.minimum = np.fmin.reduce(np.where(missing, np.inf, block), axis=0)
+        agg.maximum = np.fmax.reduce(np.where(missing, -np.inf, block), axis=0)
+        return agg
+
+    @classmethod
+    def _from_dense_block(cls, block: np.ndarray, columns: List[str]) -> 'ColumnAggregates':
+        """Fast path for blocks without missing values: every pair shares all rows."""
+        agg = cls(columns)
+        n = float(len(block))
+        shift = block[0]
+        shifted = block - shift
+        sums = shifted.sum(axis=0)
+        cross = shifted.T @ shifted
+        k = len(columns)
+
+        agg.count = np.full((k, k), n)
+        agg.mean = np.repeat((shift + sums / n)[:, None], k, axis=1)
+        agg.m2 = np.repeat((np.diag(cross) - sums * sums / n)[:, None], k, axis=1)
+        agg.comoment = cross - np.outer(sums, sums) / n
+        agg.minimum = block.min(axis=0)
+        agg.maximum = block.max(axis=0)
+        return agg
+
+    def merge(self, other: 'ColumnAggregates') -> 'ColumnAggregates':
+        """Combine another partial aggregate into this one (Chan et al. update)."""
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge aggregates over different columns")
+
+        na, nb = self.count, other.count
+        n = na + nb
+        with np.errstate(invalid='ignore', divide='ignore'):
+            safe = np.where(n > 0, n, 1.0)
+            delta = other.mean - self.mean
+            weight = na * nb / safe
+            self.mean = np.where(n > 0, self.mean + delta * nb / safe, 0.0)
+            self.m2 = self.m2 + other.m2 + delta * delta * weight
+            self.comoment = self.comoment + other.comoment + delta * delta.T * weight
+        self.count = n
+        self.minimum = np.fmin(self.minimum, other.minimum)
+        self.maximum = np.fmax(self.maximum, other.maximum)
+        return self
+
+    def column_summary(self, column: str) -> Dict[str, float]:
+        """Count, mean, sample std, min and max of one column."""
+        i = self.columns.index(column)
+        n = self.count[i, i]
+        return {
+            'count': int(n),
+            'mean': float(self.mean[i, i]) if n else float('nan'),
+            'std': float(np.sqrt(self.m2[i, i] / (n - 1))) if n > 1 else float('nan'),
+            'min': float(self.minimum[i]) if n else float('nan'),
+            'max': float(self.maximum[i]) if n else float('nan'),
+        }
+
+    def correlation(self, a: str, b: str) -> float:
+        """Pearson correlation of two columns over their pairwise-complete rows."""
+        i, j = self.columns.index(a), self.columns.index(b)
+        denom = np.sqrt(self.m2[i, j] * self.m2[j, i])
+        if self.count[i, j] < 2 or denom == 0:
+            return float('nan')
+        return float(self.comoment[i, j] / denom)
+
+
+def summarize_columns(df: pd.DataFrame, columns: List[str],
+                      aggregates: Optional[ColumnAggregates] = None,
+                      medians: Optional[Dict[str, float]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Build the calculate_statistics() dict (mean, median, std, min, max per column)
+    from a fused aggregate. Medians need one selection pass per column unless
+    they are supplied (e.g. from quantile sketches).
+    """
+    if aggregates is None:
+        aggregates = ColumnAggregates.from_frame(df, columns)
+
+    stats = {}
+    for col in columns:
+        summary = aggregates.column_summary(col)
+        dtype = df[col].dtype
+        minimum, maximum = summary['min'], summary['max']
+        if pd.api.types.is_integer_dtype(dtype) and summary['count']:
+            # Keep extrema in the column's own type, as Series.min/max do
+            minimum, maximum = dtype.type(minimum), dtype.type(maximum)
+        values = df[col].to_numpy()
+        if not summary['count']:
+            median = float('nan')
+        elif medians is not None:
+            median = medians[col]
+        elif values.dtype.kind == 'f':
+            median = float(np.nanmedian(values))
+        else:
+            median = float(np.median(values))
+        if dtype == np.float32:
+            # Report float32 values at their intended precision
+            median, minimum, maximum = (round(v, FLOAT32_OUTPUT_DECIMALS) for v in (median, minimum, maximum))
+        stats[col] = {
+            'mean': summary['mean'],
+            'median': median,
+            'std': summary['std'],
+            'min': minimum,
+            'max': maximum,
+        }
+    return stats
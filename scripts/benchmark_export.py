@@ -0,0 +1,62 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from cleaning import clean_frame, frame_for_output
+from column_cache import read_frame
+from exporters import export_frame, output_bytes, default_output_path, zstd
+from generate_sample_data import write_dataset
+
+
+def legacy_export(df, path: str, fmt: str):
+    """The one-shot pandas writers export_processed_data used to call."""
+    if fmt == 'json':
+        frame_for_output(df).to_json(path, orient='records', indent=2)
+    else:
+        frame_for_output(df).to_csv(path, index=False)
+
+
+def timed(fn, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and size of each export format and compression")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Generated rows before cleaning")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=2024)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='export-bench-')
+    try:
+        source = os.path.join(work_dir, 'source.columnar')
+        write_dataset(source, args.rows, 'columnar', seed=args.seed, invalid_rate=0.02)
+        df = clean_frame(read_frame(source))
+        print(f"{len(df):,} cleaned rows of {args.rows:,} generated")
+
+        cases = [('legacy json (indent=2)', 'json', None, True), ('legacy csv', 'csv', None, True)]
+        cases += [(f"{fmt}{'+' + compression if compression else ''}", fmt, compression, False)
+                  for fmt in ('json', 'ndjson', 'csv') for compression in (None, 'gzip', 'zstd')
+                  if compression != 'zstd' or zstd is not None]
+        cases.append(('columnar', 'columnar', None, False))
+
+        for label, fmt, compression, legacy in cases:
+            path = default_output_path(os.path.join(work_dir, 'legacy' if legacy else 'export'), fmt, compression)
+            if legacy:
+                seconds = timed(lambda: legacy_export(df, path, fmt), args.repeats)
+            else:
+                seconds = timed(lambda: export_frame(df, path, fmt, compression), args.repeats)
+            size = output_bytes(path)
+            print(f"{label:<24} {seconds:8.3f}s  {len(df) / seconds:>12,.0f} rows/s  {size / 2 ** 20:9.1f} MiB")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from cleaning import clean_frame
+from stream_ingest import COLUMNS, DEMOGRAPHIC_COLUMNS
+
+
+def make_raw_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    """Build a frame shaped like create_dataframe() output, ~5% of rows invalid."""
+    rng = np.random.default_rng(seed)
+    states = np.array(["CA", "MA", "NY", "CT", "PA", "IL", "NC", "TX", "VA", "MD"], dtype=object)
+    regions = np.array(["Northeast", "Southeast", "Midwest", "West"], dtype=object)
+    frame = pd.DataFrame({
+        'name': np.array([f"College {i}" for i in range(rows)], dtype=object),
+        'acceptance_rate': rng.uniform(-2, 100, rows).round(1),
+        'tuition': rng.integers(25000, 60000, rows),
+        'sat_average': rng.integers(1200, 1580, rows),
+        'enrollment': rng.integers(5000, 45000, rows),
+        'state': states[rng.integers(0, len(states), rows)],
+        'region': regions[rng.integers(0, len(regions), rows)],
+    })
+    for col in DEMOGRAPHIC_COLUMNS:
+        frame[col] = rng.uniform(0, 40, rows).round(1)
+    return frame[COLUMNS]
+
+
+def legacy_clean(df: pd.DataFrame) -> pd.DataFrame:
+    """The four chained, copying filters clean_data used to apply."""
+    df = df.dropna(subset=['acceptance_rate', 'tuition', 'sat_average'])
+    df = df[df['acceptance_rate'].between(0, 100)]
+    df = df[df['sat_average'].between(400, 1600)]
+    df = df[df['tuition'] > 0]
+    return df
+
+
+def measure(fn, df: pd.DataFrame):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(df)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident and peak memory of legacy vs compact cleaning")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    raw = make_raw_frame(args.rows)
+    legacy, legacy_time, legacy_peak = measure(legacy_clean, raw)
+    compact, compact_time, compact_peak = measure(clean_frame, raw)
+    assert len(legacy) == len(compact)
+
+    per_million = 1_000_000 / args.rows / 2 ** 20
+    legacy_bytes = legacy.memory_usage(deep=True).sum()
+    compact_bytes = compact.memory_usage(deep=True).sum()
+    print(f"Rows: {args.rows:,} ({len(compact):,} valid)")
+    print(f"  Resident per 1M rows: legacy {legacy_bytes * per_million:,.1f} MiB, "
+          f"compact {compact_bytes * per_million:,.1f} MiB ({legacy_bytes / compact_bytes:.2f}x smaller)")
+    print(f"  Cleaning peak allocation: legacy {legacy_peak / 2 ** 20:,.1f} MiB, compact {compact_peak / 2 ** 20:,.1f} MiB")
+    print(f"  Cleaning time: legacy {legacy_time:.3f}s, compact {compact_time:.3f}s")
+    print("  Per column (MiB, legacy -> compact):")
+    for col in COLUMNS:
+        before = legacy[col].memory_usage(deep=True, index=False) / 2 ** 20
+        after = compact[col].memory_usage(deep=True, index=False) / 2 ** 20
+        print(f"    {col:<17} {before:8.1f} -> {after:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Any, Optional
+import numpy as np
+import pandas as pd
+from generate_sample_data import write_dataset
+
+RESULTS_VERSION = 1
+DATA_FILE = 'college_admissions_data.json'
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_SEED = 2024
+# Generated datasets carry some defects and duplicates so validation and cleaning do real work
+INVALID_RATE = 0.02
+DUPLICATE_RATE = 0.001
+# A stage regresses when it is this much slower or larger than the baseline...
+DEFAULT_TIME_TOLERANCE = 0.20
+DEFAULT_MEMORY_TOLERANCE = 0.20
+# ...and the difference is above noise
+MIN_TIME_DELTA = 0.01
+MIN_MEMORY_DELTA_MB = 8.0
+RSS_SAMPLE_INTERVAL = 0.002
+
+# Pipeline stages, each timed after its prerequisites run untimed in the same process
+STAGES = [
+    'load_data', 'create_dataframe', 'clean_data', 'calculate_statistics', 'analyze_by_region',
+    'find_correlations', 'export_processed_data', 'validate_dataset', 'prepare_dashboard_data',
+]
+
+
+def _current_rss() -> Optional[int]:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def _max_rss() -> int:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class RssSampler:
+    """Peak resident set size while the block runs, sampled from /proc (ru_maxrss elsewhere)."""
+
+    def __enter__(self):
+        self.start = _current_rss()
+        self.peak = self.start or 0
+        self._stop = threading.Event()
+        if self.start is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, _current_rss() or 0)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self.start is None:
+            self.start, self.peak = 0, _max_rss()
+        else:
+            self._thread.join()
+            self.peak = max(self.peak, _current_rss() or 0)
+        return False
+
+
+def _setup(stage: str, data_dir: str):
+    """Untimed prerequisites of a stage; returns the object the stage runs on."""
+    from data_processor import CollegeDataProcessor
+    from data_validator import DataValidator
+
+    data_file = os.path.join(data_dir, DATA_FILE)
+    if stage == 'validate_dataset':
+        return DataValidator(data_file)
+    if stage == 'prepare_dashboard_data':
+        shutil.rmtree(os.path.join(data_dir, '.college_cache'), ignore_errors=True)
+        return None
+    processor = CollegeDataProcessor(data_file)
+    if stage == 'load_data':
+        return processor
+    processor.load_data()
+    if stage == 'create_dataframe':
+        return processor
+    processor.create_dataframe()
+    if stage == 'clean_data':
+        return processor
+    processor.clean_data()
+    return processor
+
+
+def _call(stage: str, target: Any, data_dir: str):
+    if stage == 'prepare_dashboard_data':
+        from export_for_dashboard import prepare_dashboard_data
+        return prepare_dashboard_data(output_dir=os.path.join(data_dir, 'dashboard_data'))
+    if stage == 'export_processed_data':
+        return target.export_processed_data('json')
+    return getattr(target, stage)()
+
+
+def run_stage(stage: str, data_dir: str) -> Dict[str, Any]:
+    """Worker: set up and time one stage in a fresh process, quietly, from inside data_dir."""
+    os.chdir(data_dir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        target = _setup(stage, data_dir)
+        with RssSampler() as rss:
+            start = time.perf_counter()
+            _call(stage, target, data_dir)
+            elapsed = time.perf_counter() - start
+    return {'seconds': elapsed, 'peak_rss_mb': rss.peak / 2 ** 20, 'rss_delta_mb': (rss.peak - rss.start) / 2 ** 20}
+
+
+def dataset_dir(work_dir: str, rows: int, seed: int) -> str:
+    """Generate (once) the seeded dataset of a size and return its directory."""
+    path = os.path.join(work_dir, f"rows-{rows}-seed-{seed}")
+    data_file = os.path.join(path, DATA_FILE)
+    if not os.path.exists(data_file):
+        os.makedirs(path, exist_ok=True)
+        write_dataset(data_file, rows, 'json', seed=seed, workers=os.cpu_count(),
+                      duplicate_rate=DUPLICATE_RATE, invalid_rate=INVALID_RATE)
+    return os.path.abspath(path)
+
+
+def _environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def run_benchmarks(sizes: List[int], stages: List[str], repeats: int = 3, seed: int = DEFAULT_SEED,
+                   work_dir: str = '.benchmark_data') -> Dict[str, Any]:
+    """
+    Time every stage at every size. Each repeat runs in a fresh process so
+    peak RSS belongs to that stage alone; the fastest repeat is reported,
+    with its throughput in source rows per second.
+    """
+    results = []
+    spawn = get_context('spawn')
+    for rows in sizes:
+        data_dir = dataset_dir(work_dir, rows, seed)
+        for stage in stages:
+            runs = []
+            for _ in range(repeats):
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                    runs.append(pool.submit(run_stage, stage, data_dir).result())
+            best = min(runs, key=lambda run: run['seconds'])
+            result = {
+                'stage': stage,
+                'rows': rows,
+                'seconds': best['seconds'],
+                'median_seconds': float(np.median([run['seconds'] for run in runs])),
+                'rows_per_second': rows / best['seconds'] if best['seconds'] else None,
+                'peak_rss_mb': max(run['peak_rss_mb'] for run in runs),
+                'rss_delta_mb': max(run['rss_delta_mb'] for run in runs),
+                'repeats': repeats,
+            }
+            results.append(result)
+            print(f"{stage:<24} {rows:>10,} rows  {result['seconds']:9.4f}s  "
+                  f"{result['rows_per_second']:>14,.0f} rows/s  peak {result['peak_rss_mb']:8.1f} MiB "
+                  f"(+{result['rss_delta_mb']:.1f})")
+    return {'version': RESULTS_VERSION, 'seed': seed, 'environment': _environment(), 'results': results}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any],
+            time_tolerance: float = DEFAULT_TIME_TOLERANCE,
+            memory_tolerance: float = DEFAULT_MEMORY_TOLERANCE) -> List[Dict[str, Any]]:
+    """
+    Regressions of results against a baseline results file, matched by
+    (stage, rows): slower or larger peak RSS beyond the tolerance and above
+    the noise floor.
+    """
+    previous = {(entry['stage'], entry['rows']): entry for entry in baseline['results']}
+    regressions = []
+    for entry in results['results']:
+        old = previous.get((entry['stage'], entry['rows']))
+        if old is None:
+            continue
+        checks = [
+            ('seconds', time_tolerance, MIN_TIME_DELTA),
+            ('peak_rss_mb', memory_tolerance, MIN_MEMORY_DELTA_MB),
+        ]
+        for metric, tolerance, floor in checks:
+            before, after = old[metric], entry[metric]
+            if after > before * (1 + tolerance) and after - before > floor:
+                regressions.append({'stage': entry['stage'], 'rows': entry['rows'], 'metric': metric,
+                                    'baseline': before, 'current': after, 'ratio': after / before})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every pipeline stage across dataset sizes")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Row counts to generate, e.g. 1000 10000 100000 1000000 10000000")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--work-dir', default='.benchmark_data', help="Where generated datasets are kept")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="Results file to compare against")
+    parser.add_argument('--save-baseline', help="Also write the results to this baseline file")
+    parser.add_argument('--time-tolerance', type=float, default=DEFAULT_TIME_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=DEFAULT_MEMORY_TOLERANCE)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.stages, args.repeats, args.seed, args.work_dir)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['stage']} @ {regression['rows']:,} rows: {regression['metric']} "
+                  f"{regression['baseline']:.4f} -> {regression['current']:.4f} ({regression['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict, List, Any
+from urllib.parse import urlsplit
+import numpy as np
+from query_service import QueryService
+
+# Dashboard-like query mix; filters vary so part of the traffic misses the result cache
+QUERIES = [
+    '/stats',
+    '/regions',
+    '/top?metric=acceptance_rate&k=15',
+    '/histogram?column=sat_average&bins=8',
+    '/stats?region={region}',
+    '/top?metric=sat_average&k=10&region={region}',
+    '/histogram?column=tuition&bins=12&region={region}&min_sat_average={sat}',
+    '/regions?min_tuition={tuition}',
+    '/colleges?name={name}',
+]
+
+
+async def _request(reader, writer, host: str, path: str, etag: str = None):
+    lines = [f"GET {path} HTTP/1.1", f"Host: {host}"]
+    if etag:
+        lines.append(f"If-None-Match: {etag}")
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+    await writer.drain()
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    headers = {}
+    for line in head[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get('content-length', 0)))
+    return int(head[0].split(' ')[1]), headers.get('etag')
+
+
+async def _client(host: str, port: int, paths: List[str], deadline: float, conditional: bool,
+                  latencies: List[float], statuses: Dict[int, int]):
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    rng = random.Random()
+    try:
+        while time.perf_counter() < deadline:
+            path = rng.choice(paths)
+            start = time.perf_counter()
+            status, etag = await _request(reader, writer, host, path, etags.get(path) if conditional else None)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            if etag:
+                etags[path] = etag
+    finally:
+        writer.close()
+
+
+def _paths(service: QueryService, count: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    df = service.store.df
+    regions = list(service.store.region_rows)
+    names = df['name'].sample(min(count, len(df)), random_state=seed).tolist() if len(df) else ['none']
+    paths = []
+    for _ in range(count):
+        template = rng.choice(QUERIES)
+        paths.append(template.format(region=rng.choice(regions), sat=rng.choice([1200, 1300, 1400]),
+                                     tuition=rng.choice([30000, 40000, 50000]), name=rng.choice(names)))
+    return paths
+
+
+async def run(args) -> Dict[str, Any]:
+    service = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        service = QueryService(args.data_file, args.cache_dir, args.cache_entries)
+        start = time.perf_counter()
+        await service.start('127.0.0.1', 0)
+        print(f"Loaded {len(service.store.df):,} colleges in {time.perf_counter() - start:.2f}s")
+        host, port = '127.0.0.1', service.port
+
+    paths = _paths(service, args.distinct_queries) if service else QUERIES[:4]
+    try:
+        for conditional in (False, True):
+            latencies, statuses = [], {}
+            deadline = time.perf_counter() + args.duration
+            started = time.perf_counter()
+            await asyncio.gather(*(_client(host, port, paths, deadline, conditional, latencies, statuses)
+                                   for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+            ms = np.array(latencies) * 1000
+            label = "conditional (If-None-Match)" if conditional else "plain"
+            print(f"{label}: {len(ms):,} requests in {elapsed:.1f}s = {len(ms) / elapsed:,.0f} req/s, "
+                  f"p50 {np.percentile(ms, 50):.2f}ms, p95 {np.percentile(ms, 95):.2f}ms, "
+                  f"p99 {np.percentile(ms, 99):.2f}ms, statuses {dict(sorted(statuses.items()))}")
+        if service:
+            print(f"Result cache: {service.cache.hits:,} hits, {service.cache.misses:,} misses")
+    finally:
+        if service:
+            await service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test of the query service")
+    parser.add_argument('--data-file', default='college_admissions_data.json')
+    parser.add_argument('--url', help="Benchmark an already running service instead of an in-process one")
+    parser.add_argument('--cache-dir', default='.college_cache')
+    parser.add_argument('--cache-entries', type=int, default=1024)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--distinct-queries', type=int, default=200)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
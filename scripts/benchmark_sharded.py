@@ -0,0 +1,27 @@
+import argparse
+import os
+import time
+from sharded import run_sharded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure sharded aggregation throughput by worker count")
+    parser.add_argument('data_file', help="JSON array or NDJSON input (NDJSON shards without a parent parse)")
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    args = parser.parse_args()
+
+    baseline = None
+    workers = 1
+    while workers <= args.max_workers:
+        start = time.perf_counter()
+        result = run_sharded(args.data_file, workers, args.chunk_size)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"  {workers:>3} workers: {elapsed:.2f}s, {result.rows_in / elapsed:,.0f} rows/s, "
+              f"speedup {baseline / elapsed:.2f}x")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import time
+from typing import Dict, List, Any
+import numpy as np
+import pandas as pd
+from aggregates import ColumnAggregates, summarize_columns
+from stream_ingest import NUMERIC_COLUMNS, DEMOGRAPHIC_COLUMNS
+
+# Both approaches are timed over the same columns
+COLUMN_SETS = {
+    'headline': NUMERIC_COLUMNS,
+    'all': NUMERIC_COLUMNS + DEMOGRAPHIC_COLUMNS,
+}
+# Per-column reductions legacy_statistics() runs, each a separate scan
+LEGACY_REDUCTIONS = ('mean', 'median', 'std', 'min', 'max')
+
+
+def make_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    """Build a synthetic cleaned frame with realistic value ranges."""
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'acceptance_rate': rng.uniform(5, 85, rows).round(1),
+        'tuition': rng.integers(25000, 60000, rows),
+        'sat_average': rng.integers(1200, 1580, rows),
+        'enrollment': rng.integers(5000, 45000, rows),
+    })
+    for col in DEMOGRAPHIC_COLUMNS:
+        frame[col] = rng.uniform(0, 40, rows).round(1)
+    return frame
+
+
+def legacy_statistics(df: pd.DataFrame, columns: List[str]) -> Dict[str, Any]:
+    """The per-column statistics and correlation scans the processor used to run."""
+    stats = {}
+    for col in columns:
+        stats[col] = {
+            'mean': df[col].mean(),
+            'median': df[col].median(),
+            'std': df[col].std(),
+            'min': df[col].min(),
+            'max': df[col].max()
+        }
+    stats['correlations'] = df[columns].corr()
+    return stats
+
+
+def fused_statistics(df: pd.DataFrame, columns: List[str]) -> Dict[str, Any]:
+    """Statistics and correlation matrix from one fused aggregation pass."""
+    aggregates = ColumnAggregates.from_frame(df, columns)
+    stats = summarize_columns(df, columns, aggregates)
+    stats['correlations'] = {
+        (a, b): aggregates.correlation(a, b) for a in columns for b in columns
+    }
+    return stats
+
+
+def legacy_moments(df: pd.DataFrame, columns: List[str]):
+    """Legacy scans excluding medians, which both approaches need a selection for."""
+    for col in columns:
+        df[col].mean(), df[col].std(), df[col].min(), df[col].max()
+    df[columns].corr()
+
+
+def fused_moments(df: pd.DataFrame, columns: List[str]):
+    ColumnAggregates.from_frame(df, columns)
+
+
+def best_of(fn, df: pd.DataFrame, columns: List[str], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(df, columns)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark legacy vs fused statistics")
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--columns', choices=sorted(COLUMN_SETS), default='headline',
+                        help="Columns both approaches aggregate: the 4 headline metrics or all 9")
+    args = parser.parse_args()
+    columns = COLUMN_SETS[args.columns]
+
+    df = make_frame(args.rows)
+    legacy = legacy_statistics(df, columns)
+    fused = fused_statistics(df, columns)
+    for col in columns:
+        for stat_name in LEGACY_REDUCTIONS:
+            assert np.isclose(legacy[col][stat_name], fused[col][stat_name]), (col, stat_name)
+
+    legacy_time = best_of(legacy_statistics, df, columns, args.repeats)
+    fused_time = best_of(fused_statistics, df, columns, args.repeats)
+    legacy_moments_time = best_of(legacy_moments, df, columns, args.repeats)
+    fused_moments_time = best_of(fused_moments, df, columns, args.repeats)
+
+    print(f"Rows: {args.rows:,}, columns: {len(columns)} ({args.columns})")
+    # Fused: one blocked pass for moments, extrema and co-moments; medians still need a selection per column
+    legacy_scans = len(LEGACY_REDUCTIONS) * len(columns) + 1
+    fused_scans = 1 + len(columns)
+    print(f"  Legacy: {legacy_time:.3f}s, {legacy_scans} scans "
+          f"({len(LEGACY_REDUCTIONS)} reductions x {len(columns)} columns + 1 correlation pass)")
+    print(f"  Fused:  {fused_time:.3f}s, {fused_scans} scans (1 fused pass + {len(columns)} median selections)")
+    print(f"  Speedup: {legacy_time / fused_time:.2f}x")
+    print(f"  Excluding medians: legacy {legacy_moments_time:.3f}s over {legacy_scans - len(columns)} scans, "
+          f"fused {fused_moments_time:.3f}s over 1 pass ({legacy_moments_time / fused_moments_time:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
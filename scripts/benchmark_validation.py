@@ -0,0 +1,77 @@
+import argparse
+import time
+import numpy as np
+from columnar_validation import validate_records
+from data_validator import DataValidator
+
+
+def make_records(rows: int, seed: int = 42):
+    """Synthetic entries with out-of-range values, wrong types, missing fields and duplicate names."""
+    rng = np.random.default_rng(seed)
+    rates = rng.uniform(-2, 102, rows).round(1).tolist()
+    tuitions = rng.integers(-100, 90000, rows).tolist()
+    sats = rng.integers(350, 1650, rows).tolist()
+    hispanic = rng.uniform(5, 25, rows).round(1).tolist()
+    broken = rng.random(rows)
+    records = []
+    for i in range(rows):
+        record = {
+            'name': f"College {i % (rows - rows // 50)}",
+            'acceptance_rate': rates[i],
+            'tuition': tuitions[i],
+            'sat_average': sats[i] if broken[i] > 0.01 else None,
+            'enrollment': 12000 if broken[i] > 0.005 else "unknown",
+            'demographics': {'white_percent': 40.0, 'asian_percent': 20.0, 'hispanic_percent': hispanic[i],
+                             'black_percent': 10.0, 'other_percent': round(30.0 - hispanic[i] + (5.0 if broken[i] < 0.01 else 0.0), 1)},
+            'location': {'state': 'CA', 'region': 'West'},
+        }
+        if broken[i] < 0.002:
+            del record['location']
+        records.append(record)
+    return records
+
+
+def legacy_validate(records):
+    """The per-record report validate_dataset used to build (quadratic duplicate scan)."""
+    validator = DataValidator()
+    all_errors, all_warnings = [], []
+    for i, college in enumerate(records):
+        errors, warnings = validator.validate_college_entry(college, i)
+        all_errors.extend(errors)
+        all_warnings.extend(warnings)
+    names = [college.get('name', f'College_{i}') for i, college in enumerate(records)]
+    duplicates = [name for name in set(names) if names.count(name) > 1]
+    all_warnings.extend([f"Duplicate college name: {name}" for name in duplicates])
+    return all_errors, all_warnings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-record vs columnar validation throughput")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--legacy-rows', type=int, default=20_000,
+                        help="Rows for the legacy comparison; its duplicate scan is quadratic")
+    args = parser.parse_args()
+
+    sample = make_records(args.legacy_rows)
+    start = time.perf_counter()
+    legacy_errors, legacy_warnings = legacy_validate(sample)
+    legacy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    report = validate_records(sample, max_examples=None)
+    columnar_time = time.perf_counter() - start
+    assert report['errors'] == legacy_errors
+    # Duplicate warnings were emitted in set order by the legacy path
+    assert sorted(report['warnings']) == sorted(legacy_warnings)
+    print(f"{args.legacy_rows:,} rows: per-record {legacy_time:.2f}s, columnar {columnar_time:.3f}s "
+          f"({legacy_time / columnar_time:.0f}x), reports match")
+
+    records = make_records(args.rows)
+    start = time.perf_counter()
+    report = validate_records(records)
+    elapsed = time.perf_counter() - start
+    print(f"{args.rows:,} rows: columnar {elapsed:.2f}s ({args.rows / elapsed:,.0f} rows/s), "
+          f"{report['summary']['total_errors']:,} errors, {report['summary']['total_warnings']:,} warnings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+from stream_ingest import DEMOGRAPHIC_COLUMNS
+from columnar_validation import RANGE_RULES
+
+# Validity rules applied by CollegeDataProcessor.clean_data; part of the cache
+# key so that a rule change invalidates previously cached frames. Ranges are
+# shared with the validator; cleaning additionally rejects zero tuition.
+CLEANING_RULES = {
+    'required': ['acceptance_rate', 'tuition', 'sat_average'],
+    'acceptance_rate': RANGE_RULES['acceptance_rate'][:2],
+    'sat_average': RANGE_RULES['sat_average'][:2],
+    'tuition_min_exclusive': 0,
+}
+
+# Bit flags recorded per rejected row; a row may fail several rules
+REJECTION_REASONS = [f"missing_{col}" for col in CLEANING_RULES['required']] + [
+    'acceptance_rate_out_of_range',
+    'sat_average_out_of_range',
+    'tuition_not_positive',
+]
+
+# Compact dtypes of the cleaned frame. Integer columns fall back to float64 when
+# a value is missing, fractional or out of range for the target type.
+FLOAT32_COLUMNS = ['acceptance_rate'] + DEMOGRAPHIC_COLUMNS
+UNSIGNED_COLUMNS = {'tuition': np.uint32, 'sat_average': np.uint16, 'enrollment': np.uint32}
+CATEGORICAL_COLUMNS = ['state', 'region']
+INTERNED_COLUMNS = ['name']
+
+# float32 carries ~7 significant digits; outputs round to this many decimals
+# so e.g. 12.3 is not written as 12.300000190734863
+FLOAT32_OUTPUT_DECIMALS = 4
+
+
+def rejection_codes(df: pd.DataFrame) -> np.ndarray:
+    """Per-row bitmask of the REJECTION_REASONS a row fails; 0 means the row is kept."""
+    low, high = CLEANING_RULES['acceptance_rate']
+    sat_low, sat_high = CLEANING_RULES['sat_average']
+    failures = [df[col].isna() for col in CLEANING_RULES['required']]
+    failures += [
+        df['acceptance_rate'].notna() & ~df['acceptance_rate'].between(low, high),
+        df['sat_average'].notna() & ~df['sat_average'].between(sat_low, sat_high),
+        df['tuition'] <= CLEANING_RULES['tuition_min_exclusive'],
+    ]
+    codes = np.zeros(len(df), dtype=np.uint8)
+    for bit, failed in enumerate(failures):
+        codes |= failed.to_numpy(dtype=bool).astype(np.uint8) << bit
+    return codes
+
+
+def describe_rejection(code: int) -> list:
+    """Names of the rules behind one rejection code."""
+    return [reason for bit, reason in enumerate(REJECTION_REASONS) if code >> bit & 1]
+
+
+def rejection_counts(codes: np.ndarray) -> dict:
+    """Number of rows failing each cleaning rule, from rejection_codes()."""
+    return {reason: int(np.count_nonzero(codes >> bit & 1)) for bit, reason in enumerate(REJECTION_REASONS)}
+
+
+def validity_mask(df: pd.DataFrame) -> np.ndarray:
+    """Combined boolean mask of the rows passing every cleaning rule."""
+    return rejection_codes(df) == 0
+
+
+def _compact_column(col: str, series: pd.Series, mask: np.ndarray):
+    """Select the valid rows of one column and store them in its compact dtype."""
+    values = series.to_numpy()[mask]
+    if col in FLOAT32_COLUMNS:
+        return values.astype(np.float32)
+    if col in UNSIGNED_COLUMNS:
+        dtype = UNSIGNED_COLUMNS[col]
+        as_float = values.astype(np.float64)
+        limit = np.iinfo(dtype)
+        if not len(as_float) or (not np.isnan(as_float).any()
+                                 and as_float.min() >= limit.min and as_float.max() <= limit.max
+                                 and np.array_equal(as_float, np.floor(as_float))):
+            return as_float.astype(dtype)
+        return as_float if series.dtype.kind in 'iuf' else values
+    if col in CATEGORICAL_COLUMNS:
+        codes, categories = pd.factorize(values, sort=True)
+        return pd.Categorical.from_codes(codes, categories)
+    if col in INTERNED_COLUMNS:
+        # Share one string object per distinct name
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        return pd.array(np.asarray(uniques, dtype=object)[codes], dtype=series.dtype)
+    return values
+
+
+def clean_frame(df: pd.DataFrame, codes: np.ndarray = None) -> pd.DataFrame:
+    """
+    Drop rows that fail CLEANING_RULES and store the rest with compact dtypes.
+    Rules are combined into a single mask so each column is copied exactly once.
+    Pass codes when rejection_codes(df) has already been computed.
+    """
+    mask = validity_mask(df) if codes is None else codes == 0
+    return pd.DataFrame(
+        {col: _compact_column(col, df[col], mask) for col in df.columns},
+        index=df.index[mask],
+    )
+
+
+def frame_for_output(df: pd.DataFrame) -> pd.DataFrame:
+    """Widen float32 columns back to float64 with their intended precision, for export."""
+    float32 = [col for col in df.columns if df[col].dtype == np.float32]
+    if not float32:
+        return df
+    widened = df.copy()
+    for col in float32:
+        widened[col] = df[col].astype(np.float64).round(FLOAT32_OUTPUT_DECIMALS)
+    return widened
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Any, Optional
+import numpy as np
+import pandas as pd
+
+CACHE_FORMAT_VERSION = 2
+META_FILE = 'meta.json'
+STRING_SEPARATOR = '\x00'
+
+
+def source_fingerprint(data_file: str, extra: Any = None) -> str:
+    """
+    Fingerprint a source file by path, size and mtime plus any extra inputs
+    (e.g. the cleaning rules) that affect what gets cached for it.
+    """
+    st = os.stat(data_file)
+    payload = json.dumps({
+        'version': CACHE_FORMAT_VERSION,
+        'path': os.path.abspath(data_file),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'extra': extra,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def read_frame(path: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+    """
+    Memory-map a frame stored in the column layout at path, or return None if
+    there is none. With columns, only those column files are opened.
+    """
+    try:
+        with open(os.path.join(path, META_FILE), 'r') as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    specs = [spec for spec in meta['columns'] if columns is None or spec['name'] in columns]
+    loaded = {}
+    for spec in specs:
+        name, kind = spec['name'], spec['kind']
+        if kind == 'numeric':
+            loaded[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+        elif kind == 'categorical':
+            codes = np.load(os.path.join(path, f"{name}.codes.npy"), mmap_mode='r')
+            if spec.get('dtype') == 'category':
+                loaded[name] = pd.Categorical.from_codes(codes, spec['categories'])
+            else:
+                categories = np.array(spec['categories'], dtype=object)
+                loaded[name] = categories[codes]
+        elif kind == 'string':
+            with open(os.path.join(path, f"{name}.utf8"), 'rb') as f:
+                text = f.read().decode('utf-8')
+            values = text.split(STRING_SEPARATOR) if meta['rows'] else []
+            loaded[name] = np.array(values, dtype=object)
+
+    index = np.load(os.path.join(path, 'index.npy'), mmap_mode='r')
+    return pd.DataFrame(loaded, index=index, columns=[spec['name'] for spec in specs], copy=False)
+
+
+def _write_columns(path: str, df: pd.DataFrame, source: Optional[str]) -> bool:
+    """
+    Write df into the existing directory path in the column layout; False if
+    a string column cannot be represented (it contains STRING_SEPARATOR).
+    """
+    specs = []
+    for name in df.columns:
+        series = df[name]
+        if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            np.save(os.path.join(path, f"{name}.npy"), series.to_numpy())
+            specs.append({'name': name, 'kind': 'numeric'})
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(path, f"{name}.codes.npy"), series.cat.codes.to_numpy())
+            specs.append({'name': name, 'kind': 'categorical', 'dtype': 'category',
+                          'categories': series.cat.categories.tolist()})
+        elif series.nunique(dropna=False) <= max(1, len(series) // 2):
+            codes, categories = pd.factorize(series, use_na_sentinel=False)
+            np.save(os.path.join(path, f"{name}.codes.npy"), codes.astype(np.int32))
+            specs.append({'name': name, 'kind': 'categorical', 'categories': list(categories)})
+        else:
+            values = series.astype(str).tolist()
+            if any(STRING_SEPARATOR in v for v in values):
+                # Not representable in the separator-delimited layout
+                return False
+            with open(os.path.join(path, f"{name}.utf8"), 'wb') as f:
+                f.write(STRING_SEPARATOR.join(values).encode('utf-8'))
+            specs.append({'name': name, 'kind': 'string'})
+
+    np.save(os.path.join(path, 'index.npy'), df.index.to_numpy())
+    with open(os.path.join(path, META_FILE), 'w') as f:
+        json.dump({'rows': len(df), 'columns': specs, 'source': source}, f)
+    return True
+
+
+def write_frame(path: str, df: pd.DataFrame, source: Optional[str] = None) -> Optional[str]:
+    """
+    Write a frame to path in the column layout, readable with read_frame().
+    The directory is built beside path and renamed into place, replacing any
+    previous one. Returns path, or None if the frame cannot be represented.
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+    try:
+        if not _write_columns(tmp_path, df, source):
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return None
+        os.chmod(tmp_path, 0o755)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+        return path
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+class ColumnCache:
+    """
+    On-disk columnar cache of processed frames.
+    Each entry is a directory of .npy column files that are memory-mapped on
+    load, so a warm start skips JSON parsing and flattening entirely.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def _source_tag(self, data_file: str) -> str:
+        return hashlib.sha256(os.path.abspath(data_file).encode('utf-8')).hexdigest()[:12]
+
+    def entry_path(self, data_file: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{self._source_tag(data_file)}-{key}")
+
+    def load_frame(self, data_file: str, key: str) -> Optional[pd.DataFrame]:
+        """Memory-map a cached frame, or return None on a miss."""
+        return read_frame(self.entry_path(data_file, key))
+
+    def store_frame(self, data_file: str, key: str, df: pd.DataFrame) -> Optional[str]:
+        """Write a frame as a cache entry, replacing stale entries for the same source."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+        try:
+            if not _write_columns(tmp_path, df, os.path.abspath(data_file)):
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                return None
+            # mkdtemp creates 0700; let other users sharing the cache read the entry, as write_frame does
+            os.chmod(tmp_path, 0o755)
+            self.invalidate(data_file)
+            final_path = self.entry_path(data_file, key)
+            os.rename(tmp_path, final_path)
+            return final_path
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+    def load_json(self, data_file: str, key: str, artifact: str) -> Optional[Dict[str, Any]]:
+        """Load a small JSON artifact (e.g. a validation report) stored alongside an entry."""
+        path = os.path.join(self.cache_dir, f"{self._source_tag(data_file)}-{key}.{artifact}.json")
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def store_json(self, data_file: str, key: str, artifact: str, payload: Dict[str, Any]):
+        """Atomically store a JSON artifact keyed like a frame entry."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tag = self._source_tag(data_file)
+        prefix = f"{tag}-"
+        suffix = f".{artifact}.json"
+        for entry in os.listdir(self.cache_dir):
+            if entry.startswith(prefix) and entry.endswith(suffix):
+                os.remove(os.path.join(self.cache_dir, entry))
+        path = os.path.join(self.cache_dir, f"{tag}-{key}{suffix}")
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=self.cache_dir)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(payload, f, default=str)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+
+    def invalidate(self, data_file: str):
+        """Remove every frame entry cached for a source file."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        prefix = f"{self._source_tag(data_file)}-"
+        for entry in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, entry)
+            if entry.startswith(prefix) and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,376 @@
+import json
+from itertools import repeat
+from operator import itemgetter
+from typing import Dict, List, Any, Tuple, Optional, Callable
+import numpy as np
+import pandas as pd
+
+REQUIRED_FIELDS = ['name', 'acceptance_rate', 'tuition', 'sat_average', 'enrollment', 'demographics', 'location']
+
+# field -> (lower, upper, message); bounds are inclusive and None leaves a side open
+RANGE_RULES = {
+    'acceptance_rate': (0, 100, 'Invalid acceptance rate'),
+    'tuition': (0, None, 'Invalid tuition'),
+    'sat_average': (400, 1600, 'Invalid SAT score'),
+    'enrollment': (0, None, 'Invalid enrollment'),
+}
+HIGH_TUITION_WARNING = 80000
+DEMOGRAPHIC_RANGE = (0, 100)
+DEMOGRAPHIC_SUM_TOLERANCE = 1
+
+# Examples kept per (rule, field) in a report; None keeps every finding
+DEFAULT_MAX_EXAMPLES = 20
+DEFAULT_VALIDATION_CHUNK = 100_000
+
+# Position of each finding within a row, so messages come out in the same
+# order as the per-record validator produced them
+_RANGE_SLOT = len(REQUIRED_FIELDS)
+_DEMOGRAPHIC_SLOT = _RANGE_SLOT + len(RANGE_RULES)
+_DUPLICATE_SLOT = np.iinfo(np.int64).max
+
+# Stands in for an absent field in extracted columns
+MISSING = object()
+
+
+def numeric_values(values: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Float view of a column plus a mask of the entries that are numbers
+    (int, float or bool, as isinstance(v, (int, float)) accepts).
+    """
+    try:
+        arr = np.asarray(values)
+    except (ValueError, TypeError, OverflowError):
+        arr = None
+    if arr is not None and arr.ndim == 1 and arr.dtype.kind in 'biuf':
+        return arr.astype(np.float64), np.ones(len(arr), dtype=bool)
+    # Mixed column (missing fields, strings, None...): classify by the few distinct types
+    n = len(values)
+    codes, types = pd.factorize(np.fromiter(map(type, values), dtype=object, count=n))
+    is_number = np.array([issubclass(t, (int, float)) for t in types], dtype=bool)[codes]
+    numbers = np.full(n, np.nan)
+    numbers[is_number] = np.fromiter(values, dtype=object, count=n)[is_number].astype(np.float64)
+    return numbers, is_number
+
+
+def field_values(records: List[Dict[str, Any]], field: str) -> List[Any]:
+    """One field across a list of dicts, with MISSING where it is absent."""
+    try:
+        return list(map(itemgetter(field), records))
+    except KeyError:
+        return [record.get(field, MISSING) for record in records]
+
+
+def _present(values: List[Any]) -> np.ndarray:
+    mask = np.ones(len(values), dtype=bool)
+    if values.count(MISSING):
+        mask[[i for i, v in enumerate(values) if v is MISSING]] = False
+    return mask
+
+
+def _out_of_range(numbers: np.ndarray, low, high) -> np.ndarray:
+    # NaN compares False on both sides, so it passes like it did per record
+    bad = np.zeros(len(numbers), dtype=bool)
+    if low is not None:
+        bad |= numbers < low
+    if high is not None:
+        bad |= numbers > high
+    return bad
+
+
+def _label(row: int, name: Any) -> str:
+    return f"College {row} ({'Unknown' if name is MISSING else name})"
+
+
+class RuleLog:
+    """
+    Findings of one (rule, field): the total count plus a uniform random
+    sample of at most max_examples of them. Sampling gives every finding a
+    random priority and keeps the lowest, so the sample is a reservoir that
+    can be topped up chunk by chunk.
+    """
+
+    def __init__(self, rule: str, field: str, severity: str, describe: Callable[[int, Any, Any], str]):
+        self.rule = rule
+        self.field = field
+        self.severity = severity
+        self.describe = describe
+        self.count = 0
+        self.rows = np.empty(0, dtype=np.int64)
+        self.slots = np.empty(0, dtype=np.int64)
+        self.priorities = np.empty(0)
+        self.values: List[Any] = []
+        self.names: List[Any] = []
+
+    def keep(self, rows: np.ndarray, slots: np.ndarray, priorities: np.ndarray,
+             values: List[Any], names: List[Any], max_examples: Optional[int]):
+        """Add sampled candidates, evicting the highest priorities beyond max_examples."""
+        self.rows = np.concatenate([self.rows, rows])
+        self.slots = np.concatenate([self.slots, slots])
+        self.priorities = np.concatenate([self.priorities, priorities])
+        self.values.extend(values)
+        self.names.extend(names)
+        if max_examples is not None and len(self.rows) > max_examples:
+            kept = np.sort(np.argpartition(self.priorities, max_examples - 1)[:max_examples])
+            self.rows, self.slots, self.priorities = self.rows[kept], self.slots[kept], self.priorities[kept]
+            self.values = [self.values[i] for i in kept]
+            self.names = [self.names[i] for i in kept]
+
+    def examples(self) -> List[Dict[str, Any]]:
+        """Sampled findings as structured records, in row order."""
+        return [{
+            'row': int(self.rows[i]),
+            'field': self.field,
+            'rule': self.rule,
+            'value': None if self.values[i] is MISSING else self.values[i],
+            'message': self.describe(int(self.rows[i]), self.names[i], self.values[i]),
+        } for i in np.argsort(self.rows, kind='stable')]
+
+
+class ColumnarValidator:
+    """
+    Validates parsed college entries column by column, one chunk at a time.
+
+    Each rule runs as one vectorized mask over the chunk; duplicate names are
+    found with a hash index over every chunk. Findings are structured
+    (row, field, rule, value) and aggregated per rule: the report keeps
+    counts plus at most max_examples sampled findings per rule, and the full
+    detail can be streamed to an NDJSON file, so report memory is bounded
+    however broken the feed is. With max_examples=None the report has the
+    same errors and warnings, in the same order, as validating entry by entry.
+    """
+
+    def __init__(self, max_examples: Optional[int] = DEFAULT_MAX_EXAMPLES,
+                 detail_path: Optional[str] = None, seed: int = 0):
+        self.max_examples = max_examples
+        self.total = 0
+        self.colleges_with_errors = 0
+        self.colleges_with_warnings = 0
+        self.rules: Dict[Tuple[str, str], RuleLog] = {}
+        self._names: List[Any] = []
+        self._rng = np.random.default_rng(seed)
+        self._detail = open(detail_path, 'w') if detail_path else None
+        self._chunk_rows: Dict[str, List[np.ndarray]] = {}
+        self._chunk_detail: List[Tuple[int, int, str]] = []
+
+    def _record(self, rule: str, field: str, severity: str, describe: Callable[[int, Any, Any], str],
+                rows: np.ndarray, slots, value_at: Callable[[int], Tuple[Any, Any]]):
+        """
+        Log the findings of one rule over a chunk. rows are source row indices;
+        value_at(j) returns the (value, name) of the j-th finding and is only
+        called for findings that are sampled or written to the detail stream.
+        """
+        log = self.rules.get((rule, field))
+        if log is None:
+            log = self.rules[(rule, field)] = RuleLog(rule, field, severity, describe)
+        n = len(rows)
+        if not n:
+            return
+        rows = np.asarray(rows, dtype=np.int64)
+        slots = np.broadcast_to(np.asarray(slots, dtype=np.int64), (n,))
+        log.count += n
+        self._chunk_rows.setdefault(severity, []).append(rows)
+
+        if self._detail is not None:
+            for j in range(n):
+                value, name = value_at(j)
+                row = int(rows[j])
+                self._chunk_detail.append((row, int(slots[j]), json.dumps({
+                    'row': row, 'field': field, 'rule': rule, 'severity': severity,
+                    'value': None if value is MISSING else value,
+                    'message': describe(row, name, value),
+                }, default=str)))
+
+        if self.max_examples is None:
+            candidates = np.arange(n)
+            priorities = np.zeros(n)
+        else:
+            if not self.max_examples:
+                return
+            priorities = self._rng.random(n)
+            candidates = np.arange(n)
+            if n > self.max_examples:
+                candidates = np.sort(np.argpartition(priorities, self.max_examples - 1)[:self.max_examples])
+            if len(log.rows) >= self.max_examples:
+                candidates = candidates[priorities[candidates] < log.priorities.max()]
+        pairs = [value_at(j) for j in candidates]
+        log.keep(rows[candidates], slots[candidates], priorities[candidates],
+                 [value for value, _ in pairs], [name for _, name in pairs], self.max_examples)
+
+    def _end_chunk(self):
+        # Chunks cover disjoint rows, so distinct flagged rows add up across chunks
+        for severity, rows in self._chunk_rows.items():
+            flagged = len(np.unique(np.concatenate(rows)))
+            if severity == 'error':
+                self.colleges_with_errors += flagged
+            else:
+                self.colleges_with_warnings += flagged
+        self._chunk_rows = {}
+        if self._detail is not None and self._chunk_detail:
+            self._chunk_detail.sort(key=lambda entry: entry[:2])
+            self._detail.writelines(line + '\n' for _, _, line in self._chunk_detail)
+            self._chunk_detail = []
+
+    def validate_chunk(self, records: List[Any]) -> Dict[str, Any]:
+        """
+        Validate the next chunk of entries. Returns the extracted columns:
+        raw field values (MISSING where absent), a float array per numeric
+        field and per demographic key (NaN where absent or not a number).
+        """
+        if not all(map(isinstance, records, repeat(dict))):
+            records = [record if isinstance(record, dict) else {} for record in records]
+        n = len(records)
+        offset = self.total
+        self.total += n
+
+        columns = {field: field_values(records, field) for field in REQUIRED_FIELDS}
+        present = {field: _present(values) for field, values in columns.items()}
+        names = columns['name']
+        numbers_by_field = {}
+        demographic_numbers: Dict[str, np.ndarray] = {}
+
+        # Required fields
+        for slot, field in enumerate(REQUIRED_FIELDS):
+            rows = np.flatnonzero(~present[field])
+            self._record('missing_field', field, 'error',
+                         lambda row, name, value, field=field: f"College {row}: Missing required field '{field}'",
+                         rows + offset, slot, lambda j, rows=rows: (MISSING, names[rows[j]]))
+
+        # Range rules
+        for position, (field, (low, high, message)) in enumerate(RANGE_RULES.items()):
+            values = columns[field]
+            numbers, is_number = numeric_values(values)
+            numbers_by_field[field] = numbers
+            describe = lambda row, name, value, message=message: f"{_label(row, name)}: {message} {value}"
+            not_number = present[field] & ~is_number
+            out_of_range = _out_of_range(numbers, low, high)
+            for rule, flagged in (('not_numeric', not_number), ('out_of_range', out_of_range)):
+                rows = np.flatnonzero(flagged)
+                self._record(rule, field, 'error', describe, rows + offset, _RANGE_SLOT + position,
+                             lambda j, rows=rows: (values[rows[j]], names[rows[j]]))
+            if field == 'tuition':
+                rows = np.flatnonzero(is_number & ~out_of_range & (numbers > HIGH_TUITION_WARNING))
+                self._record('high_tuition', field, 'warning',
+                             lambda row, name, value: f"{_label(row, name)}: Very high tuition ${value:,}",
+                             rows + offset, 0, lambda j, rows=rows: (values[rows[j]], names[rows[j]]))
+
+        # Demographics: rows are grouped by key layout so each group is a dense matrix
+        demographics = columns['demographics']
+        demo_rows = np.flatnonzero(np.fromiter(map(isinstance, demographics, repeat(dict)), dtype=bool, count=n))
+        dicts = [demographics[i] for i in demo_rows]
+        layouts = np.fromiter(map(tuple, dicts), dtype=object, count=len(dicts))
+        codes, keys_by_layout = pd.factorize(layouts) if len(layouts) else (np.empty(0, dtype=np.int64), [])
+        for code, keys in enumerate(keys_by_layout):
+            members = np.flatnonzero(codes == code)
+            rows = demo_rows[members]
+            matrix = np.empty((len(rows), len(keys)), dtype=object)
+            if len(keys):
+                matrix[:] = list(map(tuple, map(dict.values, (dicts[j] for j in members))))
+            numbers = np.empty((len(rows), len(keys)), dtype=np.float64)
+            all_numbers = np.ones(len(rows), dtype=bool)
+            for k, key in enumerate(keys):
+                values = matrix[:, k].tolist()
+                numbers[:, k], is_number = numeric_values(values)
+                all_numbers &= is_number
+                if key not in demographic_numbers:
+                    demographic_numbers[key] = np.full(n, np.nan)
+                demographic_numbers[key][rows] = numbers[:, k]
+                describe = (lambda row, name, value, key=key:
+                            f"{_label(row, name)}: Invalid demographic percentage for {key}: {value}")
+                out_of_range = _out_of_range(numbers[:, k], *DEMOGRAPHIC_RANGE)
+                for rule, flagged in (('not_numeric', ~is_number), ('out_of_range', out_of_range)):
+                    bad = np.flatnonzero(flagged)
+                    self._record(rule, f"demographics.{key}", 'error', describe, rows[bad] + offset,
+                                 _DEMOGRAPHIC_SLOT + k,
+                                 lambda j, bad=bad, values=values, rows=rows: (values[bad[j]], names[rows[bad[j]]]))
+            # Non-numeric shares cannot be summed; they are already reported above
+            totals = numbers.sum(axis=1)
+            off = np.flatnonzero(all_numbers & (np.abs(totals - 100) > DEMOGRAPHIC_SUM_TOLERANCE))
+            self._record('demographics_sum', 'demographics', 'warning',
+                         lambda row, name, value:
+                             f"{_label(row, name)}: Demographics don't sum to 100% (sum: {value:.1f}%)",
+                         rows[off] + offset, 1,
+                         lambda j, off=off, rows=rows, totals=totals: (float(totals[off[j]]), names[rows[off[j]]]))
+
+        self._names.extend(f'College_{offset + i}' if name is MISSING else name for i, name in enumerate(names))
+        self._end_chunk()
+        return {'columns': columns, 'numbers': numbers_by_field, 'demographics': demographic_numbers}
+
+    def _record_duplicates(self):
+        # Duplicate names via a hash index; each name is reported once, at its first row
+        keyed = pd.Series(self._names, dtype=object)
+        repeated = keyed.duplicated(keep=False).to_numpy()
+        first_rows = np.flatnonzero(repeated & ~keyed.duplicated(keep='first').to_numpy())
+        self._record('duplicate_name', 'name', 'warning',
+                     lambda row, name, value: f"Duplicate college name: {value}",
+                     first_rows, _DUPLICATE_SLOT, lambda j: (self._names[first_rows[j]], None))
+        self._names = []
+        # Name duplicates are not per-entry findings, so they do not count as flagged colleges
+        self._chunk_rows = {}
+        if self._detail is not None:
+            self._end_chunk()
+            self._detail.close()
+            self._detail = None
+
+    def close(self):
+        """Close the detail stream without reporting, e.g. when the source cannot be read."""
+        if self._detail is not None:
+            self._detail.close()
+            self._detail = None
+
+    def report(self) -> Dict[str, Any]:
+        """Assemble the validation report; call once, after the last chunk."""
+        self._record_duplicates()
+        messages = {'error': [], 'warning': []}
+        for severity in messages:
+            examples = [(example['row'], slot, example['message'])
+                        for log in self.rules.values() if log.severity == severity
+                        for example, slot in zip(log.examples(), log.slots[np.argsort(log.rows, kind='stable')])]
+            examples.sort(key=lambda example: (example[1] == _DUPLICATE_SLOT, example[0], example[1]))
+            messages[severity] = [message for _, _, message in examples]
+
+        total_errors = sum(log.count for log in self.rules.values() if log.severity == 'error')
+        total_warnings = sum(log.count for log in self.rules.values() if log.severity == 'warning')
+        summary = {
+            'total_colleges': self.total,
+            'colleges_with_errors': self.colleges_with_errors,
+            'colleges_with_warnings': self.colleges_with_warnings,
+            'total_errors': total_errors,
+            'total_warnings': total_warnings
+        }
+
+        return {
+            'valid': total_errors == 0,
+            'errors': messages['error'],
+            'warnings': messages['warning'],
+            'summary': summary,
+            'by_rule': {
+                f"{log.rule}:{log.field}": {
+                    'rule': log.rule,
+                    'field': log.field,
+                    'severity': log.severity,
+                    'count': log.count,
+                    'examples': log.examples(),
+                }
+                for log in self.rules.values() if log.count
+            },
+        }
+
+
+def source_error_report(message: str) -> Dict[str, Any]:
+    """The failed report for a source that cannot be read or parsed at all."""
+    return {
+        'valid': False,
+        'errors': [message],
+        'warnings': [],
+        'summary': {}
+    }
+
+
+def validate_records(records: List[Any], max_examples: Optional[int] = DEFAULT_MAX_EXAMPLES,
+                     detail_path: Optional[str] = None,
+                     chunk_size: int = DEFAULT_VALIDATION_CHUNK) -> Dict[str, Any]:
+    """Validate a list of parsed college entries, chunk by chunk."""
+    validator = ColumnarValidator(max_examples, detail_path)
+    for start in range(0, len(records), chunk_size):
+        validator.validate_chunk(records[start:start + chunk_size])
+    return validator.report()
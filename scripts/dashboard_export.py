@@ -0,0 +1,124 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+from typing import Dict, List, Any
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip variants are always written
+    brotli = None
+
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 1
+PAGED_SECTION = 'tuition_analysis'
+DEFAULT_PAGE_SIZE = 5000
+# Points in the downsampled overview of the paged section
+DEFAULT_OVERVIEW_POINTS = 1000
+HASH_LENGTH = 16
+# Names this exporter writes: <section>.<hash prefix>.json plus compressed variants
+HASHED_FILE = re.compile(rf"^[\w.]+\.[0-9a-f]{{{HASH_LENGTH}}}\.json(\.gz|\.br)?$")
+
+
+def _encode(payload: Any) -> bytes:
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def _write_atomic(path: str, data: bytes):
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    # mkstemp creates 0600; the files are meant to be served as static assets
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+
+
+def _write_content_addressed(output_dir: str, stem: str, payload: Any) -> Dict[str, Any]:
+    """
+    Write one JSON document named by its content hash, plus gzip (and brotli
+    when available) variants. Unchanged content keeps its name, so clients can
+    cache every file except the manifest indefinitely.
+    """
+    data = _encode(payload)
+    digest = hashlib.sha256(data).hexdigest()
+    name = f"{stem}.{digest[:HASH_LENGTH]}.json"
+    entry = {'file': name, 'bytes': len(data), 'sha256': digest, 'encodings': {}}
+
+    path = os.path.join(output_dir, name)
+    if not os.path.exists(path):
+        _write_atomic(path, data)
+    variants = {'gzip': ('.gz', lambda: gzip.compress(data, compresslevel=9, mtime=0))}
+    if brotli is not None:
+        variants['br'] = ('.br', lambda: brotli.compress(data, quality=11))
+    for encoding, (suffix, compress) in variants.items():
+        variant = name + suffix
+        variant_path = os.path.join(output_dir, variant)
+        if not os.path.exists(variant_path):
+            _write_atomic(variant_path, compress())
+        entry['encodings'][encoding] = {'file': variant, 'bytes': os.path.getsize(variant_path)}
+    return entry
+
+
+def _overview(rows: List[Dict[str, Any]], points: int) -> List[Dict[str, Any]]:
+    """Evenly spaced rows, so the overview is stable for unchanged data."""
+    if len(rows) <= points:
+        return rows
+    step = len(rows) / points
+    return [rows[int(i * step)] for i in range(points)]
+
+
+def _remove_stale(output_dir: str, manifest: Dict[str, Any]):
+    # Drop hashed files no longer referenced by the new manifest; anything
+    # else in output_dir (source data, other exports) is left alone
+    referenced = {MANIFEST_FILE}
+    entries = list(manifest['sections'].values())
+    paged = manifest.get(PAGED_SECTION)
+    if paged:
+        entries += paged['pages'] + [paged['overview']]
+    for entry in entries:
+        referenced.add(entry['file'])
+        referenced.update(variant['file'] for variant in entry['encodings'].values())
+    for name in os.listdir(output_dir):
+        if name not in referenced and HASHED_FILE.match(name):
+            os.remove(os.path.join(output_dir, name))
+
+
+def write_dashboard_sections(dashboard_data: Dict[str, Any], output_dir: str = 'dashboard_data',
+                             page_size: int = DEFAULT_PAGE_SIZE,
+                             overview_points: int = DEFAULT_OVERVIEW_POINTS) -> Dict[str, Any]:
+    """
+    Export dashboard data as one content-hashed file per section plus a small
+    manifest.json listing them. The per-college tuition_analysis rows are
+    split into pages of page_size and a downsampled overview, so a chart can
+    render from the overview and fetch pages only on demand.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {'version': MANIFEST_VERSION, 'sections': {}}
+
+    for section, payload in dashboard_data.items():
+        if section == PAGED_SECTION:
+            continue
+        manifest['sections'][section] = _write_content_addressed(output_dir, section, payload)
+
+    if PAGED_SECTION in dashboard_data:
+        rows = dashboard_data[PAGED_SECTION]
+        pages = []
+        for page, start in enumerate(range(0, len(rows), page_size)):
+            entry = _write_content_addressed(output_dir, f"{PAGED_SECTION}.{page}", rows[start:start + page_size])
+            entry['rows'] = len(rows[start:start + page_size])
+            pages.append(entry)
+        overview = _overview(rows, overview_points)
+        overview_entry = _write_content_addressed(output_dir, f"{PAGED_SECTION}.overview", overview)
+        overview_entry['rows'] = len(overview)
+        manifest[PAGED_SECTION] = {
+            'rows': len(rows),
+            'page_size': page_size,
+            'pages': pages,
+            'overview': overview_entry,
+        }
+
+    _write_atomic(os.path.join(output_dir, MANIFEST_FILE), json.dumps(manifest, indent=2).encode('utf-8'))
+    _remove_stale(output_dir, manifest)
+    return manifest
@@ -1,8 +1,23 @@
 import json
+import os
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterator, Optional
 import statistics
+from stream_ingest import iter_column_chunks, COLUMNS, NUMERIC_COLUMNS, DEFAULT_CHUNK_SIZE
+from column_cache import ColumnCache, source_fingerprint
+from aggregates import ColumnAggregates, summarize_columns, AGGREGATE_COLUMNS, CORRELATION_PAIRS
+from cleaning import CLEANING_RULES, clean_frame, rejection_codes, rejection_counts
+from sharded import ShardedAggregate, run_sharded as aggregate_shards, aggregate_stream
+from sketches import SketchSet, DEFAULT_SKETCH_K, DEFAULT_SKETCH_SEED
+from rollup_cube import RollupCube, regional_summary
+from ingest import IngestResult, ingest_source
+from data_validator import validation_cache_key
+from columnar_validation import DEFAULT_MAX_EXAMPLES
+from metric_index import MetricIndex, METRIC_INDEX_VERSION, DEFAULT_INDEX_PARTITIONS
+from similarity import SimilarityIndex
+from instrumentation import traced, span, current_span
+from exporters import export_frame, output_bytes, compression_for, default_output_path, EXPORT_FORMATS
 
 class CollegeDataProcessor:
     """
@@ -10,25 +25,75 @@ class CollegeDataProcessor:
     Handles data cleaning, validation, and statistical computations.
     """
     
-    def __init__(self, data_file: str = 'college_admissions_data.json'):
-        """Initialize with data file path."""
+    def __init__(self, data_file: str = 'college_admissions_data.json', chunk_size: Optional[int] = None,
+                 cache_dir: Optional[str] = None, workers: Optional[int] = None,
+                 approximate: bool = False, sketch_k: int = DEFAULT_SKETCH_K):
+        """
+        Initialize with data file path.
+        Passing chunk_size enables streaming ingest: the source (JSON array or
+        NDJSON) is parsed incrementally instead of with a single json.load.
+        Passing cache_dir enables the on-disk columnar cache of the cleaned frame.
+        Passing workers computes statistics, regional analysis and correlations
+        across a process pool when no frame has been loaded.
+        Setting approximate serves medians, percentiles and histograms from
+        mergeable KLL sketches (rank error about sketches.rank_error(sketch_k));
+        combined with chunk_size it aggregates in constant memory.
+        """
         self.data_file = data_file
+        self.chunk_size = chunk_size
+        self.cache = ColumnCache(cache_dir) if cache_dir else None
+        self.workers = workers
+        self.approximate = approximate
+        self.sketch_k = sketch_k
+        self._sharded = None
+        self._sketches = None
+        self._sketches_source = None
         self.data = None
         self.df = None
+        self._aggregates = None
+        self._aggregates_source = None
+        self._cube = None
+        self._cube_source = None
+        self._metric_index = None
+        self._metric_index_source = None
+        self._similarity = None
+        self._similarity_source = None
+        self._name_positions = None
+        self._name_positions_source = None
+        self.validation_report = None
+        self.ingest_result = None
         
+    @traced('processor.load_data')
     def load_data(self) -> Dict[str, Any]:
         """Load college data from JSON file."""
         try:
             with open(self.data_file, 'r') as f:
                 self.data = json.load(f)
+            current_span().set(rows_out=len(self.data))
             print(f"Loaded data for {len(self.data)} colleges")
             return self.data
         except FileNotFoundError:
             print(f"Data file {self.data_file} not found. Please run generate_sample_data.py first.")
             return None
     
+    def iter_chunks(self, chunk_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """Stream the data file as flattened DataFrame chunks of bounded size."""
+        return iter_column_chunks(self.data_file, chunk_size or self.chunk_size or DEFAULT_CHUNK_SIZE)
+    
+    @traced('processor.create_dataframe')
     def create_dataframe(self) -> pd.DataFrame:
         """Convert JSON data to pandas DataFrame for analysis."""
+        if not self.data and self.chunk_size:
+            try:
+                chunks = list(self.iter_chunks())
+            except FileNotFoundError:
+                print(f"Data file {self.data_file} not found. Please run generate_sample_data.py first.")
+                return None
+            self.df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=COLUMNS)
+            current_span().set(rows_out=len(self.df), streamed=True)
+            print(f"Streamed data for {len(self.df)} colleges")
+            return self.df
+        
         if not self.data:
             self.load_data()
         
@@ -52,124 +117,383 @@ class CollegeDataProcessor:
             flattened_data.append(row)
         
         self.df = pd.DataFrame(flattened_data)
+        current_span().set(rows_in=len(self.data), rows_out=len(self.df))
         return self.df
     
+    @traced('processor.clean_data')
     def clean_data(self) -> pd.DataFrame:
         """Clean and validate the dataset."""
+        cache_key = None
+        if self.cache is not None and self.df is None and not self.data:
+            try:
+                cache_key = source_fingerprint(self.data_file, CLEANING_RULES)
+            except FileNotFoundError:
+                cache_key = None
+            if cache_key is not None:
+                cached = self.cache.load_frame(self.data_file, cache_key)
+                if cached is not None:
+                    self.df = cached
+                    current_span().set(rows_out=len(self.df), cache_hit=True)
+                    print(f"Loaded {len(self.df)} cleaned colleges from cache.")
+                    return self.df
+        
         if self.df is None:
             self.create_dataframe()
         
-        # Remove any rows with missing critical data
-        self.df = self.df.dropna(subset=['acceptance_rate', 'tuition', 'sat_average'])
+        stage = current_span()
+        codes = None
+        if stage.recording:
+            # Per-rule drop counts only cost anything while tracing
+            codes = rejection_codes(self.df)
+            stage.set(rows_in=len(self.df), dropped=rejection_counts(codes))
+        self.df = clean_frame(self.df, codes)
+        stage.set(rows_out=len(self.df))
         
-        # Validate acceptance rates (should be 0-100)
-        self.df = self.df[self.df['acceptance_rate'].between(0, 100)]
+        print(f"Data cleaned. {len(self.df)} colleges remain after validation.")
         
-        # Validate SAT scores (should be 400-1600)
-        self.df = self.df[self.df['sat_average'].between(400, 1600)]
+        if cache_key is not None:
+            self.cache.store_frame(self.data_file, cache_key, self.df)
+        return self.df
+    
+    @traced('processor.ingest')
+    def ingest(self, max_examples: Optional[int] = DEFAULT_MAX_EXAMPLES,
+               detail_file: Optional[str] = None) -> IngestResult:
+        """
+        Parse the source once into both the validation report and the cleaned
+        frame, recording why each dropped row was rejected. With a cache the
+        frame and report are stored where clean_data() and DataValidator look.
+        max_examples and detail_file are as for DataValidator.
+        """
+        result = ingest_source(self.data_file, self.chunk_size or DEFAULT_CHUNK_SIZE, max_examples, detail_file)
+        self.ingest_result = result
+        self.validation_report = result.report
+        self.df = result.frame
+        summary = result.report['summary']
+        if not summary:
+            # The source could not be read; the report says why
+            print(f"Could not ingest {self.data_file}: {result.report['errors'][0]}")
+            return result
+        current_span().set(rows_in=summary['total_colleges'], rows_out=len(self.df),
+                           dropped=result.rejection_counts(), errors=summary['total_errors'],
+                           warnings=summary['total_warnings'])
         
-        # Validate tuition (should be positive)
-        self.df = self.df[self.df['tuition'] > 0]
+        print(f"Ingested {summary['total_colleges']} colleges: "
+              f"{len(self.df)} kept, {len(result.rejected_rows)} rejected, "
+              f"{summary['total_errors']} validation errors.")
         
-        print(f"Data cleaned. {len(self.df)} colleges remain after validation.")
-        return self.df
+        if self.cache is not None:
+            self.cache.store_frame(self.data_file, source_fingerprint(self.data_file, CLEANING_RULES), self.df)
+            self.cache.store_json(self.data_file, validation_cache_key(self.data_file, max_examples),
+                                  'validation', result.report)
+        return result
+    
+    def get_aggregates(self) -> ColumnAggregates:
+        """
+        Fused single-pass moments, extrema and co-moments for all numeric columns.
+        Computed once per cleaned frame and shared by the statistics and correlations.
+        """
+        if self.df is None:
+            self.clean_data()
+        
+        if self._aggregates is None or self._aggregates_source is not self.df:
+            with span('processor.build_aggregates', rows=len(self.df)):
+                self._aggregates = ColumnAggregates.from_frame(self.df, AGGREGATE_COLUMNS)
+            self._aggregates_source = self.df
+        return self._aggregates
+    
+    def get_sketches(self) -> SketchSet:
+        """KLL quantile sketches for every numeric column of the cleaned data."""
+        if self._use_sharded():
+            return self.run_sharded().sketches
+        
+        if self.df is None:
+            self.clean_data()
+        
+        if self._sketches is None or self._sketches_source is not self.df:
+            with span('processor.build_sketches', rows=len(self.df), k=self.sketch_k):
+                self._sketches = SketchSet.from_frame(self.df, AGGREGATE_COLUMNS, self.sketch_k, DEFAULT_SKETCH_SEED)
+            self._sketches_source = self.df
+        return self._sketches
+    
+    @traced('processor.run_sharded')
+    def run_sharded(self, workers: Optional[int] = None) -> ShardedAggregate:
+        """
+        Split the input into shards, aggregate them in a process pool and merge
+        the partial results. Without workers the shards are the streamed chunks,
+        aggregated in this process. The merged aggregate is kept for later calls.
+        """
+        if self._sharded is None or workers is not None:
+            workers = workers or self.workers
+            chunk_size = self.chunk_size or DEFAULT_CHUNK_SIZE
+            sketch_k = self.sketch_k if self.approximate else None
+            if workers:
+                self._sharded = aggregate_shards(self.data_file, workers, chunk_size, sketch_k,
+                                                 sketch_seed=DEFAULT_SKETCH_SEED)
+            else:
+                self._sharded = aggregate_stream(self.data_file, chunk_size, sketch_k, sketch_seed=DEFAULT_SKETCH_SEED)
+        return self._sharded
     
+    def _use_sharded(self) -> bool:
+        streaming_approximate = self.approximate and bool(self.chunk_size)
+        return self.df is None and (bool(self.workers) or streaming_approximate)
+    
+    @traced('processor.calculate_statistics')
     def calculate_statistics(self) -> Dict[str, Any]:
         """Calculate comprehensive statistics for the dataset."""
+        if self._use_sharded():
+            return self.run_sharded().statistics()
+        
+        aggregates = self.get_aggregates()
+        medians = None
+        if self.approximate:
+            sketches = self.get_sketches()
+            medians = {col: sketches[col].median() for col in NUMERIC_COLUMNS}
+        return summarize_columns(self.df, NUMERIC_COLUMNS, aggregates, medians)
+    
+    def quantiles(self, column: str, qs: List[float]) -> List[float]:
+        """Percentiles of a numeric column (approximate when sketches are enabled)."""
+        if self.approximate:
+            return self.get_sketches()[column].quantiles(qs).tolist()
+        
+        if self.df is None:
+            self.clean_data()
+        return np.nanquantile(self.df[column].to_numpy(dtype=np.float64), qs).tolist()
+    
+    def histogram(self, column: str, bins: int = 8, method: str = 'width') -> List[Dict[str, Any]]:
+        """
+        Equal-width ('width') or equal-count ('depth') histogram of a numeric column,
+        as a list of {'left', 'right', 'count'} bins.
+        """
+        if self.approximate:
+            triples = self.get_sketches()[column].histogram(bins, method)
+        else:
+            if self.df is None:
+                self.clean_data()
+            values = self.df[column].to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            if method == 'width':
+                edges = np.histogram_bin_edges(values, bins=bins)
+            elif method == 'depth':
+                edges = np.quantile(values, np.linspace(0, 1, bins + 1))
+            else:
+                raise ValueError("Supported histogram methods: 'width', 'depth'")
+            counts = np.histogram(values, bins=edges)[0]
+            triples = zip(edges[:-1], edges[1:], counts)
+        return [{'left': float(left), 'right': float(right), 'count': int(count)} for left, right, count in triples]
+    
+    def get_cube(self) -> RollupCube:
+        """
+        Rollup cube of counts, sums and sums of squares over region and state.
+        Built in one pass per cleaned frame; any slice or roll-up is an O(1) lookup.
+        """
         if self.df is None:
             self.clean_data()
         
-        stats = {
-            'acceptance_rate': {
-                'mean': self.df['acceptance_rate'].mean(),
-                'median': self.df['acceptance_rate'].median(),
-                'std': self.df['acceptance_rate'].std(),
-                'min': self.df['acceptance_rate'].min(),
-                'max': self.df['acceptance_rate'].max()
-            },
-            'tuition': {
-                'mean': self.df['tuition'].mean(),
-                'median': self.df['tuition'].median(),
-                'std': self.df['tuition'].std(),
-                'min': self.df['tuition'].min(),
-                'max': self.df['tuition'].max()
-            },
-            'sat_average': {
-                'mean': self.df['sat_average'].mean(),
-                'median': self.df['sat_average'].median(),
-                'std': self.df['sat_average'].std(),
-                'min': self.df['sat_average'].min(),
-                'max': self.df['sat_average'].max()
-            },
-            'enrollment': {
-                'mean': self.df['enrollment'].mean(),
-                'median': self.df['enrollment'].median(),
-                'std': self.df['enrollment'].std(),
-                'min': self.df['enrollment'].min(),
-                'max': self.df['enrollment'].max()
-            }
-        }
+        if self._cube is None or self._cube_source is not self.df:
+            with span('processor.build_cube', rows=len(self.df)):
+                self._cube = RollupCube.build(self.df)
+            self._cube_source = self.df
+        return self._cube
+    
+    def get_metric_index(self, partition_by=DEFAULT_INDEX_PARTITIONS) -> MetricIndex:
+        """
+        Sorted per-metric permutation indexes of the cleaned frame, also split
+        by each partition_by column. Built once per cleaned frame and, with a
+        cache, persisted next to it so a warm start memory-maps the indexes.
+        """
+        if self.df is None:
+            self.clean_data()
         
-        return stats
+        partition_by = tuple(partition_by)
+        if (self._metric_index is not None and self._metric_index_source is self.df
+                and self._metric_index.partition_by == partition_by):
+            return self._metric_index
+        
+        index_cache, cache_key = None, None
+        if self.cache is not None:
+            index_cache = ColumnCache(os.path.join(self.cache.cache_dir, 'metric_index'))
+            try:
+                cache_key = source_fingerprint(self.data_file, {
+                    'cleaning': CLEANING_RULES, 'metric_index': METRIC_INDEX_VERSION,
+                    'partition_by': partition_by})
+            except FileNotFoundError:
+                cache_key = None
+        
+        index = None
+        with span('processor.build_metric_index', rows=len(self.df)) as build:
+            if cache_key is not None:
+                meta = index_cache.load_json(self.data_file, cache_key, 'offsets')
+                frame = index_cache.load_frame(self.data_file, cache_key) if meta else None
+                if frame is not None and meta['rows'] == len(self.df):
+                    index = MetricIndex.from_frame(frame, meta)
+            build.set(cache_hit=index is not None)
+            if index is None:
+                index = MetricIndex.build(self.df, AGGREGATE_COLUMNS, partition_by)
+                if cache_key is not None:
+                    frame, meta = index.to_frame()
+                    index_cache.store_frame(self.data_file, cache_key, frame)
+                    index_cache.store_json(self.data_file, cache_key, 'offsets', meta)
+        
+        self._metric_index = index
+        self._metric_index_source = self.df
+        return index
     
-    def analyze_by_region(self) -> Dict[str, Any]:
-        """Analyze data grouped by geographic region."""
+    def _partition(self, region: Optional[str], state: Optional[str]):
+        if region is not None and state is not None:
+            raise ValueError("Filter by either region or state, not both")
+        if region is not None:
+            return ('region', region)
+        if state is not None:
+            return ('state', state)
+        return None
+    
+    def top_k(self, metric: str, k: int = 10, region: Optional[str] = None,
+              state: Optional[str] = None) -> pd.DataFrame:
+        """The k colleges with the highest metric, in the order DataFrame.nlargest gives."""
+        index = self.get_metric_index()
+        return self.df.iloc[index.top_k(metric, k, self._partition(region, state))]
+    
+    def bottom_k(self, metric: str, k: int = 10, region: Optional[str] = None,
+                 state: Optional[str] = None) -> pd.DataFrame:
+        """The k colleges with the lowest metric, in the order DataFrame.nsmallest gives."""
+        index = self.get_metric_index()
+        return self.df.iloc[index.bottom_k(metric, k, self._partition(region, state))]
+    
+    def rank_of(self, name: str, metric: str, descending: bool = True,
+                region: Optional[str] = None, state: Optional[str] = None) -> Optional[int]:
+        """1-based rank of a college by metric (ties share a rank); None if unknown or missing."""
+        index = self.get_metric_index()
+        position = self._name_position_map().get(name)
+        if position is None:
+            return None
+        value = index.values_at(metric, np.array([position]))[0]
+        return index.rank(metric, value, descending, self._partition(region, state))
+    
+    def range_query(self, bounds: Dict[str, Any], region: Optional[str] = None,
+                    state: Optional[str] = None) -> pd.DataFrame:
+        """
+        Colleges within inclusive (low, high) bounds on one or more metrics,
+        e.g. {'sat_average': (1400, 1500), 'tuition': (None, 40000)}, in row order.
+        """
+        index = self.get_metric_index()
+        return self.df.iloc[index.query(bounds, self._partition(region, state))]
+    
+    def get_similarity_index(self) -> SimilarityIndex:
+        """
+        k-d tree over standardized metric and demographic vectors, for
+        "colleges like this one" searches. Rebuilt lazily when the cleaned
+        frame changes.
+        """
         if self.df is None:
             self.clean_data()
         
-        regional_analysis = {}
-        for region in self.df['region'].unique():
-            region_data = self.df[self.df['region'] == region]
-            regional_analysis[region] = {
-                'count': len(region_data),
-                'avg_acceptance_rate': region_data['acceptance_rate'].mean(),
-                'avg_tuition': region_data['tuition'].mean(),
-                'avg_sat': region_data['sat_average'].mean(),
-                'total_enrollment': region_data['enrollment'].sum()
-            }
+        if self._similarity is None or self._similarity_source is not self.df:
+            with span('processor.build_similarity_index', rows=len(self.df)):
+                self._similarity = SimilarityIndex.build(self.df)
+            self._similarity_source = self.df
+        return self._similarity
+    
+    def _name_position_map(self) -> Dict[str, int]:
+        """College name -> row position of its first row, built once per cleaned frame."""
+        if self.df is None:
+            self.clean_data()
+        if self._name_positions is None or self._name_positions_source is not self.df:
+            self._name_positions = {}
+            for position, name in enumerate(self.df['name'].tolist()):
+                self._name_positions.setdefault(name, position)
+            self._name_positions_source = self.df
+        return self._name_positions
+    
+    def _college_positions(self, names: List[str]) -> np.ndarray:
+        positions = self._name_position_map()
+        missing = [name for name in names if name not in positions]
+        if missing:
+            raise KeyError(f"Unknown colleges: {', '.join(missing[:5])}")
+        return np.array([positions[name] for name in names], dtype=np.int64)
+    
+    def similar_colleges_batch(self, names: List[str], k: int = 10) -> Dict[str, pd.DataFrame]:
+        """
+        The k colleges nearest to each named college (its first row when the
+        name repeats), nearest first with a 'distance' column in standard
+        deviations. All names are answered with one batched tree query.
+        """
+        index = self.get_similarity_index()
+        positions = self._college_positions(list(names))
+        points = index.vectors(self.df, positions)
+        distances, found = index.neighbours_of(positions, k, points)
+        results = {}
+        for name, row_distances, row_found in zip(names, distances, found):
+            present = row_found >= 0
+            results[name] = self.df.iloc[row_found[present]].assign(distance=row_distances[present])
+        return results
+    
+    def similar_colleges(self, name: str, k: int = 10) -> pd.DataFrame:
+        """The k colleges most like the named one; see similar_colleges_batch()."""
+        return self.similar_colleges_batch([name], k)[name]
+    
+    def colleges_within(self, name: str, radius: float) -> pd.DataFrame:
+        """Every other college within radius (in standard deviations) of the named one, nearest first."""
+        index = self.get_similarity_index()
+        position = self._college_positions([name])
+        point = index.vectors(self.df, position)
+        found = index.within(point, radius)[0]
+        found = found[found != position[0]]
+        distances = np.sqrt(((index.vectors(self.df, found) - point) ** 2).sum(axis=1, dtype=np.float64))
+        return self.df.iloc[found].assign(distance=distances)
+    
+    @traced('processor.analyze_by_region')
+    def analyze_by_region(self) -> Dict[str, Any]:
+        """Analyze data grouped by geographic region."""
+        if self._use_sharded():
+            return self.run_sharded().regional_analysis()
         
-        return regional_analysis
+        return regional_summary(self.get_cube())
     
+    @traced('processor.find_correlations')
     def find_correlations(self) -> Dict[str, float]:
         """Find correlations between different metrics."""
-        if self.df is None:
-            self.clean_data()
+        if self._use_sharded():
+            return self.run_sharded().correlations()
         
-        numeric_cols = ['acceptance_rate', 'tuition', 'sat_average', 'enrollment']
-        correlation_matrix = self.df[numeric_cols].corr()
+        # Served from the same fused pass as calculate_statistics
+        aggregates = self.get_aggregates()
         
         correlations = {
-            'tuition_vs_sat': correlation_matrix.loc['tuition', 'sat_average'],
-            'acceptance_rate_vs_sat': correlation_matrix.loc['acceptance_rate', 'sat_average'],
-            'tuition_vs_acceptance_rate': correlation_matrix.loc['tuition', 'acceptance_rate'],
-            'enrollment_vs_acceptance_rate': correlation_matrix.loc['enrollment', 'acceptance_rate']
+            key: aggregates.correlation(a, b) for key, (a, b) in CORRELATION_PAIRS.items()
         }
         
         return correlations
     
-    def export_processed_data(self, format_type: str = 'json') -> str:
-        """Export processed data in specified format."""
+    @traced('processor.export_processed_data')
+    def export_processed_data(self, format_type: str = 'json', output_file: Optional[str] = None,
+                              compression: Optional[str] = None) -> str:
+        """
+        Stream the processed data to output_file (default
+        processed_college_data.<format>[.gz|.zst]) as 'json', 'ndjson', 'csv'
+        or 'columnar'; see exporters.export_frame(). compression is 'gzip' or
+        'zstd', or implied by output_file's suffix.
+        """
         if self.df is None:
             self.clean_data()
         
-        if format_type == 'json':
-            output_file = 'processed_college_data.json'
-            self.df.to_json(output_file, orient='records', indent=2)
-        elif format_type == 'csv':
-            output_file = 'processed_college_data.csv'
-            self.df.to_csv(output_file, index=False)
-        else:
-            raise ValueError("Supported formats: 'json', 'csv'")
+        if compression is None and output_file is not None:
+            compression = compression_for(output_file)
+        if output_file is None:
+            if format_type not in EXPORT_FORMATS:
+                raise ValueError(f"Supported formats: {', '.join(EXPORT_FORMATS)}")
+            output_file = default_output_path('processed_college_data', format_type, compression)
+        export_frame(self.df, output_file, format_type, compression)
+        current_span().set(rows_out=len(self.df), format=format_type, compression=compression,
+                           bytes=output_bytes(output_file))
         
         print(f"Processed data exported to {output_file}")
         return output_file
 
 # Main execution
 if __name__ == "__main__":
-    processor = CollegeDataProcessor()
+    processor = CollegeDataProcessor(cache_dir='.college_cache')
     
-    # Load and process data
-    processor.load_data()
+    # Load and process data (served from the columnar cache when the source is unchanged)
     processor.clean_data()
     
     # Calculate statistics
@@ -1,19 +1,41 @@
+import argparse
 import json
 import sys
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Optional
+from column_cache import ColumnCache, source_fingerprint
+from columnar_validation import validate_records, source_error_report, DEFAULT_MAX_EXAMPLES
+import instrumentation
+from instrumentation import traced, current_span
+
+# Bump whenever a validation rule changes so cached reports are invalidated.
+VALIDATION_RULES_VERSION = 3
+
+
+def validation_cache_key(data_file: str, max_examples: Optional[int] = DEFAULT_MAX_EXAMPLES) -> str:
+    """Cache key of a validation report for the current source file."""
+    return source_fingerprint(data_file, {'validation_rules': VALIDATION_RULES_VERSION,
+                                          'max_examples': max_examples})
 
 class DataValidator:
     """
     Validates college admissions data for consistency and accuracy.
     """
     
-    def __init__(self, data_file: str = 'college_admissions_data.json'):
+    def __init__(self, data_file: str = 'college_admissions_data.json', cache_dir: Optional[str] = None,
+                 max_examples: Optional[int] = DEFAULT_MAX_EXAMPLES, detail_file: Optional[str] = None):
+        """
+        max_examples caps the sampled errors/warnings kept per rule (None keeps all);
+        detail_file streams every finding to an NDJSON file.
+        """
         self.data_file = data_file
+        self.cache = ColumnCache(cache_dir) if cache_dir else None
+        self.max_examples = max_examples
+        self.detail_file = detail_file
         self.errors = []
         self.warnings = []
     
     def validate_college_entry(self, college: Dict[str, Any], index: int) -> Tuple[List[str], List[str]]:
-        """Validate a single college entry."""
+        """Validate a single college entry (validate_dataset uses the columnar engine)."""
         errors = []
         warnings = []
         
@@ -63,64 +85,47 @@ class DataValidator:
         
         return errors, warnings
     
+    @traced('validator.validate_dataset')
     def validate_dataset(self) -> Dict[str, Any]:
-        """Validate the entire dataset."""
+        """Validate the entire dataset, reusing a cached report if the source is unchanged."""
+        result = self._cached_or_validate()
+        summary = result.get('summary', {})
+        current_span().set(rows_in=summary.get('total_colleges', 0), valid=result['valid'],
+                           errors=summary.get('total_errors', len(result['errors'])),
+                           warnings=summary.get('total_warnings', len(result['warnings'])))
+        return result
+    
+    def _cached_or_validate(self) -> Dict[str, Any]:
+        # A cached report cannot reproduce the detail stream
+        if self.cache is None or self.detail_file:
+            return self._validate_source()
+        
+        try:
+            cache_key = validation_cache_key(self.data_file, self.max_examples)
+        except FileNotFoundError:
+            return self._validate_source()
+        
+        result = self.cache.load_json(self.data_file, cache_key, 'validation')
+        current_span().set(cache_hit=result is not None)
+        if result is None:
+            result = self._validate_source()
+            self.cache.store_json(self.data_file, cache_key, 'validation', result)
+        return result
+    
+    def _validate_source(self) -> Dict[str, Any]:
+        """Parse and validate the source file."""
         try:
             with open(self.data_file, 'r') as f:
                 data = json.load(f)
         except FileNotFoundError:
-            return {
-                'valid': False,
-                'errors': [f"Data file {self.data_file} not found"],
-                'warnings': [],
-                'summary': {}
-            }
+            return source_error_report(f"Data file {self.data_file} not found")
         except json.JSONDecodeError as e:
-            return {
-                'valid': False,
-                'errors': [f"Invalid JSON format: {str(e)}"],
-                'warnings': [],
-                'summary': {}
-            }
+            return source_error_report(f"Invalid JSON format: {str(e)}")
         
         if not isinstance(data, list):
-            return {
-                'valid': False,
-                'errors': ["Data should be a list of college entries"],
-                'warnings': [],
-                'summary': {}
-            }
-        
-        all_errors = []
-        all_warnings = []
-        
-        # Validate each college entry
-        for i, college in enumerate(data):
-            errors, warnings = self.validate_college_entry(college, i)
-            all_errors.extend(errors)
-            all_warnings.extend(warnings)
-        
-        # Check for duplicate college names
-        names = [college.get('name', f'College_{i}') for i, college in enumerate(data)]
-        duplicates = [name for name in set(names) if names.count(name) > 1]
-        if duplicates:
-            all_warnings.extend([f"Duplicate college name: {name}" for name in duplicates])
-        
-        # Generate summary statistics
-        summary = {
-            'total_colleges': len(data),
-            'colleges_with_errors': len(set(error.split(':')[0] for error in all_errors if ':' in error)),
-            'colleges_with_warnings': len(set(warning.split(':')[0] for warning in all_warnings if ':' in warning)),
-            'total_errors': len(all_errors),
-            'total_warnings': len(all_warnings)
-        }
-        
-        return {
-            'valid': len(all_errors) == 0,
-            'errors': all_errors,
-            'warnings': all_warnings,
-            'summary': summary
-        }
+            return source_error_report("Data should be a list of college entries")
+        
+        return validate_records(data, self.max_examples, self.detail_file)
     
     def print_validation_report(self):
         """Print a formatted validation report."""
@@ -140,26 +145,54 @@ class DataValidator:
         if result['valid']:
             print(f"\n✅ VALIDATION PASSED - Dataset is valid!")
         else:
-            print(f"\n❌ VALIDATION FAILED - {len(result['errors'])} errors found")
+            print(f"\n❌ VALIDATION FAILED - {result['summary'].get('total_errors', len(result['errors']))} errors found")
+        
+        by_rule = result.get('by_rule', {})
+        if by_rule:
+            print(f"\nFINDINGS BY RULE:")
+            for key, rule in sorted(by_rule.items(), key=lambda item: -item[1]['count']):
+                print(f"  {'❌' if rule['severity'] == 'error' else '⚠️ '} {key}: {rule['count']:,}")
         
         if result['errors']:
-            print(f"\nERRORS:")
+            print(f"\nERRORS{self._sample_note(result, 'errors', 'total_errors')}:")
             for error in result['errors']:
                 print(f"  ❌ {error}")
         
         if result['warnings']:
-            print(f"\nWARNINGS:")
+            print(f"\nWARNINGS{self._sample_note(result, 'warnings', 'total_warnings')}:")
             for warning in result['warnings']:
                 print(f"  ⚠️  {warning}")
         
+        if self.detail_file:
+            print(f"\nFull detail written to {self.detail_file}")
+        
         print("\n" + "=" * 60)
         
         return result
 
+    def _sample_note(self, result: Dict[str, Any], key: str, total_key: str) -> str:
+        total = result['summary'].get(total_key, len(result[key]))
+        if total > len(result[key]):
+            return f" (showing {len(result[key])} of {total:,}, sampled up to {self.max_examples} per rule)"
+        return ""
+
 # Main execution
 if __name__ == "__main__":
-    validator = DataValidator()
-    result = validator.print_validation_report()
+    parser = argparse.ArgumentParser(description="Validate college admissions data")
+    parser.add_argument('--max-examples', type=int, default=DEFAULT_MAX_EXAMPLES,
+                        help="Sampled findings kept per rule; 0 or less keeps every finding")
+    parser.add_argument('--detail-file', help="Stream every finding to this NDJSON file")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    
+    instrumentation.enable_from_args(args)
+    try:
+        validator = DataValidator(cache_dir='.college_cache',
+                                  max_examples=args.max_examples if args.max_examples > 0 else None,
+                                  detail_file=args.detail_file)
+        result = validator.print_validation_report()
+    finally:
+        instrumentation.disable()
     
     # Exit with error code if validation failed
     if not result['valid']:
@@ -1,51 +1,82 @@
-import json
+import argparse
+import sys
 import pandas as pd
 from data_processor import CollegeDataProcessor
+from cleaning import frame_for_output
+from dashboard_export import write_dashboard_sections, DEFAULT_PAGE_SIZE
+import instrumentation
+from instrumentation import traced, span
 
-def prepare_dashboard_data():
+@traced('dashboard.prepare')
+def prepare_dashboard_data(approximate: bool = False, validate: bool = False,
+                           output_dir: str = 'dashboard_data', page_size: int = DEFAULT_PAGE_SIZE):
     """
     Prepare and export data specifically formatted for the dashboard components.
+    Sections are written to output_dir as content-hashed, precompressed files
+    listed in output_dir/manifest.json; tuition_analysis is paginated.
+    With approximate=True the SAT histogram comes from a quantile sketch.
+    With validate=True the source is validated and cleaned in a single parse,
+    and nothing is exported if validation fails.
     """
-    processor = CollegeDataProcessor()
-    processor.load_data()
-    df = processor.clean_data()
+    processor = CollegeDataProcessor(cache_dir='.college_cache', approximate=approximate)
+    if validate:
+        report = processor.ingest().report
+        if not report['valid']:
+            print(f"Validation failed with {report['summary'].get('total_errors', len(report['errors']))} errors; "
+                  f"run data_validator.py for details. Dashboard data not exported.")
+            return None
+        df = processor.df
+    else:
+        df = processor.clean_data()
     
     # Prepare data for different chart components
     dashboard_data = {}
     
     # 1. Acceptance Rate Chart Data
-    acceptance_data = df.nlargest(15, 'acceptance_rate')[['name', 'acceptance_rate']].to_dict('records')
-    dashboard_data['acceptance_rates'] = acceptance_data
+    with span('dashboard.acceptance_rates'):
+        acceptance_data = frame_for_output(processor.top_k('acceptance_rate', 15)[['name', 'acceptance_rate']]).to_dict('records')
+        dashboard_data['acceptance_rates'] = acceptance_data
     
     # 2. Tuition Analysis Data (scatter plot: tuition vs SAT)
-    tuition_data = df[['name', 'tuition', 'sat_average', 'acceptance_rate']].to_dict('records')
-    dashboard_data['tuition_analysis'] = tuition_data
+    with span('dashboard.tuition_analysis'):
+        tuition_data = frame_for_output(df[['name', 'tuition', 'sat_average', 'acceptance_rate']]).to_dict('records')
+        dashboard_data['tuition_analysis'] = tuition_data
     
     # 3. SAT Score Distribution (histogram data)
-    sat_bins = pd.cut(df['sat_average'], bins=8, precision=0)
-    sat_distribution = sat_bins.value_counts().sort_index()
-    sat_data = []
-    for interval, count in sat_distribution.items():
-        sat_data.append({
-            'range': f"{int(interval.left)}-{int(interval.right)}",
-            'count': int(count),
-            'midpoint': int((interval.left + interval.right) / 2)
-        })
-    dashboard_data['sat_distribution'] = sat_data
+    with span('dashboard.sat_distribution'):
+        sat_data = []
+        if approximate:
+            for bin_data in processor.histogram('sat_average', bins=8):
+                sat_data.append({
+                    'range': f"{int(round(bin_data['left']))}-{int(round(bin_data['right']))}",
+                    'count': bin_data['count'],
+                    'midpoint': int((bin_data['left'] + bin_data['right']) / 2)
+                })
+        else:
+            sat_bins = pd.cut(df['sat_average'], bins=8, precision=0)
+            sat_distribution = sat_bins.value_counts().sort_index()
+            for interval, count in sat_distribution.items():
+                sat_data.append({
+                    'range': f"{int(interval.left)}-{int(interval.right)}",
+                    'count': int(count),
+                    'midpoint': int((interval.left + interval.right) / 2)
+                })
+        dashboard_data['sat_distribution'] = sat_data
     
-    # 4. Demographics Data (average by region)
-    demographics_by_region = df.groupby('region')[['white_percent', 'asian_percent', 'hispanic_percent', 'black_percent', 'other_percent']].mean()
-    demographics_data = []
-    for region in demographics_by_region.index:
-        demographics_data.append({
-            'region': region,
-            'white': round(demographics_by_region.loc[region, 'white_percent'], 1),
-            'asian': round(demographics_by_region.loc[region, 'asian_percent'], 1),
-            'hispanic': round(demographics_by_region.loc[region, 'hispanic_percent'], 1),
-            'black': round(demographics_by_region.loc[region, 'black_percent'], 1),
-            'other': round(demographics_by_region.loc[region, 'other_percent'], 1)
-        })
-    dashboard_data['demographics'] = demographics_data
+    # 4. Demographics Data (average by region, served from the rollup cube)
+    with span('dashboard.demographics'):
+        cube = processor.get_cube()
+        demographics_data = []
+        for region in sorted(cube.members('region')):
+            demographics_data.append({
+                'region': region,
+                'white': round(cube.mean('white_percent', region=region), 1),
+                'asian': round(cube.mean('asian_percent', region=region), 1),
+                'hispanic': round(cube.mean('hispanic_percent', region=region), 1),
+                'black': round(cube.mean('black_percent', region=region), 1),
+                'other': round(cube.mean('other_percent', region=region), 1)
+            })
+        dashboard_data['demographics'] = demographics_data
     
     # 5. Summary Statistics for Metrics Overview
     stats = processor.calculate_statistics()
@@ -60,18 +91,34 @@ def prepare_dashboard_data():
     regional_analysis = processor.analyze_by_region()
     dashboard_data['regional_analysis'] = regional_analysis
     
-    # Export to JSON file for dashboard consumption
-    with open('dashboard_data.json', 'w') as f:
-        json.dump(dashboard_data, f, indent=2)
+    # Export sectioned files for dashboard consumption
+    with span('dashboard.write_sections', sections=len(dashboard_data)):
+        manifest = write_dashboard_sections(dashboard_data, output_dir, page_size)
     
-    print("Dashboard data exported to dashboard_data.json")
+    print(f"Dashboard data exported to {output_dir}/ (manifest.json lists {len(manifest['sections']) + 1} sections)")
     print(f"Data includes:")
     print(f"  - {len(dashboard_data['acceptance_rates'])} colleges for acceptance rate chart")
-    print(f"  - {len(dashboard_data['tuition_analysis'])} colleges for tuition analysis")
+    print(f"  - {len(dashboard_data['tuition_analysis'])} colleges for tuition analysis "
+          f"in {len(manifest['tuition_analysis']['pages'])} pages")
     print(f"  - {len(dashboard_data['sat_distribution'])} SAT score ranges")
     print(f"  - {len(dashboard_data['demographics'])} regions for demographics")
     
     return dashboard_data
 
 if __name__ == "__main__":
-    prepare_dashboard_data()
+    parser = argparse.ArgumentParser(description="Export dashboard_data.json")
+    parser.add_argument('--validate', action='store_true',
+                        help="Validate in the same parse and skip the export if the data is invalid")
+    parser.add_argument('--approximate', action='store_true', help="SAT histogram from a quantile sketch")
+    parser.add_argument('--output-dir', default='dashboard_data', help="Directory for the section files and manifest")
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE, help="Rows per tuition_analysis page")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.enable_from_args(args)
+    try:
+        exported = prepare_dashboard_data(approximate=args.approximate, validate=args.validate,
+                                          output_dir=args.output_dir, page_size=args.page_size)
+    finally:
+        instrumentation.disable()
+    if exported is None:
+        sys.exit(1)
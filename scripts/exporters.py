@@ -0,0 +1,192 @@
+import functools
+import gzip
+import math
+import os
+import tempfile
+from json.encoder import encode_basestring
+from typing import List, Any, Optional
+import numpy as np
+import pandas as pd
+from cleaning import FLOAT32_OUTPUT_DECIMALS
+from column_cache import write_frame
+
+try:
+    import zstandard as zstd
+except ImportError:  # zstandard is optional; gzip is always available
+    zstd = None
+
+EXPORT_FORMATS = ('json', 'ndjson', 'csv', 'columnar')
+FORMAT_EXTENSIONS = {'json': '.json', 'ndjson': '.ndjson', 'csv': '.csv', 'columnar': '.columnar'}
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+# Favour throughput: these are bulk exports, not static assets
+DEFAULT_COMPRESSION_LEVELS = {'gzip': 3, 'zstd': 3}
+DEFAULT_EXPORT_CHUNK_SIZE = 50_000
+CSV_SPECIAL = (',', '"', '\n', '\r')
+
+
+def default_output_path(stem: str, fmt: str, compression: Optional[str] = None) -> str:
+    """e.g. default_output_path('processed_college_data', 'ndjson', 'gzip') -> 'processed_college_data.ndjson.gz'."""
+    return stem + FORMAT_EXTENSIONS[fmt] + (COMPRESSION_SUFFIXES[compression] if compression else '')
+
+
+def compression_for(path: str) -> Optional[str]:
+    """Compression implied by a path's suffix, or None."""
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if path.endswith(suffix):
+            return compression
+    return None
+
+
+def _csv_field(value: str) -> str:
+    # Minimal quoting, as the csv module and pandas do
+    if any(char in value for char in CSV_SPECIAL):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _scalar_text(value: Any, fmt: str) -> str:
+    if isinstance(value, str):
+        return _csv_field(value) if fmt == 'csv' else encode_basestring(value)
+    if fmt == 'csv':
+        return _csv_field(str(value))
+    if isinstance(value, (bool, np.bool_)):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)):
+        return repr(float(value)) if np.isfinite(value) else 'null'
+    return encode_basestring(str(value))
+
+
+def _float_text(value: float, null: str) -> str:
+    # NaN is already factorized to the missing code; infinities have no JSON form either
+    return repr(value) if math.isfinite(value) else null
+
+
+def column_text(series: pd.Series, fmt: str) -> List[str]:
+    """
+    Every value of a column as output text: a JSON literal, or a CSV field.
+    Each distinct value is encoded once and spread over the rows by its
+    factorized code, so no per-row conversion happens. Missing values
+    become null (JSON) or an empty field (CSV); float32 columns are written
+    at their intended precision like cleaning.frame_for_output().
+    """
+    null = '' if fmt == 'csv' else 'null'
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories.tolist()
+        encode = functools.partial(_scalar_text, fmt=fmt)
+    else:
+        values = series.to_numpy()
+        kind = values.dtype.kind
+        if kind == 'b':
+            words = ('False', 'True') if fmt == 'csv' else ('false', 'true')
+            return [words[value] for value in values.tolist()]
+        if values.dtype == np.float32:
+            values = values.astype(np.float64).round(FLOAT32_OUTPUT_DECIMALS)
+        if kind == 'f':
+            # factorize() merges -0.0 into 0.0; write both as 0.0 rather than as whichever came first
+            values = values + 0.0
+        codes, uniques = pd.factorize(values)
+        uniques = uniques.tolist()
+        if kind in 'iu':
+            encode = str
+        elif kind == 'f':
+            encode = functools.partial(_float_text, null=null)
+        elif all(isinstance(value, str) for value in uniques):
+            encode = _csv_field if fmt == 'csv' else encode_basestring
+        else:
+            encode = functools.partial(_scalar_text, fmt=fmt)
+    # Code -1 (missing) picks the trailing null
+    labels = np.array([encode(value) for value in uniques] + [null], dtype=object)
+    return labels[codes].tolist()
+
+
+def _row_template(columns: List[Any], fmt: str) -> str:
+    """str.format template of one output row with a {} slot per column."""
+    if fmt == 'csv':
+        return ','.join(['{}'] * len(columns))
+    keys = [encode_basestring(str(column)).replace('{', '{{').replace('}', '}}') for column in columns]
+    return '{{' + ','.join(f'{key}:{{}}' for key in keys) + '}}'
+
+
+def encode_rows(df: pd.DataFrame, fmt: str) -> List[str]:
+    """The rows of df as JSON objects or CSV lines, assembled from whole-column text."""
+    template = _row_template(list(df.columns), fmt)
+    return list(map(template.format, *(column_text(df[column], fmt) for column in df.columns)))
+
+
+def _open_stream(raw, compression: Optional[str], level: Optional[int]):
+    if compression is None:
+        return raw
+    level = DEFAULT_COMPRESSION_LEVELS[compression] if level is None else level
+    if compression == 'gzip':
+        # mtime=0 keeps the output byte-identical for identical data
+        return gzip.GzipFile(filename='', mode='wb', fileobj=raw, compresslevel=level, mtime=0)
+    return zstd.ZstdCompressor(level=level).stream_writer(raw, closefd=False)
+
+
+def _write_text(path: str, df: pd.DataFrame, fmt: str, compression: Optional[str],
+                level: Optional[int], chunk_size: int):
+    with open(path, 'wb') as raw:
+        out = _open_stream(raw, compression, level)
+        try:
+            if fmt == 'csv':
+                out.write((','.join(_csv_field(str(column)) for column in df.columns) + '\n').encode('utf-8'))
+            elif fmt == 'json':
+                out.write(b'[')
+            for start in range(0, len(df), chunk_size):
+                rows = encode_rows(df.iloc[start:start + chunk_size], fmt)
+                if fmt == 'json':
+                    text = ('\n' if start == 0 else ',\n') + ',\n'.join(rows)
+                else:
+                    text = '\n'.join(rows) + '\n'
+                out.write(text.encode('utf-8'))
+            if fmt == 'json':
+                out.write(b'\n]\n' if len(df) else b']\n')
+        finally:
+            if out is not raw:
+                out.close()
+
+
+def export_frame(df: pd.DataFrame, path: str, fmt: str = 'ndjson', compression: Optional[str] = None,
+                 level: Optional[int] = None, chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE) -> str:
+    """
+    Stream df to path as a JSON array ('json', one record per line), NDJSON,
+    CSV or a columnar directory ('columnar', the ColumnCache layout, readable
+    with column_cache.read_frame()). Text formats are encoded chunk_size rows
+    at a time straight from the column buffers and optionally compressed with
+    'gzip' or 'zstd' (needs the zstandard package). Output is written to a
+    temporary file beside path and renamed over it when complete. Returns path.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Supported formats: {', '.join(EXPORT_FORMATS)}")
+    if compression is not None and compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Supported compression: {', '.join(COMPRESSION_SUFFIXES)}")
+    if compression == 'zstd' and zstd is None:
+        raise ValueError("zstd compression needs the optional zstandard package")
+    if fmt == 'columnar':
+        if compression is not None:
+            raise ValueError("Columnar exports are memory-mapped on read and cannot be compressed")
+        if write_frame(path, df, source='export_frame') is None:
+            raise ValueError("A string column contains the columnar separator character")
+        return path
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=parent)
+    os.close(fd)
+    try:
+        _write_text(tmp_path, df, fmt, compression, level, max(1, chunk_size))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return path
+
+
+def output_bytes(path: str) -> int:
+    """Size of an export: the file, or every file of a columnar directory."""
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    return os.path.getsize(path)
@@ -1,70 +1,340 @@
+import argparse
 import json
-import random
-from datetime import datetime
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from json.encoder import encode_basestring
+from typing import Dict, List, Any, Iterator, Optional
+import numpy as np
+from column_cache import META_FILE, STRING_SEPARATOR
+from stream_ingest import COLUMNS, NUMERIC_COLUMNS, DEMOGRAPHIC_COLUMNS, DEMOGRAPHIC_FIELDS, DEFAULT_CHUNK_SIZE
 
-# Generate sample college admissions data
-def generate_college_data():
-    colleges = [
-        "Harvard University", "Stanford University", "MIT", "Yale University",
-        "Princeton University", "Columbia University", "University of Chicago",
-        "University of Pennsylvania", "Northwestern University", "Duke University",
-        "Johns Hopkins University", "Dartmouth College", "Brown University",
-        "Vanderbilt University", "Rice University", "Washington University",
-        "Cornell University", "University of Notre Dame", "UCLA", "UC Berkeley",
-        "Georgetown University", "Carnegie Mellon", "University of Virginia",
-        "University of Michigan", "Wake Forest University"
+# The first rows are always these colleges, so the default 25-row sample is unchanged in spirit
+COLLEGES = [
+    "Harvard University", "Stanford University", "MIT", "Yale University",
+    "Princeton University", "Columbia University", "University of Chicago",
+    "University of Pennsylvania", "Northwestern University", "Duke University",
+    "Johns Hopkins University", "Dartmouth College", "Brown University",
+    "Vanderbilt University", "Rice University", "Washington University",
+    "Cornell University", "University of Notre Dame", "UCLA", "UC Berkeley",
+    "Georgetown University", "Carnegie Mellon", "University of Virginia",
+    "University of Michigan", "Wake Forest University"
+]
+# Synthetic names are "<place> <kind> <row>", so they are unique unless deliberately duplicated
+PLACES = [
+    "Riverside", "Lakeview", "Mountain", "Central", "Northern", "Southern", "Eastern", "Western",
+    "Coastal", "Valley", "Prairie", "Highland", "Pinecrest", "Bayside", "Cedar", "Maple",
+    "Oakwood", "Summit", "Harbor", "Granite", "Redwood", "Sterling", "Fairview", "Brookside",
+]
+KINDS = ["University", "College", "State University", "Institute of Technology",
+         "Community College", "Polytechnic", "Liberal Arts College", "A&M University"]
+# State -> region, using the region names the dashboard already shows
+STATE_REGIONS = {
+    'CT': 'Northeast', 'MA': 'Northeast', 'ME': 'Northeast', 'NH': 'Northeast', 'NJ': 'Northeast',
+    'NY': 'Northeast', 'PA': 'Northeast', 'RI': 'Northeast', 'VT': 'Northeast', 'DE': 'Northeast',
+    'MD': 'Northeast',
+    'AL': 'Southeast', 'AR': 'Southeast', 'FL': 'Southeast', 'GA': 'Southeast', 'KY': 'Southeast',
+    'LA': 'Southeast', 'MS': 'Southeast', 'NC': 'Southeast', 'SC': 'Southeast', 'TN': 'Southeast',
+    'VA': 'Southeast', 'WV': 'Southeast',
+    'IA': 'Midwest', 'IL': 'Midwest', 'IN': 'Midwest', 'KS': 'Midwest', 'MI': 'Midwest',
+    'MN': 'Midwest', 'MO': 'Midwest', 'ND': 'Midwest', 'NE': 'Midwest', 'OH': 'Midwest',
+    'SD': 'Midwest', 'WI': 'Midwest',
+    'AK': 'West', 'AZ': 'West', 'CA': 'West', 'CO': 'West', 'HI': 'West', 'ID': 'West',
+    'MT': 'West', 'NM': 'West', 'NV': 'West', 'OK': 'West', 'OR': 'West', 'TX': 'West',
+    'UT': 'West', 'WA': 'West', 'WY': 'West',
+}
+STATES = sorted(STATE_REGIONS)
+REGIONS = sorted(set(STATE_REGIONS.values()))
+STATE_REGION_CODES = np.array([REGIONS.index(STATE_REGIONS[state]) for state in STATES], dtype=np.int32)
+# Dirichlet concentration for white, asian, hispanic, black, other
+DEMOGRAPHIC_ALPHA = [12.0, 4.0, 4.0, 3.0, 2.0]
+
+FORMATS = ('json', 'ndjson', 'columnar')
+# Defects injected by invalid_rate: missing SAT, acceptance over 100, negative tuition, demographics off 100
+INVALID_KINDS = 4
+
+
+def college_names(rows: np.ndarray) -> List[str]:
+    """Deterministic name of each row number."""
+    mixed = (rows.astype(np.uint64) * np.uint64(2654435761)) & np.uint64(0xFFFFFFFF)
+    places = (mixed % np.uint64(len(PLACES))).tolist()
+    kinds = (mixed // np.uint64(len(PLACES)) % np.uint64(len(KINDS))).tolist()
+    return [COLLEGES[row] if row < len(COLLEGES) else f"{PLACES[place]} {KINDS[kind]} {row}"
+            for row, place, kind in zip(rows.tolist(), places, kinds)]
+
+
+def _demographics(rng: np.random.Generator, count: int) -> np.ndarray:
+    """Percentages with one decimal that sum to exactly 100 (largest-remainder rounding in tenths)."""
+    tenths = rng.dirichlet(DEMOGRAPHIC_ALPHA, count) * 1000
+    floored = np.floor(tenths)
+    short = (1000 - floored.sum(axis=1)).astype(np.int64)
+    ranks = np.argsort(np.argsort(floored - tenths, axis=1), axis=1)
+    floored += ranks < short[:, None]
+    return floored / 10
+
+
+def generate_chunk(start: int, count: int, seed: int, duplicate_rate: float = 0.0,
+                   invalid_rate: float = 0.0) -> Dict[str, Any]:
+    """
+    Rows start .. start + count - 1 as columns in the create_dataframe layout,
+    plus integer 'state' and 'region' codes into STATES / REGIONS.
+
+    Each chunk draws from generators seeded by (seed, start), so the same
+    seed and chunk size give the same data however many workers run. Every
+    draw has its own stream, so the first n rows of a chunk do not depend on
+    its count: generate_chunk(0, 3, seed) is the start of any chunk 0.
+    SAT, acceptance rate and tuition share a latent selectivity so they
+    correlate (high for the named COLLEGES); enrollment is log-normal. duplicate_rate of the rows reuse the
+    name of a random earlier row and invalid_rate carry one validation defect.
+    """
+    (selectivity_rng, named_rng, duplicate_rng, source_rng, acceptance_rng, tuition_rng, sat_rng,
+     enrollment_rng, state_rng, demographic_rng, invalid_rng, defect_rng) = (
+        np.random.default_rng(child) for child in np.random.SeedSequence([seed, start]).spawn(12))
+    rows = np.arange(start, start + count, dtype=np.int64)
+    selectivity = selectivity_rng.standard_normal(count)
+    # The named colleges are selective ones
+    named = rows < len(COLLEGES)
+    selectivity[named] = named_rng.uniform(1.0, 3.0, int(named.sum()))
+
+    columns: Dict[str, Any] = {}
+    if duplicate_rate and start + count > 1:
+        duplicated = (duplicate_rng.random(count) < duplicate_rate) & (rows > 0)
+        rows_named = rows.copy()
+        rows_named[duplicated] = (source_rng.random(int(duplicated.sum())) * rows[duplicated]).astype(np.int64)
+        columns['name'] = college_names(rows_named)
+    else:
+        columns['name'] = college_names(rows)
+    columns['acceptance_rate'] = np.clip(68 - 22 * selectivity + acceptance_rng.normal(0, 8, count), 3, 99).round(1)
+    columns['tuition'] = np.clip(28000 + 10000 * selectivity + tuition_rng.normal(0, 7000, count), 4000, 68000).astype(np.int64)
+    columns['sat_average'] = np.clip(1100 + 140 * selectivity + sat_rng.normal(0, 45, count), 800, 1600).astype(np.int64)
+    columns['enrollment'] = np.clip(enrollment_rng.lognormal(8.6, 0.9, count), 300, 80000).astype(np.int64)
+    states = state_rng.integers(0, len(STATES), count).astype(np.int32)
+    columns['state'] = states
+    columns['region'] = STATE_REGION_CODES[states]
+    demographics = _demographics(demographic_rng, count)
+    for i, col in enumerate(DEMOGRAPHIC_COLUMNS):
+        columns[col] = demographics[:, i]
+
+    if invalid_rate:
+        defect = np.where(invalid_rng.random(count) < invalid_rate, defect_rng.integers(0, INVALID_KINDS, count), -1)
+        columns['sat_average'] = columns['sat_average'].astype(np.float64)
+        columns['sat_average'][defect == 0] = np.nan
+        # Keep defective percentages at one decimal, like every clean value
+        columns['acceptance_rate'][defect == 1] = (columns['acceptance_rate'][defect == 1] + 100).round(1)
+        columns['tuition'][defect == 2] *= -1
+        columns['other_percent'][defect == 3] = (columns['other_percent'][defect == 3] + 10).round(1)
+    return columns
+
+
+def chunk_records(columns: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Nested college records (the JSON source schema) from generate_chunk columns."""
+    values = {col: np.asarray(columns[col]).tolist() for col in NUMERIC_COLUMNS + DEMOGRAPHIC_COLUMNS}
+    sat = [None if value != value else int(value) for value in values['sat_average']]
+    records = []
+    for i, name in enumerate(columns['name']):
+        records.append({
+            "name": name,
+            "acceptance_rate": values['acceptance_rate'][i],
+            "tuition": values['tuition'][i],
+            "sat_average": sat[i],
+            "enrollment": values['enrollment'][i],
+            "demographics": {key: values[col][i] for col, key in DEMOGRAPHIC_FIELDS.items()},
+            "location": {"state": STATES[columns['state'][i]], "region": REGIONS[columns['region'][i]]},
+        })
+    return records
+
+
+def _json_numbers(values: np.ndarray) -> List[str]:
+    # Generated floats are finite and rounded, so repr is already valid JSON
+    return list(map(repr if values.dtype.kind == 'f' else str, values.tolist()))
+
+
+def encode_lines(columns: Dict[str, Any]) -> List[str]:
+    """One compact JSON object per row, formatted straight from the columns."""
+    # SAT is float only to carry missing values; those become null
+    sat_text = ['null' if value != value else str(int(value)) for value in columns['sat_average'].tolist()]
+    fields = [
+        map(encode_basestring, columns['name']),
+        _json_numbers(columns['acceptance_rate']),
+        _json_numbers(columns['tuition']),
+        sat_text,
+        _json_numbers(columns['enrollment']),
+    ] + [_json_numbers(columns[col]) for col in DEMOGRAPHIC_COLUMNS] + [
+        (STATES[code] for code in columns['state'].tolist()),
+        (REGIONS[code] for code in columns['region'].tolist()),
     ]
-    
-    data = []
-    
-    for college in colleges:
-        # Generate realistic data ranges
-        acceptance_rate = random.uniform(5, 85)  # 5% to 85%
-        tuition = random.randint(25000, 60000)  # $25k to $60k
-        sat_avg = random.randint(1200, 1580)    # SAT scores
-        enrollment = random.randint(5000, 45000) # Student enrollment
-        
-        # Demographics (percentages that sum to 100)
-        white = random.uniform(30, 70)
-        asian = random.uniform(10, 40)
-        hispanic = random.uniform(5, 25)
-        black = random.uniform(3, 20)
-        other = 100 - (white + asian + hispanic + black)
-        
-        college_data = {
-            "name": college,
-            "acceptance_rate": round(acceptance_rate, 1),
-            "tuition": tuition,
-            "sat_average": sat_avg,
-            "enrollment": enrollment,
-            "demographics": {
-                "white": round(white, 1),
-                "asian": round(asian, 1),
-                "hispanic": round(hispanic, 1),
-                "black": round(black, 1),
-                "other": round(other, 1)
-            },
-            "location": {
-                "state": random.choice(["CA", "MA", "NY", "CT", "PA", "IL", "NC", "TX", "VA", "MD"]),
-                "region": random.choice(["Northeast", "Southeast", "Midwest", "West"])
-            }
-        }
-        
-        data.append(college_data)
-    
-    return data
-
-# Generate the data
-college_data = generate_college_data()
-
-# Save to JSON file
-with open('college_admissions_data.json', 'w') as f:
-    json.dump(college_data, f, indent=2)
-
-print(f"Generated data for {len(college_data)} colleges")
-print("Sample data saved to college_admissions_data.json")
-
-# Print first few entries as preview
-print("\nSample entries:")
-for i, college in enumerate(college_data[:3]):
-    print(f"{i+1}. {college['name']}: {college['acceptance_rate']}% acceptance, ${college['tuition']:,} tuition")
+    return [
+        f'{{"name":{name},"acceptance_rate":{rate},"tuition":{tuition},"sat_average":{sat},'
+        f'"enrollment":{enrollment},"demographics":{{"white":{white},"asian":{asian},'
+        f'"hispanic":{hispanic},"black":{black},"other":{other}}},'
+        f'"location":{{"state":"{state}","region":"{region}"}}}}'
+        for name, rate, tuition, sat, enrollment, white, asian, hispanic, black, other, state, region in zip(*fields)
+    ]
+
+
+def _render_chunk(fmt: str, start: int, count: int, seed: int, duplicate_rate: float, invalid_rate: float):
+    """Worker: generate one chunk and encode it for the output format."""
+    columns = generate_chunk(start, count, seed, duplicate_rate, invalid_rate)
+    if fmt == 'columnar':
+        return columns
+    separator = '\n' if fmt == 'ndjson' else ',\n'
+    return separator.join(encode_lines(columns)).encode('utf-8')
+
+
+class _ColumnarWriter:
+    """
+    Streams chunks into the column layout ColumnCache uses (one .npy per
+    column, codes for state and region, names in a separator-delimited UTF-8
+    file), readable with column_cache.read_frame().
+    """
+
+    def __init__(self, path: str, rows: int, invalid: bool):
+        self.path = path
+        self.rows = rows
+        self.written = 0
+        os.makedirs(path)
+        self.arrays = {}
+        for col in NUMERIC_COLUMNS + ['state', 'region'] + DEMOGRAPHIC_COLUMNS:
+            if col in ('state', 'region'):
+                name, dtype = f"{col}.codes.npy", np.int32
+            elif col in DEMOGRAPHIC_COLUMNS or col == 'acceptance_rate' or (col == 'sat_average' and invalid):
+                name, dtype = f"{col}.npy", np.float64
+            else:
+                name, dtype = f"{col}.npy", np.int64
+            self.arrays[col] = np.lib.format.open_memmap(os.path.join(path, name), mode='w+', dtype=dtype, shape=(rows,))
+        self.names = open(os.path.join(path, 'name.utf8'), 'wb')
+
+    def write(self, columns: Dict[str, Any]):
+        count = len(columns['name'])
+        stop = self.written + count
+        for col, array in self.arrays.items():
+            array[self.written:stop] = columns[col]
+        text = STRING_SEPARATOR.join(columns['name'])
+        self.names.write(((STRING_SEPARATOR if self.written else '') + text).encode('utf-8'))
+        self.written = stop
+
+    def close(self):
+        self.names.close()
+        for array in self.arrays.values():
+            array.flush()
+        np.save(os.path.join(self.path, 'index.npy'), np.arange(self.rows, dtype=np.int64))
+        specs = []
+        for col in COLUMNS:
+            if col == 'name':
+                specs.append({'name': col, 'kind': 'string'})
+            elif col in ('state', 'region'):
+                specs.append({'name': col, 'kind': 'categorical', 'categories': STATES if col == 'state' else REGIONS})
+            else:
+                specs.append({'name': col, 'kind': 'numeric'})
+        with open(os.path.join(self.path, META_FILE), 'w') as f:
+            json.dump({'rows': self.rows, 'columns': specs, 'source': 'generate_sample_data'}, f)
+
+
+def write_dataset(path: str, rows: int, fmt: str = 'json', seed: Optional[int] = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE, workers: Optional[int] = None,
+                  duplicate_rate: float = 0.0, invalid_rate: float = 0.0) -> int:
+    """
+    Generate rows colleges and stream them to path as a JSON array ('json',
+    one record per line), NDJSON ('ndjson') or a columnar directory
+    ('columnar'). Chunks are generated across workers processes when given;
+    at most two chunks per worker are in flight, so memory is bounded by the
+    chunk size. Output goes to a temporary path that replaces path at the
+    end. Returns the seed used (drawn at random when seed is None).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Supported formats: {', '.join(FORMATS)}")
+    if seed is None:
+        seed = int(np.random.SeedSequence().generate_state(1)[0])
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    tasks = [(fmt, start, min(chunk_size, rows - start), seed, duplicate_rate, invalid_rate)
+             for start in range(0, rows, chunk_size)]
+
+    if fmt == 'columnar':
+        writer = _ColumnarWriter(tmp_path, rows, bool(invalid_rate))
+        write, finish = writer.write, writer.close
+    else:
+        out = open(tmp_path, 'wb')
+        if fmt == 'json':
+            out.write(b'[\n')
+        first = [True]
+
+        def write(data: bytes):
+            if not first[0]:
+                out.write(b',\n' if fmt == 'json' else b'\n')
+            out.write(data)
+            first[0] = False
+
+        def finish():
+            out.write(b'\n]\n' if fmt == 'json' else (b'\n' if rows else b''))
+            out.close()
+
+    try:
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for task in tasks:
+                    pending.append(pool.submit(_render_chunk, *task))
+                    if len(pending) >= workers * 2:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+        else:
+            for task in tasks:
+                write(_render_chunk(*task))
+        finish()
+    except BaseException:
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        elif os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+    return seed
+
+
+def iter_chunks(rows: int, seed: int, chunk_size: int = DEFAULT_CHUNK_SIZE, duplicate_rate: float = 0.0,
+                invalid_rate: float = 0.0) -> Iterator[Dict[str, Any]]:
+    """Generate rows colleges chunk by chunk, as generate_chunk columns."""
+    for start in range(0, rows, chunk_size):
+        yield generate_chunk(start, min(chunk_size, rows - start), seed, duplicate_rate, invalid_rate)
+
+
+# Generate sample college admissions data
+def generate_college_data(rows: int = len(COLLEGES), seed: Optional[int] = None, **options) -> List[Dict[str, Any]]:
+    """Records for rows colleges, in memory; see write_dataset() for large outputs."""
+    if seed is None:
+        seed = int(np.random.SeedSequence().generate_state(1)[0])
+    return [record for columns in iter_chunks(rows, seed, **options) for record in chunk_records(columns)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic college admissions data")
+    parser.add_argument('--rows', type=int, default=len(COLLEGES))
+    parser.add_argument('--output', default='college_admissions_data.json')
+    parser.add_argument('--format', choices=FORMATS, default='json')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--workers', type=int, help="Generate chunks across this many processes")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--duplicate-rate', type=float, default=0.0, help="Fraction of rows reusing an earlier name")
+    parser.add_argument('--invalid-rate', type=float, default=0.0, help="Fraction of rows with a validation defect")
+    args = parser.parse_args()
+
+    seed = write_dataset(args.output, args.rows, args.format, args.seed, args.chunk_size, args.workers,
+                         args.duplicate_rate, args.invalid_rate)
+
+    print(f"Generated data for {args.rows:,} colleges (seed {seed})")
+    print(f"Sample data saved to {args.output}")
+
+    # Print first few entries as preview
+    preview = chunk_records(generate_chunk(0, min(args.rows, 3), seed, args.duplicate_rate, args.invalid_rate))
+    print("\nSample entries:")
+    for i, college in enumerate(preview):
+        print(f"{i+1}. {college['name']}: {college['acceptance_rate']}% acceptance, ${college['tuition']:,} tuition")
+
+
+if __name__ == "__main__":
+    main()
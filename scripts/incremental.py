@@ -0,0 +1,421 @@
+import argparse
+import json
+import os
+import tempfile
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+from aggregates import ColumnAggregates, CORRELATION_PAIRS
+from cleaning import clean_frame, frame_for_output
+from data_processor import CollegeDataProcessor
+from stream_ingest import ColumnChunkBuilder, NUMERIC_COLUMNS
+
+SAT_BINS = 8
+TOP_ACCEPTANCE_COUNT = 15
+# Bump when the saved layout changes
+STATE_VERSION = 2
+
+
+class SortedMultiset:
+    """
+    Order-statistic multiset backed by a list of sorted buckets.
+    Inserts and removals cost O(sqrt n); rank and k-th queries walk the bucket
+    sizes, so medians and histogram counts never touch individual rows.
+    """
+
+    LOAD = 512
+
+    def __init__(self, values: Iterable = (), presorted: bool = False):
+        values = list(values) if presorted else sorted(values)
+        self._buckets = [values[i:i + self.LOAD] for i in range(0, len(values), self.LOAD)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(values)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self):
+        for bucket in self._buckets:
+            yield from bucket
+
+    def add(self, value):
+        if not self._buckets:
+            self._buckets.append([value])
+            self._maxes.append(value)
+            self._len = 1
+            return
+        i = min(bisect_left(self._maxes, value), len(self._buckets) - 1)
+        bucket = self._buckets[i]
+        insort(bucket, value)
+        self._maxes[i] = bucket[-1]
+        self._len += 1
+        if len(bucket) > 2 * self.LOAD:
+            self._buckets[i:i + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+            self._maxes[i:i + 1] = [bucket[self.LOAD - 1], bucket[-1]]
+
+    def remove(self, value):
+        i = bisect_left(self._maxes, value)
+        if i == len(self._buckets):
+            raise KeyError(value)
+        bucket = self._buckets[i]
+        j = bisect_left(bucket, value)
+        if j == len(bucket) or bucket[j] != value:
+            raise KeyError(value)
+        del bucket[j]
+        self._len -= 1
+        if bucket:
+            self._maxes[i] = bucket[-1]
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+
+    def __getitem__(self, k: int):
+        if k < 0:
+            k += self._len
+        if not 0 <= k < self._len:
+            raise IndexError(k)
+        for bucket in self._buckets:
+            if k < len(bucket):
+                return bucket[k]
+            k -= len(bucket)
+
+    def head(self, count: int) -> List:
+        """The smallest `count` values in order."""
+        out = []
+        for bucket in self._buckets:
+            out.extend(bucket[:count - len(out)])
+            if len(out) >= count:
+                break
+        return out
+
+    def rank_right(self, value) -> int:
+        """Number of stored values <= value."""
+        i = bisect_right(self._maxes, value)
+        rank = sum(len(bucket) for bucket in self._buckets[:i])
+        if i < len(self._buckets):
+            rank += bisect_right(self._buckets[i], value)
+        return rank
+
+
+class IncrementalAggregateState:
+    """
+    Persistable aggregate state that supports upserts and deletes keyed by
+    college name in time proportional to the delta. It answers what
+    calculate_statistics(), analyze_by_region() and find_correlations()
+    return, plus the SAT histogram and top-15 acceptance list in the shape
+    of the dashboard's sections. save() and load() read and write the whole
+    state in linear time, without re-sorting it.
+
+    Moments and pairwise co-moments live in a ColumnAggregates kept over
+    pairwise-complete rows, as find_correlations() uses, and are maintained
+    with reversible Welford updates; medians, extrema, the histogram and the
+    top-k list come from order-statistic multisets.
+    """
+
+    def __init__(self):
+        # name -> list of (seq, values tuple, region); a list because names may repeat
+        self.rows: Dict[str, List[Tuple[int, Tuple[float, ...], str]]] = {}
+        self.next_seq = 0
+        self.moments = ColumnAggregates(NUMERIC_COLUMNS)
+        self.sorted_values = [SortedMultiset() for _ in NUMERIC_COLUMNS]
+        # (-acceptance_rate, seq, name) so the head is nlargest with keep='first'
+        self.acceptance_ranking = SortedMultiset()
+        # region -> [count, sums, non-null counts], in first-appearance order
+        self.regions: Dict[str, List[Any]] = {}
+        self.integer_columns = set(NUMERIC_COLUMNS)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'IncrementalAggregateState':
+        """Build the state from a cleaned frame in bulk."""
+        state = cls()
+        state.integer_columns = {col for col in NUMERIC_COLUMNS if pd.api.types.is_integer_dtype(df[col].dtype)}
+        values = frame_for_output(df[NUMERIC_COLUMNS]).to_numpy(dtype=np.float64)
+        names = df['name'].tolist()
+        regions = df['region'].tolist()
+        present = ~np.isnan(values)
+
+        for seq, (name, row, region) in enumerate(zip(names, values.tolist(), regions)):
+            state.rows.setdefault(name, []).append((seq, tuple(row), region))
+        state.next_seq = len(names)
+        state.moments = ColumnAggregates.from_array(values, NUMERIC_COLUMNS)
+
+        state.sorted_values = [SortedMultiset(values[present[:, i], i].tolist()) for i in range(len(NUMERIC_COLUMNS))]
+        state.acceptance_ranking = SortedMultiset(
+            (-rate, seq, name) for seq, (rate, name) in enumerate(zip(values[:, 0].tolist(), names))
+            if present[seq, 0]
+        )
+
+        for region, group in df.groupby('region', sort=False):
+            group_values = group[NUMERIC_COLUMNS].to_numpy(dtype=np.float64)
+            state.regions[region] = [len(group), np.nansum(group_values, axis=0), (~np.isnan(group_values)).sum(axis=0).astype(np.float64)]
+        return state
+
+    def _add(self, name: str, values: Tuple[float, ...], region: str):
+        seq = self.next_seq
+        self.next_seq += 1
+        self.rows.setdefault(name, []).append((seq, values, region))
+
+        x = np.array(values)
+        present = ~np.isnan(x)
+        # Entry [i, j] of every moment matrix covers rows with both i and j present
+        pair = np.outer(present, present)
+        xs = np.broadcast_to(np.where(present, x, 0.0)[:, None], pair.shape)
+        m = self.moments
+        count = m.count + pair
+        delta = np.where(pair, xs - m.mean, 0.0)
+        mean = m.mean + delta / np.where(count > 0, count, 1.0)
+        m.m2 = m.m2 + delta * (xs - mean)
+        m.comoment = m.comoment + delta * (xs.T - mean.T)
+        m.mean, m.count = mean, count
+
+        for i, value in enumerate(values):
+            if present[i]:
+                self.sorted_values[i].add(value)
+        if present[0]:
+            self.acceptance_ranking.add((-values[0], seq, name))
+
+        entry = self.regions.setdefault(region, [0, np.zeros(len(values)), np.zeros(len(values))])
+        entry[0] += 1
+        entry[1] += np.where(present, x, 0.0)
+        entry[2] += present
+
+    def _remove(self, name: str, seq: int, values: Tuple[float, ...], region: str):
+        x = np.array(values)
+        present = ~np.isnan(x)
+        pair = np.outer(present, present)
+        xs = np.broadcast_to(np.where(present, x, 0.0)[:, None], pair.shape)
+        m = self.moments
+        count = m.count - pair
+        remaining = count > 0
+        # Means over the rows left once this one is gone; undo _add's updates against them
+        mean = np.where(pair, m.mean - (xs - m.mean) / np.where(remaining, count, 1.0), m.mean)
+        m.m2 = np.where(remaining, m.m2 - np.where(pair, (xs - mean) * (xs - m.mean), 0.0), 0.0)
+        m.comoment = np.where(remaining, m.comoment - np.where(pair, (xs - mean) * (xs.T - m.mean.T), 0.0), 0.0)
+        m.mean, m.count = np.where(remaining, mean, 0.0), count
+
+        for i, value in enumerate(values):
+            if present[i]:
+                self.sorted_values[i].remove(value)
+        if present[0]:
+            self.acceptance_ranking.remove((-values[0], seq, name))
+
+        entry = self.regions[region]
+        entry[0] -= 1
+        entry[1] -= np.where(present, x, 0.0)
+        entry[2] -= present
+        if entry[0] == 0:
+            del self.regions[region]
+
+    def delete(self, names: Iterable[str]) -> int:
+        """Remove every row stored under each name; returns the number of rows removed."""
+        removed = 0
+        for name in names:
+            for seq, values, region in self.rows.pop(name, []):
+                self._remove(name, seq, values, region)
+                removed += 1
+        return removed
+
+    def upsert(self, colleges: List[Dict[str, Any]]) -> int:
+        """
+        Insert or replace raw college records by name. Records failing the
+        cleaning rules still replace (i.e. remove) earlier rows of that name.
+        Returns the number of rows now stored for the upserted names.
+        """
+        if not colleges:
+            return 0
+        builder = ColumnChunkBuilder(len(colleges))
+        for college in colleges:
+            builder.append(college)
+        frame = builder.flush()
+        cleaned = clean_frame(frame)
+        # A fractional or missing value widens the column to float; stop reporting its extrema as ints
+        self.integer_columns &= {col for col in NUMERIC_COLUMNS if pd.api.types.is_integer_dtype(cleaned[col].dtype)}
+
+        self.delete(dict.fromkeys(frame['name'].tolist()))
+        values = frame_for_output(cleaned[NUMERIC_COLUMNS]).to_numpy(dtype=np.float64)
+        for name, row, region in zip(cleaned['name'].tolist(), values, cleaned['region'].tolist()):
+            self._add(name, tuple(row.tolist()), region)
+        return len(cleaned)
+
+    def _median(self, i: int) -> float:
+        values = self.sorted_values[i]
+        n = len(values)
+        if not n:
+            return float('nan')
+        if n % 2:
+            return float(values[n // 2])
+        return (values[n // 2 - 1] + values[n // 2]) / 2.0
+
+    def statistics(self) -> Dict[str, Any]:
+        """Same shape as CollegeDataProcessor.calculate_statistics()."""
+        stats = {}
+        for i, col in enumerate(NUMERIC_COLUMNS):
+            summary = self.moments.column_summary(col)
+            n = summary['count']
+            values = self.sorted_values[i]
+            minimum = values[0] if n else float('nan')
+            maximum = values[-1] if n else float('nan')
+            if col in self.integer_columns and n:
+                minimum, maximum = int(minimum), int(maximum)
+            stats[col] = {
+                'mean': summary['mean'],
+                'median': self._median(i),
+                'std': summary['std'],
+                'min': minimum,
+                'max': maximum,
+            }
+        return stats
+
+    def regional_analysis(self) -> Dict[str, Any]:
+        """Same shape as CollegeDataProcessor.analyze_by_region()."""
+        idx = {col: i for i, col in enumerate(NUMERIC_COLUMNS)}
+        regional_analysis = {}
+        for region, (count, sums, counts) in self.regions.items():
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means = sums / counts
+            total_enrollment = sums[idx['enrollment']]
+            regional_analysis[region] = {
+                'count': int(count),
+                'avg_acceptance_rate': float(means[idx['acceptance_rate']]),
+                'avg_tuition': float(means[idx['tuition']]),
+                'avg_sat': float(means[idx['sat_average']]),
+                'total_enrollment': int(round(total_enrollment)) if 'enrollment' in self.integer_columns else float(total_enrollment)
+            }
+        return regional_analysis
+
+    def correlations(self) -> Dict[str, float]:
+        """Same shape as CollegeDataProcessor.find_correlations()."""
+        return {key: self.moments.correlation(a, b) for key, (a, b) in CORRELATION_PAIRS.items()}
+
+    def sat_distribution(self, bins: int = SAT_BINS) -> List[Dict[str, int]]:
+        """The dashboard SAT histogram (same bins as pd.cut(bins=8, precision=0))."""
+        values = self.sorted_values[NUMERIC_COLUMNS.index('sat_average')]
+        if not len(values):
+            return []
+        # Let pandas derive edges and labels from the extrema alone
+        categories, edges = pd.cut(np.array([values[0], values[-1]], dtype=np.float64),
+                                   bins=bins, precision=0, retbins=True)
+        ranks = [0] + [values.rank_right(edge) for edge in edges[1:-1]] + [len(values)]
+        sat_data = []
+        for k, interval in enumerate(categories.categories):
+            sat_data.append({
+                'range': f"{int(interval.left)}-{int(interval.right)}",
+                'count': int(ranks[k + 1] - ranks[k]),
+                'midpoint': int((interval.left + interval.right) / 2)
+            })
+        return sat_data
+
+    def top_acceptance(self, count: int = TOP_ACCEPTANCE_COUNT) -> List[Dict[str, Any]]:
+        """The dashboard top-k list by acceptance rate."""
+        return [{'name': name, 'acceptance_rate': -neg_rate}
+                for neg_rate, _, name in self.acceptance_ranking.head(count)]
+
+    def save(self, path: str):
+        """
+        Persist the state as a versioned .npz of plain arrays, replacing path
+        atomically. The multisets are written in their sorted order so load()
+        does not sort them again.
+        """
+        stored = [(seq, name, values, region) for name, entries in self.rows.items()
+                  for seq, values, region in entries]
+        regions = list(self.regions.items())
+        ranking = list(self.acceptance_ranking)
+        arrays = {
+            'version': np.array(STATE_VERSION),
+            'columns': np.array(NUMERIC_COLUMNS),
+            'integer_columns': np.array([col in self.integer_columns for col in NUMERIC_COLUMNS]),
+            'next_seq': np.array(self.next_seq, dtype=np.int64),
+            'seq': np.array([row[0] for row in stored], dtype=np.int64),
+            'name': np.array([row[1] for row in stored], dtype=str),
+            'values': np.array([row[2] for row in stored], dtype=np.float64).reshape(-1, len(NUMERIC_COLUMNS)),
+            'region': np.array([row[3] for row in stored], dtype=str),
+            'count': self.moments.count,
+            'mean': self.moments.mean,
+            'm2': self.moments.m2,
+            'comoment': self.moments.comoment,
+            # Regions in their first-appearance order, with their running sums
+            'region_names': np.array([region for region, _ in regions], dtype=str),
+            'region_rows': np.array([entry[0] for _, entry in regions], dtype=np.int64),
+            'region_sums': np.array([entry[1] for _, entry in regions]).reshape(-1, len(NUMERIC_COLUMNS)),
+            'region_counts': np.array([entry[2] for _, entry in regions]).reshape(-1, len(NUMERIC_COLUMNS)),
+            'ranking_rate': np.array([entry[0] for entry in ranking], dtype=np.float64),
+            'ranking_seq': np.array([entry[1] for entry in ranking], dtype=np.int64),
+            'ranking_name': np.array([entry[2] for entry in ranking], dtype=str),
+        }
+        for col, values in zip(NUMERIC_COLUMNS, self.sorted_values):
+            arrays[f'sorted_{col}'] = np.fromiter(values, dtype=np.float64, count=len(values))
+        parent = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=parent)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> Optional['IncrementalAggregateState']:
+        """Load a persisted state, or None if there is none yet."""
+        try:
+            data = np.load(path, allow_pickle=False)
+        except FileNotFoundError:
+            return None
+        with data:
+            version = int(data['version'])
+            if version != STATE_VERSION or data['columns'].tolist() != NUMERIC_COLUMNS:
+                raise ValueError(f"{path} holds aggregate state version {version}; expected {STATE_VERSION}. "
+                                 f"Delete it to rebuild from the data file")
+            state = cls()
+            state.integer_columns = {col for col, flag in zip(NUMERIC_COLUMNS, data['integer_columns'].tolist()) if flag}
+            state.next_seq = int(data['next_seq'])
+            seqs, names, regions = data['seq'].tolist(), data['name'].tolist(), data['region'].tolist()
+            values = data['values']
+            for seq, name, row, region in zip(seqs, names, values.tolist(), regions):
+                state.rows.setdefault(name, []).append((seq, tuple(row), region))
+            state.moments.count, state.moments.mean = data['count'], data['mean']
+            state.moments.m2, state.moments.comoment = data['m2'], data['comoment']
+            for region, rows, sums, counts in zip(data['region_names'].tolist(), data['region_rows'].tolist(),
+                                                   data['region_sums'], data['region_counts']):
+                state.regions[region] = [rows, sums, counts]
+            state.sorted_values = [SortedMultiset(data[f'sorted_{col}'].tolist(), presorted=True)
+                                   for col in NUMERIC_COLUMNS]
+            state.acceptance_ranking = SortedMultiset(
+                zip(data['ranking_rate'].tolist(), data['ranking_seq'].tolist(), data['ranking_name'].tolist()),
+                presorted=True)
+        return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain aggregate state incrementally")
+    parser.add_argument('--state', default='aggregate_state.npz')
+    parser.add_argument('--data-file', default='college_admissions_data.json',
+                        help="Source used to build the state when none exists yet")
+    parser.add_argument('--changes', help='JSON file with {"upserts": [...], "deletes": [...]}')
+    args = parser.parse_args()
+
+    state = IncrementalAggregateState.load(args.state)
+    if state is None:
+        state = IncrementalAggregateState.from_frame(CollegeDataProcessor(args.data_file).clean_data())
+        print(f"Built aggregate state from {args.data_file}")
+
+    if args.changes:
+        with open(args.changes, 'r') as f:
+            changes = json.load(f)
+        removed = state.delete(changes.get('deletes', []))
+        stored = state.upsert(changes.get('upserts', []))
+        print(f"Applied changes: {removed} rows deleted, {stored} rows upserted")
+
+    state.save(args.state)
+    print(json.dumps({
+        'statistics': state.statistics(),
+        'regional_analysis': state.regional_analysis(),
+        'correlations': state.correlations(),
+        'sat_distribution': state.sat_distribution(),
+        'acceptance_rates': state.top_acceptance(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+from itertools import islice, repeat
+from typing import Dict, List, Any, Iterator, Optional
+import numpy as np
+import pandas as pd
+from stream_ingest import iter_records, COLUMNS, NUMERIC_COLUMNS, DEMOGRAPHIC_FIELDS, DEFAULT_CHUNK_SIZE
+from columnar_validation import ColumnarValidator, field_values, source_error_report, MISSING, DEFAULT_MAX_EXAMPLES
+from cleaning import rejection_codes, rejection_counts, describe_rejection, clean_frame
+
+
+class IngestResult:
+    """
+    Everything one pass over the source produces: the cleaned compact frame,
+    the validation report, and the rejection reasons of every dropped row.
+    """
+
+    def __init__(self, frame: pd.DataFrame, report: Dict[str, Any],
+                 rejected_rows: np.ndarray, rejected_codes: np.ndarray):
+        self.frame = frame
+        self.report = report
+        # Source row index and REJECTION_REASONS bitmask of each dropped row
+        self.rejected_rows = rejected_rows
+        self.rejected_codes = rejected_codes
+
+    def rejections(self) -> pd.DataFrame:
+        """One row per dropped entry with its source row index and the rules it failed."""
+        names = {code: describe_rejection(code) for code in np.unique(self.rejected_codes).tolist()}
+        return pd.DataFrame({
+            'row': self.rejected_rows,
+            'reasons': [names[code] for code in self.rejected_codes.tolist()],
+        })
+
+    def rejection_counts(self) -> Dict[str, int]:
+        """Number of dropped rows failing each cleaning rule."""
+        return rejection_counts(self.rejected_codes)
+
+
+def _iter_record_chunks(data_file: str, chunk_size: int) -> Iterator[List[Any]]:
+    records = iter_records(data_file)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _objects(values: List[Any]) -> np.ndarray:
+    return np.fromiter((None if v is MISSING else v for v in values), dtype=object, count=len(values))
+
+
+def _flatten(extracted: Dict[str, Any], offset: int) -> pd.DataFrame:
+    """Build the create_dataframe column layout from a validated chunk; unusable values become NaN/None."""
+    columns = extracted['columns']
+    n = len(columns['name'])
+    locations = columns['location']
+    if not all(map(isinstance, locations, repeat(dict))):
+        locations = [location if isinstance(location, dict) else {} for location in locations]
+
+    data = {'name': _objects(columns['name'])}
+    for col in NUMERIC_COLUMNS:
+        data[col] = extracted['numbers'][col]
+    data['state'] = _objects(field_values(locations, 'state'))
+    data['region'] = _objects(field_values(locations, 'region'))
+    for col, key in DEMOGRAPHIC_FIELDS.items():
+        data[col] = extracted['demographics'].get(key, np.full(n, np.nan))
+    return pd.DataFrame(data, columns=COLUMNS, index=pd.RangeIndex(offset, offset + n))
+
+
+def ingest_source(data_file: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  max_examples: Optional[int] = DEFAULT_MAX_EXAMPLES,
+                  detail_path: Optional[str] = None) -> IngestResult:
+    """
+    Parse the source (JSON array or NDJSON) once and produce both the
+    validation report and the cleaned frame.
+
+    Each chunk of records is validated column by column; the same extracted
+    columns are flattened and checked against CLEANING_RULES, so only rows
+    that pass are retained. The cleaned frame is indexed by source row.
+    The report and detail stream are as for ColumnarValidator. A missing or
+    unparseable source gives an empty frame and the failed report
+    DataValidator returns for it.
+    """
+    validator = ColumnarValidator(max_examples, detail_path)
+    kept, rejected_rows, rejected_codes = [], [], []
+    try:
+        for records in _iter_record_chunks(data_file, chunk_size):
+            offset = validator.total
+            frame = _flatten(validator.validate_chunk(records), offset)
+            codes = rejection_codes(frame)
+            rejected = np.flatnonzero(codes)
+            rejected_rows.append(rejected + offset)
+            rejected_codes.append(codes[rejected])
+            kept.append(frame[codes == 0])
+    except (FileNotFoundError, ValueError) as e:
+        validator.close()
+        message = f"Data file {data_file} not found" if isinstance(e, FileNotFoundError) else f"Invalid JSON format: {e}"
+        return IngestResult(clean_frame(pd.DataFrame(columns=COLUMNS)), source_error_report(message),
+                            np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8))
+
+    combined = pd.concat(kept) if kept else pd.DataFrame(columns=COLUMNS)
+    return IngestResult(
+        clean_frame(combined),
+        validator.report(),
+        np.concatenate(rejected_rows) if rejected_rows else np.empty(0, dtype=np.int64),
+        np.concatenate(rejected_codes) if rejected_codes else np.empty(0, dtype=np.uint8),
+    )
@@ -0,0 +1,330 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Any, Optional
+
+# Active tracer; None means instrumentation is off and every hook is a no-op
+_tracer: Optional['Tracer'] = None
+
+
+class _NullSpan:
+    """Stand-in returned while tracing is off, so call sites never branch."""
+
+    recording = False
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+class Span:
+    """One timed stage: wall and CPU time, memory change and arbitrary attributes (rows in/out, ...)."""
+
+    recording = True
+
+    def __init__(self, tracer: 'Tracer', name: str, span_id: int, parent: Optional['Span'], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = span_id
+        self.parent = parent
+        self.attributes = attributes
+        self.thread_id = threading.get_ident()
+        self.start_ns = self.end_ns = 0
+        self.cpu_start_ns = self.cpu_ns = 0
+        self.rss_start = self.rss_end = None
+        self.alloc_start = self.alloc_peak = 0
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def wall_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def __enter__(self):
+        self.tracer._start(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        self.tracer._end(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {
+            'name': self.name,
+            'span_id': self.span_id,
+            'parent_id': self.parent.span_id if self.parent else None,
+            'start_unix': self.tracer.epoch_unix + (self.start_ns - self.tracer.epoch_ns) / 1e9,
+            'wall_ms': round(self.wall_ms, 3),
+            'cpu_ms': round(self.cpu_ns / 1e6, 3),
+        }
+        if self.rss_start is not None and self.rss_end is not None:
+            record['rss_delta_mb'] = round((self.rss_end - self.rss_start) / 2 ** 20, 3)
+        if self.tracer.track_memory:
+            record['alloc_peak_mb'] = round((self.alloc_peak - self.alloc_start) / 2 ** 20, 3)
+        if self.error:
+            record['error'] = self.error
+        record['attributes'] = self.attributes
+        return record
+
+
+class JsonLogExporter:
+    """Writes one JSON object per finished span (NDJSON) to a path or stream as spans end."""
+
+    def __init__(self, target):
+        self._owned = isinstance(target, str)
+        self.stream = open(target, 'a') if self._owned else target
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps({'event': 'span', **span.to_dict()}, default=str)
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+    def close(self):
+        if self._owned:
+            self.stream.close()
+
+
+class ChromeTraceExporter:
+    """
+    Collects spans as Chrome trace "complete" events and writes them on close,
+    for chrome://tracing or https://ui.perfetto.dev.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.events: List[Dict[str, Any]] = []
+
+    def export(self, span: Span):
+        record = span.to_dict()
+        args = dict(record['attributes'], cpu_ms=record['cpu_ms'])
+        for key in ('rss_delta_mb', 'alloc_peak_mb', 'error'):
+            if key in record:
+                args[key] = record[key]
+        self.events.append({
+            'name': span.name, 'cat': span.name.split('.')[0], 'ph': 'X',
+            'ts': (span.start_ns - span.tracer.epoch_ns) / 1e3, 'dur': (span.end_ns - span.start_ns) / 1e3,
+            'pid': os.getpid(), 'tid': span.thread_id, 'args': args,
+        })
+
+    def close(self):
+        metadata = {'name': 'process_name', 'ph': 'M', 'pid': os.getpid(), 'args': {'name': 'college-analysis'}}
+        with open(self.path, 'w') as f:
+            json.dump({'traceEvents': [metadata] + self.events, 'displayTimeUnit': 'ms'}, f, default=str)
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stack of the thread that started tracing every
+    interval seconds and counts stacks, prefixed with the open span names, in
+    folded format (one "frame;frame;... count" line each) for flamegraph
+    tools such as flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, path: str, interval: float = 0.005):
+        self.path = path
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, tracer: 'Tracer'):
+        self._target = threading.get_ident()
+        self._tracer = tracer
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            spans = [span.name for span in self._tracer._stacks.get(self._target, [])]
+            self.samples[';'.join(spans + stack[::-1])] += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with open(self.path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Tracer:
+    """
+    Records spans and hands each finished one to every exporter. Spans nest
+    per thread. With track_memory, tracemalloc reports each span's peak
+    allocation above its starting point (this slows allocation-heavy code).
+    """
+
+    def __init__(self, exporters: Optional[List[Any]] = None, track_memory: bool = False,
+                 profiler: Optional[SamplingProfiler] = None):
+        self.exporters = list(exporters or [])
+        self.track_memory = track_memory
+        self.profiler = profiler
+        self.epoch_ns = time.perf_counter_ns()
+        self.epoch_unix = time.time()
+        self._stacks: Dict[int, List[Span]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def span(self, name: str, **attributes) -> Span:
+        stack = self._stacks.get(threading.get_ident())
+        with self._lock:
+            self._next_id += 1
+            span_id = self._next_id
+        return Span(self, name, span_id, stack[-1] if stack else None, attributes)
+
+    def current(self):
+        stack = self._stacks.get(threading.get_ident())
+        return stack[-1] if stack else NULL_SPAN
+
+    def _flush_peak(self, stack: List[Span]):
+        # tracemalloc has one global peak: credit it to every open span, then restart it
+        _, peak = tracemalloc.get_traced_memory()
+        for open_span in stack:
+            open_span.alloc_peak = max(open_span.alloc_peak, peak)
+        tracemalloc.reset_peak()
+
+    def _start(self, span: Span):
+        stack = self._stacks.setdefault(span.thread_id, [])
+        if self.track_memory:
+            self._flush_peak(stack)
+            span.alloc_start = span.alloc_peak = tracemalloc.get_traced_memory()[0]
+        stack.append(span)
+        span.rss_start = _rss_bytes()
+        span.cpu_start_ns = time.process_time_ns()
+        span.start_ns = time.perf_counter_ns()
+
+    def _end(self, span: Span):
+        span.end_ns = time.perf_counter_ns()
+        span.cpu_ns = time.process_time_ns() - span.cpu_start_ns
+        span.rss_end = _rss_bytes()
+        stack = self._stacks[span.thread_id]
+        if self.track_memory:
+            self._flush_peak(stack)
+        stack.remove(span)
+        for exporter in self.exporters:
+            exporter.export(span)
+
+    def start(self):
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.profiler is not None:
+            self.profiler.start(self)
+
+    def close(self):
+        if self.profiler is not None:
+            self.profiler.stop()
+        for exporter in self.exporters:
+            exporter.close()
+        if self.track_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def enable(exporters: Optional[List[Any]] = None, track_memory: bool = False,
+           profiler: Optional[SamplingProfiler] = None) -> Tracer:
+    """Start recording spans; replaces (and closes) any tracer already active."""
+    global _tracer
+    disable()
+    tracer = Tracer(exporters, track_memory, profiler)
+    tracer.start()
+    _tracer = tracer
+    return tracer
+
+
+def disable():
+    """Stop recording and flush exporters (writes the Chrome trace and profile)."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.close()
+
+
+def is_enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, **attributes):
+    """Context manager timing a block; NULL_SPAN (no cost beyond the call) while disabled."""
+    tracer = _tracer
+    if tracer is None:
+        return NULL_SPAN
+    return tracer.span(name, **attributes)
+
+
+def current_span():
+    """The innermost open span of this thread, for attaching attributes; NULL_SPAN if none."""
+    tracer = _tracer
+    if tracer is None:
+        return NULL_SPAN
+    return tracer.current()
+
+
+def traced(name: str):
+    """Decorator recording each call as a span named name."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return fn(*args, **kwargs)
+            with tracer.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def add_arguments(parser):
+    """Add the --trace / --trace-log / --trace-memory / --profile options to a CLI."""
+    group = parser.add_argument_group('instrumentation')
+    group.add_argument('--trace', metavar='FILE', help="Write a Chrome trace (chrome://tracing, Perfetto) of every stage")
+    group.add_argument('--trace-log', metavar='FILE', help="Append one JSON log line per stage")
+    group.add_argument('--trace-memory', action='store_true', help="Record peak allocation per stage (slower)")
+    group.add_argument('--profile', metavar='FILE', help="Write sampled stacks in folded flamegraph format")
+    group.add_argument('--profile-interval', type=float, default=0.005, help="Seconds between profile samples")
+
+
+def enable_from_args(args) -> Optional[Tracer]:
+    """Enable tracing as requested by add_arguments() options; returns None when none were given."""
+    exporters = []
+    if args.trace:
+        exporters.append(ChromeTraceExporter(args.trace))
+    if args.trace_log:
+        exporters.append(JsonLogExporter(args.trace_log))
+    profiler = SamplingProfiler(args.profile, args.profile_interval) if args.profile else None
+    if not exporters and profiler is None and not args.trace_memory:
+        return None
+    return enable(exporters, args.trace_memory, profiler)
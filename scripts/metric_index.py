@@ -0,0 +1,212 @@
+import math
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+import pandas as pd
+from aggregates import AGGREGATE_COLUMNS
+
+METRIC_INDEX_VERSION = 2
+GLOBAL = 'all'
+# Partition dimensions indexed by CollegeDataProcessor.get_metric_index()
+DEFAULT_INDEX_PARTITIONS = ('region', 'state')
+
+
+def _inclusive_bound(dtype: np.dtype, value: float, side: str):
+    """A query bound in the index's own dtype, so comparisons are exact."""
+    if np.issubdtype(dtype, np.integer):
+        limit = np.iinfo(dtype)
+        value = math.ceil(value) if side == 'low' else math.floor(value)
+        return min(max(value, limit.min - 1), limit.max + 1)
+    return dtype.type(value)
+
+
+class _SortedRun:
+    """Row positions of one grain (all rows or one partition) sorted by a metric, NaNs last."""
+
+    __slots__ = ('order', 'values', 'valid')
+
+    def __init__(self, order: np.ndarray, values: np.ndarray, valid: int):
+        self.order = order
+        self.values = values
+        self.valid = valid
+
+    def between(self, low: Optional[float], high: Optional[float]) -> Tuple[int, int]:
+        """Slice [start, stop) of the run whose values lie within inclusive bounds: O(log n)."""
+        values = self.values[:self.valid]
+        start = 0 if low is None else int(np.searchsorted(values, _inclusive_bound(values.dtype, low, 'low'), 'left'))
+        stop = self.valid if high is None else int(np.searchsorted(values, _inclusive_bound(values.dtype, high, 'high'), 'right'))
+        return start, max(start, stop)
+
+
+class MetricIndex:
+    """
+    Sorted permutation indexes of the cleaned frame, one per numeric metric,
+    optionally also per partition (e.g. per region or state).
+
+    Each index stores row positions in ascending metric order alongside the
+    sorted values, so top-k, bottom-k, rank and range queries are a binary
+    search plus a slice instead of a scan or sort of the frame. Ties are
+    ordered by row position, matching DataFrame.nlargest / nsmallest.
+    """
+
+    def __init__(self, metrics: List[str], partition_by: Tuple[str, ...] = ()):
+        self.metrics = list(metrics)
+        self.partition_by = tuple(partition_by)
+        self.rows = 0
+        # (grain, partition value, metric) -> sorted run; grain GLOBAL has partition value None
+        self.runs: Dict[Tuple[str, Any, str], _SortedRun] = {}
+        self._inverses: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, metrics: Optional[List[str]] = None,
+              partition_by: Tuple[str, ...] = ()) -> 'MetricIndex':
+        index = cls(metrics or AGGREGATE_COLUMNS, partition_by)
+        index.rows = len(df)
+        position_dtype = np.int32 if len(df) < 2 ** 31 else np.int64
+        partitions = {dim: pd.factorize(df[dim].to_numpy(), use_na_sentinel=False) for dim in index.partition_by}
+        for metric in index.metrics:
+            values = df[metric].to_numpy()
+            # Stable sort keeps tied rows in position order; NaNs sort last
+            order = np.argsort(values, kind='stable').astype(position_dtype)
+            sorted_values = values[order]
+            valid = len(values) - int(pd.isna(sorted_values).sum()) if sorted_values.dtype.kind == 'f' else len(values)
+            index.runs[(GLOBAL, None, metric)] = _SortedRun(order, sorted_values, valid)
+            for dim, (codes, uniques) in partitions.items():
+                # Filtering the global order by partition keeps each partition sorted
+                ordered_codes = codes[order]
+                grouped = np.argsort(ordered_codes, kind='stable')
+                bounds = np.searchsorted(ordered_codes[grouped], np.arange(len(uniques) + 1), 'left')
+                for code, member in enumerate(uniques):
+                    picked = grouped[bounds[code]:bounds[code + 1]]
+                    run_values = sorted_values[picked]
+                    run_valid = len(picked) - int(pd.isna(run_values).sum()) if run_values.dtype.kind == 'f' else len(picked)
+                    index.runs[(dim, member, metric)] = _SortedRun(order[picked], run_values, run_valid)
+        return index
+
+    def _run(self, metric: str, partition: Optional[Tuple[str, Any]]) -> Optional[_SortedRun]:
+        if metric not in self.metrics:
+            raise ValueError(f"No index for metric '{metric}'")
+        if partition is None:
+            return self.runs[(GLOBAL, None, metric)]
+        dim, member = partition
+        if dim not in self.partition_by:
+            raise ValueError(f"Index is not partitioned by '{dim}'")
+        return self.runs.get((dim, member, metric))
+
+    def top_k(self, metric: str, k: int, partition: Optional[Tuple[str, Any]] = None) -> np.ndarray:
+        """Positions of the k largest values, largest first, ties by position."""
+        run = self._run(metric, partition)
+        if run is None or k <= 0 or not run.valid:
+            return np.empty(0, dtype=np.int64)
+        k = min(k, run.valid)
+        # Include every row tied with the k-th largest value, then order the tail
+        start = int(np.searchsorted(run.values[:run.valid], run.values[run.valid - k], 'left'))
+        order = run.order[start:run.valid]
+        values = run.values[start:run.valid]
+        tail = np.lexsort((order, -values.astype(np.float64)))
+        return order[tail[:k]].astype(np.int64)
+
+    def bottom_k(self, metric: str, k: int, partition: Optional[Tuple[str, Any]] = None) -> np.ndarray:
+        """Positions of the k smallest values, smallest first, ties by position."""
+        run = self._run(metric, partition)
+        if run is None or k <= 0:
+            return np.empty(0, dtype=np.int64)
+        return run.order[:min(k, run.valid)].astype(np.int64)
+
+    def rank(self, metric: str, value, descending: bool = True,
+             partition: Optional[Tuple[str, Any]] = None) -> Optional[int]:
+        """1-based competition rank a value would have (1 + number of strictly better values)."""
+        run = self._run(metric, partition)
+        if run is None or pd.isna(value):
+            return None
+        values = run.values[:run.valid]
+        value = values.dtype.type(value)
+        if descending:
+            return run.valid - int(np.searchsorted(values, value, 'right')) + 1
+        return int(np.searchsorted(values, value, 'left')) + 1
+
+    def range(self, metric: str, low: Optional[float] = None, high: Optional[float] = None,
+              partition: Optional[Tuple[str, Any]] = None) -> np.ndarray:
+        """Positions with low <= value <= high (None leaves a side open), in ascending metric order."""
+        run = self._run(metric, partition)
+        if run is None:
+            return np.empty(0, dtype=np.int64)
+        start, stop = run.between(low, high)
+        return run.order[start:stop].astype(np.int64)
+
+    def query(self, bounds: Dict[str, Tuple[Optional[float], Optional[float]]],
+              partition: Optional[Tuple[str, Any]] = None) -> np.ndarray:
+        """
+        Positions satisfying every inclusive (low, high) bound, in row order.
+        The most selective bound is answered from its index; only that slice
+        is checked against the other bounds.
+        """
+        if not bounds:
+            raise ValueError("query needs at least one bound")
+        slices = {}
+        for metric, (low, high) in bounds.items():
+            run = self._run(metric, partition)
+            if run is None:
+                return np.empty(0, dtype=np.int64)
+            slices[metric] = (run, run.between(low, high))
+        driver = min(slices, key=lambda metric: slices[metric][1][1] - slices[metric][1][0])
+        run, (start, stop) = slices[driver]
+        candidates = run.order[start:stop].astype(np.int64)
+        for metric, (low, high) in bounds.items():
+            if metric == driver or not len(candidates):
+                continue
+            values = self.values_at(metric, candidates)
+            keep = ~pd.isna(values)
+            if low is not None:
+                keep &= values >= _inclusive_bound(values.dtype, low, 'low')
+            if high is not None:
+                keep &= values <= _inclusive_bound(values.dtype, high, 'high')
+            candidates = candidates[keep]
+        return np.sort(candidates)
+
+    def values_at(self, metric: str, positions: np.ndarray) -> np.ndarray:
+        """Metric values at row positions, read through the inverse permutation."""
+        if metric not in self._inverses:
+            order = self.runs[(GLOBAL, None, metric)].order
+            inverse = np.empty(len(order), dtype=order.dtype)
+            inverse[order] = np.arange(len(order), dtype=order.dtype)
+            self._inverses[metric] = inverse
+        return self.runs[(GLOBAL, None, metric)].values[self._inverses[metric][positions]]
+
+    def to_frame(self) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """Flatten into equal-length columns plus partition offsets, for ColumnCache."""
+        columns, offsets = {}, {}
+        for grain in (GLOBAL,) + self.partition_by:
+            for metric in self.metrics:
+                keys = [key for key in self.runs if key[0] == grain and key[2] == metric]
+                runs = [self.runs[key] for key in keys]
+                columns[f"{grain}__{metric}__order"] = np.concatenate([run.order for run in runs])
+                columns[f"{grain}__{metric}__values"] = np.concatenate([run.values for run in runs])
+                start, entries = 0, []
+                for key, run in zip(keys, runs):
+                    entries.append([None if grain == GLOBAL else _json_value(key[1]), start, run.valid, len(run.order)])
+                    start += len(run.order)
+                offsets[f"{grain}__{metric}"] = entries
+        meta = {'version': METRIC_INDEX_VERSION, 'rows': self.rows, 'metrics': self.metrics,
+                'partition_by': list(self.partition_by), 'offsets': offsets}
+        return pd.DataFrame(columns), meta
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, meta: Dict[str, Any]) -> 'MetricIndex':
+        """Rebuild from to_frame output; column arrays are used as-is (e.g. memory-mapped)."""
+        index = cls(meta['metrics'], tuple(meta['partition_by']))
+        index.rows = meta['rows']
+        for grain in (GLOBAL,) + index.partition_by:
+            for metric in index.metrics:
+                prefix = f"{grain}__{metric}"
+                order = frame[f"{prefix}__order"].to_numpy()
+                values = frame[f"{prefix}__values"].to_numpy()
+                for member, start, valid, length in meta['offsets'][prefix]:
+                    run = _SortedRun(order[start:start + length], values[start:start + length], valid)
+                    index.runs[(grain, None if grain == GLOBAL else member, metric)] = run
+        return index
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
@@ -0,0 +1,450 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+from data_processor import CollegeDataProcessor
+from aggregates import summarize_columns
+from cleaning import frame_for_output
+from rollup_cube import RollupCube, regional_summary
+from stream_ingest import NUMERIC_COLUMNS, DEMOGRAPHIC_COLUMNS
+
+DEFAULT_CACHE_ENTRIES = 1024
+MAX_TOP_K = 1000
+MAX_HEADER_BYTES = 16 * 1024
+METRIC_COLUMNS = NUMERIC_COLUMNS + DEMOGRAPHIC_COLUMNS
+
+
+class QueryError(ValueError):
+    """A request the service cannot answer; reported as 400 Bad Request."""
+
+
+def _jsonable(value: Any) -> Any:
+    # NaN/inf (e.g. statistics of an empty slice) are not valid JSON
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, np.generic):
+        return _jsonable(value.item())
+    return value
+
+
+class QueryStore:
+    """
+    Cleaned columns of one CollegeDataProcessor kept resident, plus the
+    indexes that make filtered queries cheap: row positions per region and
+    state, a name -> rows map, float64 views of every metric and the
+    processor's sorted metric index for top-k and range filters and its
+    similarity index for nearest-neighbour lookups.
+    """
+
+    def __init__(self, processor: CollegeDataProcessor):
+        self.processor = processor
+        df = processor.df if processor.df is not None else processor.clean_data()
+        self.df = df
+        self.values = {col: df[col].to_numpy(dtype=np.float64) for col in METRIC_COLUMNS}
+        self.index = processor.get_metric_index()
+        self.similarity = processor.get_similarity_index()
+        self.region_rows = {key: np.sort(rows) for key, rows in df.groupby('region', observed=True, sort=False).indices.items()}
+        self.state_rows = {key: np.sort(rows) for key, rows in df.groupby('state', observed=True, sort=False).indices.items()}
+        self.name_rows: Dict[str, List[int]] = {}
+        for position, name in enumerate(df['name'].tolist()):
+            self.name_rows.setdefault(name, []).append(position)
+
+    def select(self, params: Dict[str, List[str]]) -> Optional[np.ndarray]:
+        """
+        Row positions matching the filters, or None for every row.
+        Filters: region and state (repeatable or comma-separated), name
+        (repeatable; names may contain commas) and min_<metric> /
+        max_<metric> inclusive bounds.
+        """
+        selected = None
+
+        def restrict(rows: np.ndarray):
+            nonlocal selected
+            selected = rows if selected is None else np.intersect1d(selected, rows, assume_unique=True)
+
+        for key, index in (('region', self.region_rows), ('state', self.state_rows)):
+            wanted = _list_param(params, key)
+            if wanted:
+                parts = [index[value] for value in wanted if value in index]
+                restrict(np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64))
+        names = params.get('name')
+        if names:
+            restrict(np.unique(np.array([row for name in names for row in self.name_rows.get(name, [])],
+                                        dtype=np.int64)))
+
+        bounds: Dict[str, List[Optional[float]]] = {}
+        for key in params:
+            bound, _, metric = key.partition('_')
+            if bound not in ('min', 'max') or not metric:
+                continue
+            if metric not in self.values:
+                raise QueryError(f"Unknown metric '{metric}'")
+            bounds.setdefault(metric, [None, None])[bound == 'max'] = _float_param(params, key)
+        if bounds and selected is None:
+            # Answered from the sorted index: a binary search per bound
+            return self.index.query({metric: tuple(pair) for metric, pair in bounds.items()})
+        for metric, (low, high) in bounds.items():
+            values = self.values[metric][selected]
+            keep = ~np.isnan(values)
+            if low is not None:
+                keep &= values >= low
+            if high is not None:
+                keep &= values <= high
+            selected = selected[keep]
+        return selected
+
+    def _partition(self, params) -> Tuple[bool, Optional[Tuple[str, Any]]]:
+        """Whether the filters are at most one region or state, and that partition."""
+        partition = None
+        for key in params:
+            if key in ('metric', 'k', 'order'):
+                continue
+            values = _list_param(params, key) if key in ('region', 'state') else None
+            if partition is not None or not values or len(values) != 1:
+                return False, None
+            partition = (key, values[0])
+        return True, partition
+
+    def frame(self, rows: Optional[np.ndarray]):
+        return self.df if rows is None else self.df.iloc[rows]
+
+    def statistics(self, params) -> Dict[str, Any]:
+        rows = self.select(params)
+        if rows is None:
+            stats = self.processor.calculate_statistics()
+        else:
+            stats = summarize_columns(self.frame(rows), NUMERIC_COLUMNS)
+        return {'rows': len(self.df) if rows is None else len(rows), 'statistics': stats}
+
+    def regions(self, params) -> Dict[str, Any]:
+        rows = self.select(params)
+        if rows is None:
+            return self.processor.analyze_by_region()
+        return regional_summary(RollupCube.build(self.frame(rows)))
+
+    def top(self, params) -> List[Dict[str, Any]]:
+        metric = _metric_param(params, 'metric', 'acceptance_rate')
+        k = min(_int_param(params, 'k', 15), MAX_TOP_K)
+        order = (params.get('order') or ['desc'])[-1]
+        if order not in ('desc', 'asc'):
+            raise QueryError("order must be 'desc' or 'asc'")
+        indexed, partition = self._partition(params)
+        if indexed:
+            if order == 'desc':
+                chosen = self.index.top_k(metric, k, partition)
+            else:
+                chosen = self.index.bottom_k(metric, k, partition)
+        else:
+            rows = self.select(params)
+            positions = np.arange(len(self.df)) if rows is None else rows
+            values = self.values[metric][positions]
+            present = ~np.isnan(values)
+            positions, values = positions[present], values[present]
+            keys = -values if order == 'desc' else values
+            candidates = np.arange(len(keys))
+            if 0 < k < len(keys):
+                # Everything tied with the k-th value competes, so ties resolve by row like nlargest
+                kth = np.partition(keys, k - 1)[k - 1]
+                candidates = np.flatnonzero(keys <= kth)
+            chosen = positions[candidates[np.lexsort((positions[candidates], keys[candidates]))][:k]]
+        columns = ['name', 'state', 'region', metric]
+        return frame_for_output(self.df.iloc[chosen][columns]).to_dict('records')
+
+    def histogram(self, params) -> List[Dict[str, Any]]:
+        column = _metric_param(params, 'column', 'sat_average')
+        bins = _int_param(params, 'bins', 8)
+        if bins > 1000:
+            raise QueryError("bins must be between 1 and 1000")
+        rows = self.select(params)
+        values = self.values[column] if rows is None else self.values[column][rows]
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return []
+        counts, edges = np.histogram(values, bins=bins)
+        return [{'left': float(edges[i]), 'right': float(edges[i + 1]), 'count': int(counts[i])}
+                for i in range(bins)]
+
+    def colleges(self, params) -> List[Dict[str, Any]]:
+        """Rows of the colleges chosen in the college selector (name=... filters)."""
+        if not params.get('name'):
+            raise QueryError("colleges requires at least one name")
+        return frame_for_output(self.frame(self.select(params))).to_dict('records')
+
+    def similar(self, params) -> List[Dict[str, Any]]:
+        """The k colleges most like the named one, nearest first, with their distance."""
+        names = params.get('name')
+        if not names:
+            raise QueryError("similar requires a name")
+        k = min(_int_param(params, 'k', 10), MAX_TOP_K)
+        try:
+            similar = self.processor.similar_colleges(names[-1], k)
+        except KeyError:
+            raise QueryError(f"Unknown college '{names[-1]}'")
+        return frame_for_output(similar).to_dict('records')
+
+
+def _list_param(params: Dict[str, List[str]], key: str) -> List[str]:
+    return [part for value in params.get(key, []) for part in value.split(',') if part]
+
+
+def _float_param(params: Dict[str, List[str]], key: str, default: Optional[float] = None) -> float:
+    values = params.get(key)
+    if not values:
+        if default is None:
+            raise QueryError(f"Missing parameter '{key}'")
+        return default
+    try:
+        value = float(values[-1])
+    except ValueError:
+        raise QueryError(f"Parameter '{key}' must be a number")
+    if not math.isfinite(value):
+        raise QueryError(f"Parameter '{key}' must be a finite number")
+    return value
+
+
+def _int_param(params: Dict[str, List[str]], key: str, default: int) -> int:
+    """A positive whole-number parameter; nan, inf, fractions and values below 1 are rejected."""
+    value = _float_param(params, key, default)
+    if value != int(value) or value < 1:
+        raise QueryError(f"Parameter '{key}' must be a positive integer")
+    return int(value)
+
+
+def _metric_param(params: Dict[str, List[str]], key: str, default: str) -> str:
+    metric = (params.get(key) or [default])[-1]
+    if metric not in METRIC_COLUMNS:
+        raise QueryError(f"Unknown metric '{metric}'")
+    return metric
+
+
+class LRUCache:
+    """Response bodies keyed by normalized request, evicting the least recently used."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[Tuple, Tuple[str, bytes]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[Tuple[str, bytes]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Tuple, entry: Tuple[str, bytes]):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class QueryService:
+    """
+    Minimal asyncio HTTP/1.1 service answering dashboard queries from a
+    resident QueryStore.
+
+    GET endpoints: /stats, /regions, /top, /histogram, /colleges, /similar and /health;
+    POST /reload re-reads the data file. Responses carry an ETag and honour
+    If-None-Match with 304. Results are cached in an LRU keyed by path and
+    normalized query; a reload swaps the store and clears the cache.
+    Query handlers run in the default thread pool, so a slow /similar or
+    /histogram does not stall other connections; unexpected errors are
+    answered with 500.
+    """
+
+    ROUTES = {
+        '/stats': 'statistics',
+        '/regions': 'regions',
+        '/top': 'top',
+        '/histogram': 'histogram',
+        '/colleges': 'colleges',
+        '/similar': 'similar',
+    }
+
+    def __init__(self, data_file: str = 'college_admissions_data.json', cache_dir: Optional[str] = None,
+                 cache_entries: int = DEFAULT_CACHE_ENTRIES, watch_interval: Optional[float] = None):
+        self.data_file = data_file
+        self.cache_dir = cache_dir
+        self.cache = LRUCache(cache_entries)
+        self.watch_interval = watch_interval
+        self.version = 0
+        self.store: Optional[QueryStore] = None
+        self._source_mtime = None
+        self._server = None
+        self._watcher = None
+
+    def _load_store(self) -> QueryStore:
+        processor = CollegeDataProcessor(self.data_file, cache_dir=self.cache_dir)
+        processor.clean_data()
+        return QueryStore(processor)
+
+    async def reload(self):
+        """Load the data file off the event loop, then swap the store and invalidate cached results."""
+        mtime = os.stat(self.data_file).st_mtime_ns
+        store = await asyncio.get_running_loop().run_in_executor(None, self._load_store)
+        self.store = store
+        self._source_mtime = mtime
+        self.version += 1
+        self.cache.clear()
+
+    async def _watch(self):
+        # Reload when the data file is replaced
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            try:
+                mtime = os.stat(self.data_file).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if mtime != self._source_mtime:
+                try:
+                    await self.reload()
+                except Exception as e:
+                    # Keep serving the current store; retried once the file changes again
+                    self._source_mtime = mtime
+                    print(f"Reload of {self.data_file} failed, still serving version {self.version}: "
+                          f"{type(e).__name__}: {e}")
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765):
+        if self.store is None:
+            await self.reload()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        if self.watch_interval:
+            self._watcher = asyncio.create_task(self._watch())
+        return self._server
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def respond(self, method: str, target: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Answer one request: (status, headers, body)."""
+        url = urlsplit(target)
+        if method == 'POST' and url.path == '/reload':
+            await self.reload()
+            return 200, {'Cache-Control': 'no-store'}, json.dumps({'version': self.version}).encode('utf-8')
+        if method not in ('GET', 'HEAD'):
+            return 405, {'Allow': 'GET, HEAD, POST'}, b''
+        if url.path == '/health':
+            body = json.dumps({'rows': len(self.store.df), 'version': self.version,
+                               'cache': {'entries': len(self.cache.entries), 'hits': self.cache.hits,
+                                         'misses': self.cache.misses}}).encode('utf-8')
+            return 200, {'Cache-Control': 'no-store'}, body
+        handler = self.ROUTES.get(url.path)
+        if handler is None:
+            return 404, {}, json.dumps({'error': f"Unknown path {url.path}"}).encode('utf-8')
+
+        params = parse_qs(url.query)
+        key = (url.path, tuple(sorted((name, tuple(values)) for name, values in params.items())))
+        entry = self.cache.get(key)
+        if entry is None:
+            # A reload may swap the store while the handler runs; answer from the one captured here
+            store, version = self.store, self.version
+            # CPU-bound; keep the event loop free for other connections
+            call = getattr(store, handler)
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(None, call, params)
+            except QueryError as e:
+                return 400, {}, json.dumps({'error': str(e)}).encode('utf-8')
+            body = json.dumps(_jsonable(result), separators=(',', ':')).encode('utf-8')
+            etag = f'"{version}-{hashlib.sha1(body).hexdigest()[:16]}"'
+            entry = (etag, body)
+            if self.version == version:
+                self.cache.put(key, entry)
+
+        etag, body = entry
+        response_headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag in [tag.strip() for tag in headers.get('if-none-match', '').split(',')]:
+            return 304, response_headers, b''
+        return 200, response_headers, body
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                if len(head) > MAX_HEADER_BYTES:
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(':')
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0) or 0)
+                if length:
+                    await reader.readexactly(length)
+
+                try:
+                    status, response_headers, body = await self.respond(method, target, headers)
+                except Exception as e:
+                    # Never drop the connection without an answer
+                    status, response_headers = 500, {}
+                    body = json.dumps({'error': f"Internal error: {type(e).__name__}"}).encode('utf-8')
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                head_lines = [f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}",
+                              f"Content-Length: {len(body)}",
+                              f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                if status != 304:
+                    head_lines.append("Content-Type: application/json")
+                head_lines += [f"{name}: {value}" for name, value in response_headers.items()]
+                writer.write(('\r\n'.join(head_lines) + '\r\n\r\n').encode('latin-1'))
+                if method != 'HEAD':
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+
+_REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            500: 'Internal Server Error'}
+
+
+async def serve(args):
+    service = QueryService(args.data_file, args.cache_dir, args.cache_entries, args.watch)
+    await service.start(args.host, args.port)
+    print(f"Serving {len(service.store.df)} colleges on http://{args.host}:{service.port}")
+    async with service._server:
+        await service._server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve dashboard queries from resident cleaned data")
+    parser.add_argument('--data-file', default='college_admissions_data.json')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--cache-dir', default='.college_cache')
+    parser.add_argument('--cache-entries', type=int, default=DEFAULT_CACHE_ENTRIES)
+    parser.add_argument('--watch', type=float, help="Seconds between checks for a changed data file")
+    asyncio.run(serve(parser.parse_args()))
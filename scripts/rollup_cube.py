@@ -0,0 +1,142 @@
+from itertools import product
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+import pandas as pd
+from stream_ingest import NUMERIC_COLUMNS, DEMOGRAPHIC_COLUMNS
+
+# Dimensions and measures of the default cube; add dimensions here as the feed grows
+CUBE_DIMENSIONS = ['region', 'state']
+CUBE_MEASURES = NUMERIC_COLUMNS + DEMOGRAPHIC_COLUMNS
+
+# Marker for a rolled-up dimension in a cell key
+ALL = '*'
+
+
+class CubeCell:
+    """Row count plus per-measure non-null counts, sums and sums of squares."""
+
+    __slots__ = ('count', 'n', 'sums', 'squares')
+
+    def __init__(self, count: int, n: np.ndarray, sums: np.ndarray, squares: np.ndarray):
+        self.count = count
+        self.n = n
+        self.sums = sums
+        self.squares = squares
+
+    def add(self, other: 'CubeCell'):
+        self.count += other.count
+        self.n = self.n + other.n
+        self.sums = self.sums + other.sums
+        self.squares = self.squares + other.squares
+
+
+class RollupCube:
+    """
+    Precomputed rollup cube over a set of dimensions.
+
+    One pass over the rows aggregates the finest (all-dimensions) grain; every
+    roll-up is then derived from those cells, so any slice - e.g. a region, a
+    (region, state) pair, or the grand total - is a single dict lookup.
+    Cells are kept in first-appearance order of their dimension values.
+    """
+
+    def __init__(self, dimensions: List[str], measures: List[str]):
+        self.dimensions = list(dimensions)
+        self.measures = list(measures)
+        self._index = {m: i for i, m in enumerate(self.measures)}
+        self.cells: Dict[Tuple, CubeCell] = {}
+        self.integer_measures = set()
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, dimensions: Optional[List[str]] = None,
+              measures: Optional[List[str]] = None) -> 'RollupCube':
+        """Aggregate a frame into the base grain and derive every roll-up."""
+        cube = cls(dimensions or CUBE_DIMENSIONS, measures or CUBE_MEASURES)
+        cube.integer_measures = {m for m in cube.measures if pd.api.types.is_integer_dtype(df[m].dtype)}
+        if not len(df):
+            return cube
+
+        values = df[cube.measures].to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+        filled = np.where(present, values, 0.0)
+        k = len(cube.measures)
+        stacked = pd.DataFrame(np.hstack([present.astype(np.float64), filled, filled * filled]))
+        keys = [df[d].to_numpy() for d in cube.dimensions]
+        grouped = stacked.groupby(keys, sort=False)
+        totals = grouped.sum()
+        sizes = grouped.size().to_numpy()
+
+        base = {}
+        for key, size, row in zip(totals.index, sizes, totals.to_numpy()):
+            key = key if isinstance(key, tuple) else (key,)
+            base[key] = CubeCell(int(size), row[:k], row[k:2 * k], row[2 * k:])
+
+        # Roll up each base cell into every combination of its dimensions and ALL
+        for key, cell in base.items():
+            for mask in product((False, True), repeat=len(key)):
+                rolled = tuple(ALL if rollup else value for value, rollup in zip(key, mask))
+                target = cube.cells.get(rolled)
+                if target is None:
+                    cube.cells[rolled] = CubeCell(cell.count, cell.n.copy(), cell.sums.copy(), cell.squares.copy())
+                else:
+                    target.add(cell)
+        return cube
+
+    def key(self, **slice_values) -> Tuple:
+        """Cell key for a slice; unspecified dimensions are rolled up."""
+        unknown = set(slice_values) - set(self.dimensions)
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions: {sorted(unknown)}")
+        return tuple(slice_values.get(d, ALL) for d in self.dimensions)
+
+    def cell(self, **slice_values) -> Optional[CubeCell]:
+        """O(1) lookup of a slice or roll-up, e.g. cell(region='West', state='CA')."""
+        return self.cells.get(self.key(**slice_values))
+
+    def members(self, dimension: str) -> List[Any]:
+        """Values of one dimension, in first-appearance order."""
+        pos = self.dimensions.index(dimension)
+        return [key[pos] for key in self.cells
+                if key[pos] != ALL and all(v == ALL for i, v in enumerate(key) if i != pos)]
+
+    def count(self, **slice_values) -> int:
+        cell = self.cell(**slice_values)
+        return cell.count if cell else 0
+
+    def total(self, measure: str, **slice_values) -> float:
+        cell = self.cell(**slice_values)
+        if cell is None:
+            return 0
+        value = cell.sums[self._index[measure]]
+        return int(round(value)) if measure in self.integer_measures else float(value)
+
+    def mean(self, measure: str, **slice_values) -> float:
+        cell = self.cell(**slice_values)
+        i = self._index[measure]
+        if cell is None or not cell.n[i]:
+            return float('nan')
+        return float(cell.sums[i] / cell.n[i])
+
+    def std(self, measure: str, **slice_values) -> float:
+        """Sample standard deviation of a measure within a slice."""
+        cell = self.cell(**slice_values)
+        i = self._index[measure]
+        if cell is None or cell.n[i] < 2:
+            return float('nan')
+        n = cell.n[i]
+        variance = (cell.squares[i] - cell.sums[i] * cell.sums[i] / n) / (n - 1)
+        return float(np.sqrt(max(variance, 0.0)))
+
+
+def regional_summary(cube: RollupCube) -> Dict[str, Any]:
+    """Per-region count, averages and total enrollment, as CollegeDataProcessor.analyze_by_region returns."""
+    return {
+        region: {
+            'count': cube.count(region=region),
+            'avg_acceptance_rate': cube.mean('acceptance_rate', region=region),
+            'avg_tuition': cube.mean('tuition', region=region),
+            'avg_sat': cube.mean('sat_average', region=region),
+            'total_enrollment': cube.total('enrollment', region=region)
+        }
+        for region in cube.members('region')
+    }
@@ -0,0 +1,277 @@
+import os
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+import pandas as pd
+from aggregates import ColumnAggregates, AGGREGATE_COLUMNS, CORRELATION_PAIRS
+from cleaning import clean_frame, FLOAT32_OUTPUT_DECIMALS
+from sketches import SketchSet
+from stream_ingest import ColumnChunkBuilder, iter_column_chunks, is_json_array, NUMERIC_COLUMNS, DEFAULT_CHUNK_SIZE
+
+# Metrics summed per region for analyze_by_region()
+REGION_COLUMNS = NUMERIC_COLUMNS
+
+
+class ShardedAggregate:
+    """
+    Mergeable partial results for one shard of the input.
+
+    Covers what calculate_statistics(), analyze_by_region() and
+    find_correlations() report: Welford-style count/mean/M2, extrema and
+    co-moments via ColumnAggregates, plus per-region counts and sums.
+    Exact medians are not mergeable from moments, so each shard carries the
+    value counts of its headline metrics (sorted distinct values and their
+    counts). The metrics are whole numbers or tenths within fixed ranges, so
+    this is bounded by the number of distinct values, not rows. With
+    sketch_k, medians and percentiles come from constant-size KLL sketches
+    instead; keep_values ships every value to the parent (O(rows), opt-in).
+    sketch_seed seeds the sketches' compactions (see _shard_seed()).
+    """
+
+    def __init__(self, sketch_k: Optional[int] = None, keep_values: bool = False,
+                 sketch_seed: Optional[Tuple[int, ...]] = None):
+        self.rows_in = 0
+        self.columns = ColumnAggregates(AGGREGATE_COLUMNS)
+        # region -> (row count, per-metric sums, per-metric non-null counts)
+        self.regions: Dict[str, Tuple[int, np.ndarray, np.ndarray]] = {}
+        # column -> (sorted distinct values, counts)
+        self.value_counts: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.keep_values = keep_values
+        self.median_values: List[np.ndarray] = []
+        self.sketches = SketchSet(AGGREGATE_COLUMNS, sketch_k, sketch_seed) if sketch_k else None
+        self.integer_columns = set(NUMERIC_COLUMNS)
+        self.float32_columns = set(NUMERIC_COLUMNS)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, rows_in: Optional[int] = None,
+                   sketch_k: Optional[int] = None, keep_values: bool = False,
+                   sketch_seed: Optional[Tuple[int, ...]] = None) -> 'ShardedAggregate':
+        """Aggregate an already-cleaned frame."""
+        partial = cls(sketch_k, keep_values, sketch_seed)
+        partial.rows_in = len(df) if rows_in is None else rows_in
+        partial.columns = ColumnAggregates.from_frame(df, AGGREGATE_COLUMNS)
+        partial.integer_columns = {col for col in NUMERIC_COLUMNS if pd.api.types.is_integer_dtype(df[col].dtype)}
+        partial.float32_columns = {col for col in NUMERIC_COLUMNS if df[col].dtype == np.float32}
+
+        # Sum in float64 like the rollup cube; float32 sums drift with the row count
+        values = pd.DataFrame(df[REGION_COLUMNS].to_numpy(dtype=np.float64), columns=REGION_COLUMNS, index=df.index)
+        grouped = values.groupby(df['region'], sort=False)
+        sums = grouped.sum()
+        counts = grouped.count()
+        sizes = df.groupby('region', sort=False).size()
+        for region in sizes.index:
+            partial.regions[region] = (
+                int(sizes[region]),
+                sums.loc[region].to_numpy(dtype=np.float64),
+                counts.loc[region].to_numpy(dtype=np.float64),
+            )
+
+        if partial.sketches is not None:
+            partial.sketches.update(df)
+        elif keep_values:
+            partial.median_values.append(df[NUMERIC_COLUMNS].to_numpy(dtype=np.float64))
+        else:
+            for col in NUMERIC_COLUMNS:
+                values = df[col].to_numpy(dtype=np.float64)
+                partial.value_counts[col] = np.unique(values[~np.isnan(values)], return_counts=True)
+        return partial
+
+    def merge(self, other: 'ShardedAggregate') -> 'ShardedAggregate':
+        """Fold another shard into this one; regions keep first-appearance order."""
+        self.rows_in += other.rows_in
+        self.columns.merge(other.columns)
+        for region, (count, sums, counts) in other.regions.items():
+            if region in self.regions:
+                c, s, n = self.regions[region]
+                self.regions[region] = (c + count, s + sums, n + counts)
+            else:
+                self.regions[region] = (count, sums.copy(), counts.copy())
+        self.median_values.extend(other.median_values)
+        for col, counts in other.value_counts.items():
+            mine = self.value_counts.get(col)
+            self.value_counts[col] = counts if mine is None else _merge_value_counts(mine, counts)
+        if self.sketches is not None and other.sketches is not None:
+            self.sketches.merge(other.sketches)
+        self.integer_columns &= other.integer_columns
+        self.float32_columns &= other.float32_columns
+        return self
+
+    def statistics(self) -> Dict[str, Any]:
+        """Same shape as CollegeDataProcessor.calculate_statistics()."""
+        if self.sketches is None and self.keep_values:
+            values = np.concatenate(self.median_values) if self.median_values else np.empty((0, len(NUMERIC_COLUMNS)))
+        stats = {}
+        for i, col in enumerate(NUMERIC_COLUMNS):
+            summary = self.columns.column_summary(col)
+            minimum, maximum = summary['min'], summary['max']
+            if col in self.integer_columns and summary['count']:
+                minimum, maximum = int(minimum), int(maximum)
+            if not summary['count']:
+                median = float('nan')
+            elif self.sketches is not None:
+                median = self.sketches[col].median()
+            elif self.keep_values:
+                median = float(np.nanmedian(values[:, i]))
+            else:
+                median = _counts_median(*self.value_counts[col])
+            if col in self.float32_columns:
+                # Report float32 values at their intended precision, as summarize_columns() does
+                median, minimum, maximum = (round(v, FLOAT32_OUTPUT_DECIMALS) for v in (median, minimum, maximum))
+            stats[col] = {
+                'mean': summary['mean'],
+                'median': median,
+                'std': summary['std'],
+                'min': minimum,
+                'max': maximum,
+            }
+        return stats
+
+    def regional_analysis(self) -> Dict[str, Any]:
+        """Same shape as CollegeDataProcessor.analyze_by_region()."""
+        idx = {col: i for i, col in enumerate(REGION_COLUMNS)}
+        regional_analysis = {}
+        for region, (count, sums, counts) in self.regions.items():
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means = sums / counts
+            total_enrollment = sums[idx['enrollment']]
+            regional_analysis[region] = {
+                'count': count,
+                'avg_acceptance_rate': float(means[idx['acceptance_rate']]),
+                'avg_tuition': float(means[idx['tuition']]),
+                'avg_sat': float(means[idx['sat_average']]),
+                'total_enrollment': int(total_enrollment) if 'enrollment' in self.integer_columns else float(total_enrollment)
+            }
+        return regional_analysis
+
+    def correlations(self) -> Dict[str, float]:
+        """Same shape as CollegeDataProcessor.find_correlations()."""
+        return {key: self.columns.correlation(a, b) for key, (a, b) in CORRELATION_PAIRS.items()}
+
+
+def _merge_value_counts(a: Tuple[np.ndarray, np.ndarray],
+                        b: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    values, inverse = np.unique(np.concatenate((a[0], b[0])), return_inverse=True)
+    return values, np.bincount(inverse, weights=np.concatenate((a[1], b[1])), minlength=len(values)).astype(np.int64)
+
+
+def _counts_median(values: np.ndarray, counts: np.ndarray) -> float:
+    """Median of the multiset given as sorted distinct values and counts (averaging the middle pair)."""
+    cumulative = np.cumsum(counts)
+    n = int(cumulative[-1]) if len(cumulative) else 0
+    if not n:
+        return float('nan')
+    lower = values[np.searchsorted(cumulative, (n - 1) // 2, side='right')]
+    upper = values[np.searchsorted(cumulative, n // 2, side='right')]
+    return float((lower + upper) / 2)
+
+
+def ndjson_byte_ranges(data_file: str, shards: int) -> List[Tuple[int, int]]:
+    """Split a file into contiguous byte ranges; each line belongs to the range it starts in."""
+    size = os.path.getsize(data_file)
+    shards = max(1, min(shards, size))
+    bounds = [size * i // shards for i in range(shards + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(shards) if bounds[i] < bounds[i + 1]]
+
+
+def _shard_seed(seed, *shard: int) -> Optional[Tuple[int, ...]]:
+    """
+    Sketch seed of one shard or chunk, e.g. (seed, range, chunk), extending
+    an int or tuple seed: fixed for a given input and shard layout, and
+    distinct so shards flip independent coins.
+    """
+    if seed is None:
+        return None
+    return (seed if isinstance(seed, tuple) else (seed,)) + shard
+
+
+def _aggregate_byte_range(data_file: str, start: int, end: int, chunk_size: int,
+                          sketch_k: Optional[int] = None, keep_values: bool = False,
+                          sketch_seed: Optional[Tuple[int, ...]] = None) -> ShardedAggregate:
+    """Worker: parse, clean and aggregate the NDJSON lines starting in [start, end)."""
+    result = ShardedAggregate(sketch_k, keep_values, sketch_seed)
+    chunks = 0
+    builder = ColumnChunkBuilder(chunk_size)
+    with open(data_file, 'rb') as f:
+        if start:
+            # Skip the tail of a line owned by the previous shard
+            f.seek(start - 1)
+            f.readline()
+        pos = f.tell()
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+            if line.strip():
+                builder.append(json.loads(line))
+            if builder.full:
+                chunks += 1
+                result.merge(_aggregate_frame(builder.flush(), sketch_k, keep_values, _shard_seed(sketch_seed, chunks)))
+    if builder.size:
+        chunks += 1
+        result.merge(_aggregate_frame(builder.flush(), sketch_k, keep_values, _shard_seed(sketch_seed, chunks)))
+    return result
+
+
+def _aggregate_frame(frame: pd.DataFrame, sketch_k: Optional[int] = None,
+                     keep_values: bool = False, sketch_seed: Optional[Tuple[int, ...]] = None) -> ShardedAggregate:
+    """Worker: clean and aggregate one streamed chunk."""
+    return ShardedAggregate.from_frame(clean_frame(frame), rows_in=len(frame), sketch_k=sketch_k,
+                                       keep_values=keep_values, sketch_seed=sketch_seed)
+
+
+def aggregate_stream(data_file: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     sketch_k: Optional[int] = None, keep_values: bool = False,
+                     sketch_seed: Optional[int] = None) -> ShardedAggregate:
+    """
+    Aggregate a data file chunk by chunk in this process. Unless keep_values
+    is set, memory stays bounded by the chunk size and the number of distinct
+    metric values however large the input is. A fixed sketch_seed makes
+    approximate results repeatable.
+    """
+    result = ShardedAggregate(sketch_k, keep_values, _shard_seed(sketch_seed))
+    for i, frame in enumerate(iter_column_chunks(data_file, chunk_size)):
+        result.merge(_aggregate_frame(frame, sketch_k, keep_values, _shard_seed(sketch_seed, i)))
+    return result
+
+
+def run_sharded(data_file: str, workers: Optional[int] = None,
+                chunk_size: int = DEFAULT_CHUNK_SIZE, sketch_k: Optional[int] = None,
+                keep_values: bool = False, sketch_seed: Optional[int] = None) -> ShardedAggregate:
+    """
+    Aggregate a data file across a process pool and merge the shard results.
+
+    NDJSON is split into byte ranges that workers parse independently. A JSON
+    array cannot be split without parsing it, so the parent streams it in
+    chunks and workers clean and aggregate those; the number of chunks in
+    flight is bounded to keep memory proportional to the chunk size. Shards
+    send back value counts rather than rows, so the parent's memory does not
+    grow with the input either; keep_values opts into shipping every value.
+    Shards are seeded from sketch_seed by position, so a fixed seed gives the
+    same approximate results for the same input and workers.
+    """
+    workers = workers or os.cpu_count() or 1
+    result = ShardedAggregate(sketch_k, keep_values, _shard_seed(sketch_seed))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if not is_json_array(data_file):
+            futures = [
+                pool.submit(_aggregate_byte_range, data_file, start, end, chunk_size, sketch_k, keep_values,
+                            _shard_seed(sketch_seed, i))
+                for i, (start, end) in enumerate(ndjson_byte_ranges(data_file, workers * 4))
+            ]
+            # Merge in submission order so region order matches a sequential scan
+            for future in futures:
+                result.merge(future.result())
+        else:
+            pending = deque()
+            for i, frame in enumerate(iter_column_chunks(data_file, chunk_size)):
+                pending.append(pool.submit(_aggregate_frame, frame, sketch_k, keep_values, _shard_seed(sketch_seed, i)))
+                if len(pending) >= workers * 2:
+                    result.merge(pending.popleft().result())
+            while pending:
+                result.merge(pending.popleft().result())
+
+    return result
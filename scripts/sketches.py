@@ -0,0 +1,172 @@
+import math
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+
+DEFAULT_SKETCH_K = 200
+# Compaction coin flips are seeded so approximate outputs repeat for the same data
+DEFAULT_SKETCH_SEED = 0
+# Values are fed to the compactors in blocks so memory stays O(k + block)
+UPDATE_BLOCK = 65_536
+MIN_CAPACITY = 8
+
+
+def rank_error(k: int) -> float:
+    """Approximate normalized rank error (99% confidence) of a KLL sketch with parameter k."""
+    return 2.296 / k ** 0.9723
+
+
+def k_for_error(epsilon: float) -> int:
+    """Smallest k whose expected rank error is at most epsilon."""
+    return max(MIN_CAPACITY, math.ceil((2.296 / epsilon) ** (1 / 0.9723)))
+
+
+class KLLSketch:
+    """
+    Mergeable KLL quantile sketch.
+
+    Values live in a stack of compactors; level h holds items of weight 2**h.
+    When a level overflows it is sorted and every other item (random offset)
+    is promoted, so the sketch retains O(k) items regardless of input size and
+    answers rank/quantile queries within roughly rank_error(k) * n.
+    """
+
+    def __init__(self, k: int = DEFAULT_SKETCH_K, seed: Optional[int] = None):
+        self.k = k
+        self.n = 0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - 1 - level
+        return max(MIN_CAPACITY, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _compress(self):
+        # Compact the lowest overflowing level until the sketch fits its total budget
+        while sum(len(items) for items in self.levels) > sum(self._capacity(h) for h in range(len(self.levels))):
+            level = next(h for h, items in enumerate(self.levels) if len(items) > self._capacity(h))
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            even = len(items) - len(items) % 2
+            offset = int(self._rng.integers(2))
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[offset:even:2]])
+            self.levels[level] = items[even:]
+
+    def update(self, values) -> 'KLLSketch':
+        """Add values (NaNs are skipped)."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        for start in range(0, len(values), UPDATE_BLOCK):
+            block = values[start:start + UPDATE_BLOCK]
+            block = block[~np.isnan(block)]
+            if not len(block):
+                continue
+            self.n += len(block)
+            self.minimum = min(self.minimum, float(block.min()))
+            self.maximum = max(self.maximum, float(block.max()))
+            self.levels[0] = np.concatenate([self.levels[0], block])
+            self._compress()
+        return self
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """Fold another sketch into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self._compress()
+        return self
+
+    @property
+    def retained(self) -> int:
+        return sum(len(items) for items in self.levels)
+
+    def _weighted_items(self) -> Tuple[np.ndarray, np.ndarray]:
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lv), 2.0 ** h) for h, lv in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def quantiles(self, qs) -> np.ndarray:
+        """Approximate values at the given quantiles in [0, 1]; 0 and 1 are exact."""
+        qs = np.asarray(qs, dtype=np.float64)
+        if not self.n:
+            return np.full(qs.shape, np.nan)
+        items, cumulative = self._weighted_items()
+        idx = np.searchsorted(cumulative, qs * cumulative[-1], side='left')
+        out = items[np.clip(idx, 0, len(items) - 1)]
+        out = np.where(qs <= 0, self.minimum, out)
+        return np.where(qs >= 1, self.maximum, out)
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+    def ranks(self, values) -> np.ndarray:
+        """Approximate number of inputs <= each value."""
+        values = np.asarray(values, dtype=np.float64)
+        if not self.n:
+            return np.zeros(values.shape)
+        items, cumulative = self._weighted_items()
+        idx = np.searchsorted(items, values, side='right')
+        ranks = np.where(idx > 0, cumulative[np.maximum(idx - 1, 0)], 0.0)
+        return np.where(values >= self.maximum, float(self.n), ranks)
+
+    def histogram(self, bins: int = 8, method: str = 'width') -> List[Tuple[float, float, int]]:
+        """
+        Approximate histogram as (left, right, count) triples.
+        method='width' gives equal-width bins over [min, max]; method='depth'
+        gives equal-count bins whose edges are sketch quantiles.
+        """
+        if not self.n:
+            return []
+        if method == 'width':
+            edges = np.linspace(self.minimum, self.maximum, bins + 1)
+        elif method == 'depth':
+            edges = self.quantiles(np.linspace(0, 1, bins + 1))
+        else:
+            raise ValueError("Supported histogram methods: 'width', 'depth'")
+        cumulative = self.ranks(edges[1:-1])
+        counts = np.diff(np.concatenate([[0.0], cumulative, [float(self.n)]]))
+        return [(float(edges[i]), float(edges[i + 1]), int(round(counts[i]))) for i in range(bins)]
+
+
+class SketchSet:
+    """One KLL sketch per column, mergeable as a unit."""
+
+    def __init__(self, columns: List[str], k: int = DEFAULT_SKETCH_K,
+                 seed: Union[int, Tuple[int, ...], None] = None):
+        self.columns = list(columns)
+        self.k = k
+        # seed may be a tuple, e.g. (seed, shard), to give each shard independent streams
+        seeds = np.random.SeedSequence(seed).spawn(len(self.columns)) if seed is not None else [None] * len(self.columns)
+        self.sketches: Dict[str, KLLSketch] = {
+            col: KLLSketch(k, column_seed) for col, column_seed in zip(self.columns, seeds)
+        }
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: List[str], k: int = DEFAULT_SKETCH_K,
+                   seed: Union[int, Tuple[int, ...], None] = None) -> 'SketchSet':
+        sketches = cls(columns, k, seed)
+        sketches.update(df)
+        return sketches
+
+    def update(self, df: pd.DataFrame) -> 'SketchSet':
+        for col in self.columns:
+            self.sketches[col].update(df[col].to_numpy(dtype=np.float64))
+        return self
+
+    def merge(self, other: 'SketchSet') -> 'SketchSet':
+        for col in self.columns:
+            self.sketches[col].merge(other.sketches[col])
+        return self
+
+    def __getitem__(self, column: str) -> KLLSketch:
+        return self.sketches[column]
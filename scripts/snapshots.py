@@ -0,0 +1,387 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Any, Iterable, Optional, Tuple, Union
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+from aggregates import AGGREGATE_COLUMNS
+from cleaning import CATEGORICAL_COLUMNS
+from column_cache import read_frame, write_frame
+from data_processor import CollegeDataProcessor
+from instrumentation import traced, current_span
+from sharded import ShardedAggregate
+
+CATALOG_FILE = 'catalog.json'
+CATALOG_VERSION = 1
+DEFAULT_FEED = 'main'
+# Partition name for rows without a region
+UNKNOWN_REGION = 'unknown'
+# Columns whose per-partition min/max are kept in the catalog for pruning
+STATISTICS_COLUMNS = AGGREGATE_COLUMNS
+
+Bounds = Dict[str, Tuple[Optional[float], Optional[float]]]
+
+
+def _as_list(values: Union[None, str, Iterable[Any]]) -> Optional[List[Any]]:
+    if values is None:
+        return None
+    return [values] if isinstance(values, (str, int)) else list(values)
+
+
+def _column_statistics(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """min, max (None when every value is missing) and null count of each statistics column."""
+    stats = {}
+    for col in STATISTICS_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = df[col].to_numpy()
+        present = values[~np.isnan(values)] if values.dtype.kind == 'f' else values
+        stats[col] = {
+            'min': present.min().item() if len(present) else None,
+            'max': present.max().item() if len(present) else None,
+            'nulls': int(len(values) - len(present)),
+        }
+    return stats
+
+
+def _bound_mask(df: pd.DataFrame, bounds: Bounds) -> np.ndarray:
+    """Rows satisfying every inclusive (low, high) bound; missing values never match."""
+    mask = np.ones(len(df), dtype=bool)
+    for col, (low, high) in bounds.items():
+        values = df[col].to_numpy()
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+        if low is None and high is None and values.dtype.kind == 'f':
+            mask &= ~np.isnan(values)
+    return mask
+
+
+class SnapshotStore:
+    """
+    Yearly admissions snapshots, one per (year, feed), stored partitioned by
+    year and region under root as column-layout directories
+    (year=<y>/region=<r>/feed=<f>). catalog.json lists every partition with
+    its row count and per-column min/max, so queries skip partitions by key
+    and by statistics before opening any column file, and filter rows only
+    in partitions whose range straddles a bound. Each snapshot also gets a
+    join index (first row of every college name -> partition and row) so
+    cross-year deltas gather just the metric column of the matched rows.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.catalog = self._load_catalog()
+
+    def _load_catalog(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.root, CATALOG_FILE), 'r') as f:
+                catalog = json.load(f)
+        except FileNotFoundError:
+            return {'version': CATALOG_VERSION, 'partitions': []}
+        if catalog.get('version') != CATALOG_VERSION:
+            raise ValueError(f"Unsupported snapshot catalog version {catalog.get('version')}")
+        return catalog
+
+    def _store_catalog(self):
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=self.root)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.catalog, f, indent=1, default=str)
+        os.replace(tmp_path, os.path.join(self.root, CATALOG_FILE))
+
+    def _path(self, relative: str) -> str:
+        return os.path.join(self.root, relative)
+
+    @staticmethod
+    def _join_index_id(year: int, feed: str) -> str:
+        return f"join/year={year}/feed={quote(feed, safe='')}"
+
+    def add_snapshot(self, data_file: str, year: int, feed: str = DEFAULT_FEED,
+                     cache_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Clean a source file with CollegeDataProcessor and store it as the (year, feed) snapshot."""
+        processor = CollegeDataProcessor(data_file, cache_dir=cache_dir)
+        return self.add_frame(processor.clean_data(), year, feed, source=os.path.abspath(data_file))
+
+    @traced('snapshots.add_frame')
+    def add_frame(self, df: pd.DataFrame, year: int, feed: str = DEFAULT_FEED,
+                  source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Store a cleaned frame as the (year, feed) snapshot, replacing any
+        previous one. Returns the catalog entries of its partitions.
+        """
+        year = int(year)
+        regions = df['region'].astype(object).fillna(UNKNOWN_REGION).to_numpy()
+        first_rows = ~df['name'].duplicated().to_numpy()
+        partition_codes = np.full(len(df), -1, dtype=np.int32)
+        partition_rows = np.zeros(len(df), dtype=np.int64)
+        entries = []
+        for code, region in enumerate(sorted(pd.unique(regions).tolist())):
+            positions = np.flatnonzero(regions == region)
+            partition_codes[positions] = code
+            partition_rows[positions] = np.arange(len(positions))
+            part = df.iloc[positions]
+            partition_id = f"year={year}/region={quote(str(region), safe='')}/feed={quote(feed, safe='')}"
+            write_frame(self._path(partition_id), part, source)
+            entries.append({'id': partition_id, 'year': year, 'region': region, 'feed': feed,
+                            'rows': len(part), 'source': source, 'statistics': _column_statistics(part)})
+
+        # Join index: the first row of each college name in this snapshot
+        ids = [entry['id'] for entry in entries]
+        join_index = pd.DataFrame({
+            'name': df['name'].to_numpy()[first_rows],
+            'partition': pd.Categorical.from_codes(partition_codes[first_rows], ids),
+            'row': partition_rows[first_rows],
+        })
+        write_frame(self._path(self._join_index_id(year, feed)), join_index, source)
+
+        stale = [entry['id'] for entry in self.catalog['partitions']
+                 if entry['year'] == year and entry['feed'] == feed and entry['id'] not in ids]
+        self.catalog['partitions'] = [entry for entry in self.catalog['partitions']
+                                      if not (entry['year'] == year and entry['feed'] == feed)] + entries
+        self.catalog['partitions'].sort(key=lambda entry: (entry['year'], entry['feed'], entry['region']))
+        self._store_catalog()
+        for partition_id in stale:
+            path = self._path(partition_id)
+            shutil.rmtree(path, ignore_errors=True)
+            try:
+                # Drop the emptied region=/year= directories; root keeps the catalog
+                os.removedirs(os.path.dirname(path))
+            except OSError:
+                pass
+        current_span().set(rows_in=len(df), partitions=len(entries))
+        return entries
+
+    def years(self) -> List[int]:
+        return sorted({entry['year'] for entry in self.catalog['partitions']})
+
+    def partitions(self, years: Optional[Tuple[Optional[int], Optional[int]]] = None,
+                   regions: Union[None, str, Iterable[str]] = None,
+                   feeds: Union[None, str, Iterable[str]] = None,
+                   bounds: Optional[Bounds] = None) -> List[Dict[str, Any]]:
+        """
+        Catalog entries that can hold matching rows: years is an inclusive
+        (first, last) range (either end may be None), regions and feeds are
+        names, and a partition is pruned when its min/max cannot meet a bound.
+        """
+        first, last = years or (None, None)
+        regions, feeds = _as_list(regions), _as_list(feeds)
+        selected = []
+        for entry in self.catalog['partitions']:
+            if first is not None and entry['year'] < first or last is not None and entry['year'] > last:
+                continue
+            if regions is not None and entry['region'] not in regions:
+                continue
+            if feeds is not None and entry['feed'] not in feeds:
+                continue
+            if bounds and not self._may_match(entry, bounds):
+                continue
+            selected.append(entry)
+        return selected
+
+    @staticmethod
+    def _may_match(entry: Dict[str, Any], bounds: Bounds) -> bool:
+        for col, (low, high) in bounds.items():
+            stats = entry['statistics'].get(col)
+            if stats is None:
+                continue
+            if stats['min'] is None:
+                return False
+            if low is not None and stats['max'] < low or high is not None and stats['min'] > high:
+                return False
+        return True
+
+    @staticmethod
+    def _residual_bounds(entry: Dict[str, Any], bounds: Optional[Bounds]) -> Bounds:
+        """The bounds a partition's statistics do not already guarantee for every row."""
+        residual = {}
+        for col, (low, high) in (bounds or {}).items():
+            stats = entry['statistics'].get(col)
+            covered = (stats is not None and stats['nulls'] == 0
+                       and (low is None or stats['min'] >= low) and (high is None or stats['max'] <= high))
+            if not covered:
+                residual[col] = (low, high)
+        return residual
+
+    def _read(self, entry: Dict[str, Any], columns: Optional[List[str]],
+              bounds: Optional[Bounds]) -> pd.DataFrame:
+        """One partition, with only the needed column files opened and rows filtered by the bounds."""
+        residual = self._residual_bounds(entry, bounds)
+        needed = None if columns is None else list(dict.fromkeys(columns + list(residual)))
+        part = read_frame(self._path(entry['id']), needed)
+        if part is None:
+            raise FileNotFoundError(f"Snapshot partition {entry['id']} is missing")
+        if residual:
+            part = part[_bound_mask(part, residual)]
+        return part if columns is None else part[columns]
+
+    @traced('snapshots.scan')
+    def scan(self, columns: Optional[List[str]] = None,
+             years: Optional[Tuple[Optional[int], Optional[int]]] = None,
+             regions: Union[None, str, Iterable[str]] = None,
+             feeds: Union[None, str, Iterable[str]] = None,
+             bounds: Optional[Bounds] = None) -> pd.DataFrame:
+        """Matching rows of the selected partitions as one frame, with year and feed columns added."""
+        entries = self.partitions(years, regions, feeds, bounds)
+        current_span().set(partitions=len(entries), pruned=len(self.catalog['partitions']) - len(entries))
+        frames = []
+        for entry in entries:
+            part = self._read(entry, columns, bounds)
+            frames.append(part.assign(year=np.int16(entry['year']), feed=entry['feed']))
+        if not frames:
+            return pd.DataFrame(columns=(columns or []) + ['year', 'feed'])
+        df = pd.concat(frames)
+        for col in CATEGORICAL_COLUMNS + ['feed']:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        return df
+
+    @traced('snapshots.aggregate')
+    def aggregate(self, years: Optional[Tuple[Optional[int], Optional[int]]] = None,
+                  regions: Union[None, str, Iterable[str]] = None,
+                  feeds: Union[None, str, Iterable[str]] = None,
+                  bounds: Optional[Bounds] = None) -> ShardedAggregate:
+        """Merged ShardedAggregate of the matching rows, built one selected partition at a time."""
+        entries = self.partitions(years, regions, feeds, bounds)
+        current_span().set(partitions=len(entries), pruned=len(self.catalog['partitions']) - len(entries))
+        merged = ShardedAggregate()
+        for entry in entries:
+            part = self._read(entry, AGGREGATE_COLUMNS + ['region'], bounds)
+            merged.merge(ShardedAggregate.from_frame(part))
+        return merged
+
+    def calculate_statistics(self, **filters) -> Dict[str, Any]:
+        """CollegeDataProcessor.calculate_statistics() over the partitions selected by filters (see partitions())."""
+        return self.aggregate(**filters).statistics()
+
+    def analyze_by_region(self, **filters) -> Dict[str, Any]:
+        """CollegeDataProcessor.analyze_by_region() over the selected partitions."""
+        return self.aggregate(**filters).regional_analysis()
+
+    def find_correlations(self, **filters) -> Dict[str, float]:
+        """CollegeDataProcessor.find_correlations() over the selected partitions."""
+        return self.aggregate(**filters).correlations()
+
+    def yearly_statistics(self, **filters) -> Dict[int, Dict[str, Any]]:
+        """calculate_statistics() for each year in the selection, for trend lines."""
+        first, last = filters.pop('years', None) or (None, None)
+        years = [year for year in self.years()
+                 if (first is None or year >= first) and (last is None or year <= last)]
+        return {year: self.calculate_statistics(years=(year, year), **filters) for year in years}
+
+    def _join_index(self, year: int, feed: str) -> pd.DataFrame:
+        index = read_frame(self._path(self._join_index_id(year, feed)))
+        if index is None:
+            raise KeyError(f"No snapshot for year {year}, feed {feed!r}")
+        return index
+
+    def _gather(self, join_rows: pd.DataFrame, metric: str) -> np.ndarray:
+        """metric at each (partition, row) of a join index slice, reading only that column."""
+        values = np.full(len(join_rows), np.nan)
+        codes = join_rows['partition'].cat.codes.to_numpy()
+        rows = join_rows['row'].to_numpy()
+        for code, partition_id in enumerate(join_rows['partition'].cat.categories):
+            selected = np.flatnonzero(codes == code)
+            if not len(selected):
+                continue
+            column = read_frame(self._path(partition_id), [metric])[metric].to_numpy()
+            values[selected] = column[rows[selected]]
+        return values
+
+    @traced('snapshots.deltas')
+    def deltas(self, metric: str, from_year: int, to_year: int, feed: str = DEFAULT_FEED,
+               regions: Union[None, str, Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Change in metric for every college present in both snapshots, matched
+        by name through the join indexes (first occurrence per year). regions
+        filters on the college's region in to_year. Columns: name, region,
+        metric in each year, delta; in to_year snapshot order.
+        """
+        before, after = self._join_index(from_year, feed), self._join_index(to_year, feed)
+        region_of = {entry['id']: entry['region'] for entry in self.catalog['partitions']}
+        if regions is not None:
+            wanted = set(_as_list(regions))
+            keep = [region_of.get(partition_id) in wanted for partition_id in after['partition'].cat.categories]
+            after = after[np.asarray(keep + [False])[after['partition'].cat.codes.to_numpy()]]
+        matches = pd.Index(before['name'].to_numpy()).get_indexer(after['name'].to_numpy())
+        found = matches >= 0
+        after = after[found]
+        before = before.iloc[matches[found]]
+        current_span().set(rows_out=len(after))
+
+        old, new = self._gather(before, metric), self._gather(after, metric)
+        return pd.DataFrame({
+            'name': after['name'].to_numpy(),
+            'region': after['partition'].map(region_of).to_numpy(),
+            f"{metric}_{from_year}": old,
+            f"{metric}_{to_year}": new,
+            'delta': new - old,
+        })
+
+
+def _parse_bounds(specs: Optional[List[str]]) -> Optional[Bounds]:
+    """['tuition:10000:40000', 'sat_average:1400:'] -> {'tuition': (10000, 40000), 'sat_average': (1400, None)}"""
+    if not specs:
+        return None
+    bounds = {}
+    for spec in specs:
+        col, low, high = spec.split(':')
+        bounds[col] = (float(low) if low else None, float(high) if high else None)
+    return bounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partitioned yearly snapshots with pruned queries")
+    parser.add_argument('--root', default='snapshots', help="Snapshot store directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help="Clean a source file and store it as a snapshot")
+    add.add_argument('data_file')
+    add.add_argument('--year', type=int, required=True)
+    add.add_argument('--feed', default=DEFAULT_FEED)
+    commands.add_parser('list', help="Show the partition catalog")
+    for name in ('stats', 'regions', 'correlations', 'yearly'):
+        query = commands.add_parser(name, help=f"{name} over the selected partitions")
+        query.add_argument('--from-year', type=int)
+        query.add_argument('--to-year', type=int)
+        query.add_argument('--region', action='append')
+        query.add_argument('--feed', action='append')
+        query.add_argument('--bound', action='append', metavar='COLUMN:LOW:HIGH',
+                           help="Inclusive bound; either end may be empty")
+    delta = commands.add_parser('deltas', help="Per-college change in a metric between two years")
+    delta.add_argument('metric')
+    delta.add_argument('from_year', type=int)
+    delta.add_argument('to_year', type=int)
+    delta.add_argument('--feed', default=DEFAULT_FEED)
+    delta.add_argument('--region', action='append')
+    delta.add_argument('--output', help="Write the deltas as CSV instead of printing a summary")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.root)
+    if args.command == 'add':
+        entries = store.add_snapshot(args.data_file, args.year, args.feed)
+        print(f"Stored {sum(entry['rows'] for entry in entries):,} rows for {args.year}/{args.feed} "
+              f"in {len(entries)} partitions")
+    elif args.command == 'list':
+        for entry in store.catalog['partitions']:
+            print(f"{entry['id']:<48} {entry['rows']:>10,} rows")
+    elif args.command == 'deltas':
+        deltas = store.deltas(args.metric, args.from_year, args.to_year, args.feed, args.region)
+        if args.output:
+            deltas.to_csv(args.output, index=False)
+            print(f"{len(deltas):,} colleges written to {args.output}")
+        else:
+            print(deltas['delta'].describe().to_string())
+    else:
+        filters = {'years': (args.from_year, args.to_year), 'regions': args.region,
+                   'feeds': args.feed, 'bounds': _parse_bounds(args.bound)}
+        method = {'stats': store.calculate_statistics, 'regions': store.analyze_by_region,
+                  'correlations': store.find_correlations, 'yearly': store.yearly_statistics}[args.command]
+        print(json.dumps(method(**filters), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
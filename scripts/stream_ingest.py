@@ -0,0 +1,164 @@
+import json
+from typing import Dict, Any, Iterator
+import numpy as np
+import pandas as pd
+
+# Flattened column layout shared by every ingest path, in the order
+# CollegeDataProcessor.create_dataframe has always produced.
+NUMERIC_COLUMNS = ['acceptance_rate', 'tuition', 'sat_average', 'enrollment']
+INTEGER_COLUMNS = ['tuition', 'sat_average', 'enrollment']
+DEMOGRAPHIC_COLUMNS = ['white_percent', 'asian_percent', 'hispanic_percent', 'black_percent', 'other_percent']
+# Flattened demographic column -> key in a record's demographics object
+DEMOGRAPHIC_FIELDS = dict(zip(DEMOGRAPHIC_COLUMNS, ['white', 'asian', 'hispanic', 'black', 'other']))
+COLUMNS = ['name'] + NUMERIC_COLUMNS + ['state', 'region'] + DEMOGRAPHIC_COLUMNS
+
+DEFAULT_CHUNK_SIZE = 100_000
+READ_BLOCK_SIZE = 1 << 20
+
+
+def _iter_json_array(f, first_char: str) -> Iterator[Dict[str, Any]]:
+    """Yield elements of a top-level JSON array without loading the whole array."""
+    decoder = json.JSONDecoder()
+    buf = first_char
+    pos = 1  # skip the opening '['
+    eof = False
+
+    while True:
+        # Skip separators between elements
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            block = f.read(READ_BLOCK_SIZE)
+            buf, pos = buf[pos:] + block, 0
+            eof = not block
+
+        if pos >= len(buf):
+            raise ValueError("Unterminated JSON array")
+        if buf[pos] == ']':
+            return
+
+        try:
+            record, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            end = None
+
+        # A parse that fails, or that stops exactly at the end of the buffer,
+        # may just be an element split across reads.
+        if end is None or (end == len(buf) and not eof):
+            if eof:
+                raise ValueError(f"Malformed JSON array element at offset {pos}")
+            block = f.read(READ_BLOCK_SIZE)
+            buf, pos = buf[pos:] + block, 0
+            eof = not block
+            continue
+
+        yield record
+        pos = end
+        # Drop consumed text so the buffer stays bounded by the block size
+        if pos > READ_BLOCK_SIZE:
+            buf, pos = buf[pos:], 0
+
+
+def is_json_array(data_file: str) -> bool:
+    """True if the file holds a top-level JSON array, False for NDJSON."""
+    with open(data_file, 'r') as f:
+        while True:
+            char = f.read(1)
+            if not char or not char.isspace():
+                return char == '['
+
+
+def iter_records(data_file: str) -> Iterator[Dict[str, Any]]:
+    """
+    Incrementally yield college records from a JSON array or NDJSON file.
+    The format is detected from the first non-whitespace character.
+    """
+    with open(data_file, 'r') as f:
+        first_char = ''
+        while True:
+            first_char = f.read(1)
+            if not first_char or not first_char.isspace():
+                break
+
+        if not first_char:
+            return
+
+        if first_char == '[':
+            yield from _iter_json_array(f, first_char)
+        else:
+            # NDJSON: one record per line
+            first_line = first_char + f.readline()
+            if first_line.strip():
+                yield json.loads(first_line)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class ColumnChunkBuilder:
+    """
+    Flattens records straight into preallocated column buffers.
+    Memory is bounded by the chunk size rather than the dataset size.
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.size = 0
+        self.columns = {
+            col: np.empty(chunk_size, dtype=object if col in ('name', 'state', 'region') else np.float64)
+            for col in COLUMNS
+        }
+
+    @property
+    def full(self) -> bool:
+        return self.size >= self.chunk_size
+
+    def append(self, college: Dict[str, Any]):
+        """Flatten one record into the next buffer slot."""
+        i = self.size
+        cols = self.columns
+        location = college['location']
+        demographics = college['demographics']
+
+        cols['name'][i] = college['name']
+        cols['acceptance_rate'][i] = college['acceptance_rate']
+        cols['tuition'][i] = college['tuition']
+        cols['sat_average'][i] = college['sat_average']
+        cols['enrollment'][i] = college['enrollment']
+        cols['state'][i] = location['state']
+        cols['region'][i] = location['region']
+        cols['white_percent'][i] = demographics['white']
+        cols['asian_percent'][i] = demographics['asian']
+        cols['hispanic_percent'][i] = demographics['hispanic']
+        cols['black_percent'][i] = demographics['black']
+        cols['other_percent'][i] = demographics['other']
+        self.size = i + 1
+
+    def flush(self) -> pd.DataFrame:
+        """Return the buffered rows as a DataFrame and reset the builder."""
+        n = self.size
+        frame = pd.DataFrame({col: buf[:n] for col, buf in self.columns.items()}, columns=COLUMNS)
+        # Keep integer columns integral, matching the json.load path
+        for col in INTEGER_COLUMNS:
+            values = frame[col].to_numpy()
+            if np.array_equal(values, np.floor(values)):
+                frame[col] = values.astype(np.int64)
+        # Numeric buffers are copied into the frame and can be reused; object
+        # buffers may be shared with it, so those get fresh storage.
+        for col in ('name', 'state', 'region'):
+            self.columns[col] = np.empty(self.chunk_size, dtype=object)
+        self.size = 0
+        return frame
+
+
+def iter_column_chunks(data_file: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Stream a JSON array or NDJSON file as flattened DataFrame chunks."""
+    builder = ColumnChunkBuilder(chunk_size)
+    for college in iter_records(data_file):
+        builder.append(college)
+        if builder.full:
+            yield builder.flush()
+    if builder.size:
+        yield builder.flush()